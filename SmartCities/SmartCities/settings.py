@@ -37,12 +37,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestTimingMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ProfileMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -51,7 +54,7 @@ ROOT_URLCONF = 'SmartCities.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.timing.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -69,12 +72,19 @@ WSGI_APPLICATION = 'SmartCities.wsgi.application'
 # Database configuration
 DATABASE_URL = os.getenv('DATABASE_URL')
 
+# Seconds a request keeps its database connection open for the next one.
+# Keep 0 when served over ASGI (uvicorn, as on Render): every request runs
+# its sync code in a thread of its own, as do the PAGE_QUERY_THREADS, so
+# kept connections pile up one per thread. Put a pooler such as PgBouncer
+# in front of Postgres to save the reconnects; raise this only under WSGI.
+DATABASE_CONN_MAX_AGE = int(os.getenv('DATABASE_CONN_MAX_AGE', '0'))
+
 if DATABASE_URL:
     # Render PostgreSQL database
     DATABASES = {
         'default': dj_database_url.config(
             default=DATABASE_URL,
-            conn_max_age=600,
+            conn_max_age=DATABASE_CONN_MAX_AGE,
             conn_health_checks=True,
         )
     }
@@ -87,6 +97,45 @@ else:
         }
     }
 
+# Read replicas of the default database as comma-separated database URLs,
+# e.g. sqlite:////path/to/copy-of-db.sqlite3 locally. Views marked
+# read_from_replica read from them (core.routers)
+DATABASE_REPLICAS = []
+for url in filter(None, (url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(','))):
+    alias = f'replica{len(DATABASE_REPLICAS) + 1}'
+    DATABASES[alias] = dj_database_url.parse(url, conn_max_age=DATABASE_CONN_MAX_AGE, conn_health_checks=True)
+    # Tests run against the default test database only.
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+
+# Seconds a browser keeps reading from the primary after one of its
+# requests wrote, so it sees its own changes; keep above the replicas' lag
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', '15'))
+
+# Cache configuration. Invalidations go through the database
+# (core.models.CacheGeneration), so they reach every process either way;
+# with several workers a shared backend (file-based) saves each of them
+# computing the same entries.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'smartcities'),
+    }
+}
+
+# Upper bound, in seconds, on how stale the landing page numbers can get
+LANDING_STATS_TIMEOUT = int(os.getenv('LANDING_STATS_TIMEOUT', '300'))
+
+# Loads the session user together with their profile. ModelBackend stays
+# for the sessions signed in before ProfileBackend: a session only loads
+# through the backend path it was stored with, so dropping it would sign
+# every one of them out.
+AUTHENTICATION_BACKENDS = [
+    'core.backends.ProfileBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -118,6 +167,27 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Reports of the same issue type within this radius and window are merged
+# into the existing pending complaint as a +1
+COMPLAINT_DUPLICATE_RADIUS_M = int(os.getenv('COMPLAINT_DUPLICATE_RADIUS_M', '50'))
+COMPLAINT_DUPLICATE_WINDOW_HOURS = int(os.getenv('COMPLAINT_DUPLICATE_WINDOW_HOURS', '72'))
+
+# Seconds a dashboard or complaint page may be answered 304 Not Modified
+# while its complaints are unchanged; bounds how stale relative times
+# ("5 minutes ago") and SLA countdowns on a revalidated page can be
+CONDITIONAL_PAGE_WINDOW = int(os.getenv('CONDITIONAL_PAGE_WINDOW', '60'))
+
+# Run core.tasks jobs in-process when the queuing transaction commits,
+# instead of leaving them for the run_worker command
+TASKS_EAGER = os.getenv('TASKS_EAGER', 'False') == 'True'
+
+# Days finished tasks are kept before run_worker deletes them
+TASK_RETENTION_DAYS = int(os.getenv('TASK_RETENTION_DAYS', '7'))
+
+# Database connections per process the async dashboards may use to run
+# their independent queries at the same time; 0 runs them one by one
+PAGE_QUERY_THREADS = int(os.getenv('PAGE_QUERY_THREADS', '4'))
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
@@ -152,5 +222,24 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'core.timing': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_TIMING_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
     },
-}
\ No newline at end of file
+}
+
+# Share of requests (0-1) that RequestTimingMiddleware reports in a
+# Server-Timing header and a core.timing INFO line. Requests at or over
+# REQUEST_TIMING_SLOW_MS are always reported, at WARNING with their slowest query
+REQUEST_TIMING_SAMPLE_RATE = float(os.getenv('REQUEST_TIMING_SAMPLE_RATE', '0.01'))
+REQUEST_TIMING_SLOW_MS = float(os.getenv('REQUEST_TIMING_SLOW_MS', '500'))
+
+# Directory where each gunicorn worker writes its /metrics counts so any
+# worker can report the total; empty keeps them in-process (runserver).
+# Empty it when the server starts. METRICS_TOKEN is required as
+# "Authorization: Bearer <token>" to read /metrics; without one, /metrics
+# is only served when DEBUG is on
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
\ No newline at end of file
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Complaint, UserProfile
+from .models import Complaint, Task, UserProfile
 
 @admin.register(Complaint)
 class ComplaintAdmin(admin.ModelAdmin):
@@ -7,7 +7,17 @@ class ComplaintAdmin(admin.ModelAdmin):
     list_filter = ('status', 'issue_type')
     search_fields = ('title', 'description')
 
+    def get_search_results(self, request, queryset, search_term):
+        # The full-text index instead of an icontains scan per field.
+        if not search_term.strip():
+            return queryset, False
+        return queryset.search(search_term), False
+
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ('name', 'role', 'locality')
 
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'run_at', 'finished_at')
+    list_filter = ('status', 'name')
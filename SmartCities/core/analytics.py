@@ -0,0 +1,241 @@
+from datetime import datetime, time, timedelta
+from itertools import groupby
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Case, Count, DateField, F, IntegerField, Q, Value, When
+from django.db.models.functions import TruncDay, TruncWeek
+from django.utils import timezone
+
+from .models import CacheGeneration, Complaint, SecondsBetween
+
+# period -> (database truncation, bucket length)
+PERIODS = {
+    'day': (TruncDay, timedelta(days=1)),
+    'week': (TruncWeek, timedelta(weeks=1)),
+}
+PERCENTILES = (50, 90, 99)
+GROUP_FIELDS = ('ward_number', 'issue_type')
+MAX_BUCKETS = 400
+
+# CacheGeneration of the cached buckets.
+ANALYTICS_GENERATION = 'analytics'
+# Closed buckets never change, so they are kept until evicted.
+CLOSED_BUCKETS_TIMEOUT = 7 * 24 * 3600
+
+
+def bucket_start(day, period):
+    """First day of the ``period`` bucket holding ``day`` (weeks start on Monday, like TruncWeek)."""
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def _aware(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _percentiles(values, cells, n_cells):
+    """
+    Linear-interpolated percentiles of ``values`` within each cell, like
+    np.percentile per cell but in one pass over the sorted array. Returns
+    {q: array of n_cells}, NaN for empty cells.
+    """
+    order = np.lexsort((values, cells))
+    values = values[order]
+    counts = np.bincount(cells, minlength=n_cells)
+    starts = np.cumsum(counts) - counts
+    filled = counts > 0
+
+    result = {}
+    for q in PERCENTILES:
+        position = starts + (q / 100) * np.maximum(counts - 1, 0)
+        lower = np.floor(position).astype(int)
+        upper = np.ceil(position).astype(int)
+        out = np.full(n_cells, np.nan)
+        lo, hi = values[lower[filled]], values[upper[filled]]
+        out[filled] = lo + (hi - lo) * (position[filled] - lower[filled])
+        result[q] = out
+    return result
+
+
+def _compute(period, start, end, filters, group_by):
+    """
+    Series for the buckets in [start, end), keyed by group tuple. Three
+    queries: the backlog before ``start``, complaints created per bucket,
+    and the resolution times of complaints resolved in the range.
+    """
+    trunc, step = PERIODS[period]
+    n_buckets = (end - start) // step
+    start_at, end_at = _aware(start), _aware(end)
+    complaints_qs = Complaint.objects.filter(**filters)
+
+    backlog_before = (
+        complaints_qs.filter(created_at__lt=start_at)
+        .filter(Q(resolved_at__isnull=True) | Q(resolved_at__gte=start_at))
+        .values_list(*group_by)
+        .annotate(count=Count('pk'))
+        .order_by()
+    )
+    created = (
+        complaints_qs.filter(created_at__gte=start_at, created_at__lt=end_at)
+        .annotate(bucket=trunc('created_at', output_field=DateField()))
+        .values_list(*group_by, 'bucket')
+        .annotate(count=Count('pk'))
+        .order_by()
+    )
+    resolved = (
+        complaints_qs.filter(resolved_at__gte=start_at, resolved_at__lt=end_at)
+        .annotate(
+            bucket=trunc('resolved_at', output_field=DateField()),
+            seconds=SecondsBetween(F('resolved_at') - F('created_at')),
+            on_time=Case(
+                When(sla_breached_at__isnull=True, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField(),
+            ),
+        )
+        .values_list(*group_by, 'bucket', 'seconds', 'on_time')
+    )
+
+    backlog_before = list(backlog_before)
+    created = list(created)
+    resolved = list(resolved)
+
+    width = len(group_by)
+    groups = {}
+    for row in (*backlog_before, *created, *resolved):
+        groups.setdefault(row[:width], len(groups))
+    n_cells = len(groups) * n_buckets
+    start64 = np.datetime64(start, 'D')
+    step_days = step.days
+
+    def cells(rows):
+        if not rows:
+            return np.zeros(0, dtype=int), []
+        columns = list(zip(*rows))
+        group_index = np.fromiter((groups[row[:width]] for row in rows), dtype=int, count=len(rows))
+        bucket_index = (np.array(columns[width], dtype='datetime64[D]') - start64).astype(int) // step_days
+        return group_index * n_buckets + bucket_index, columns
+
+    opening = np.zeros(len(groups))
+    for row in backlog_before:
+        opening[groups[row[:width]]] = row[width]
+
+    created_cells, created_columns = cells(created)
+    created_counts = np.bincount(
+        created_cells, weights=created_columns[-1] if created else None, minlength=n_cells
+    )
+
+    resolved_cells, resolved_columns = cells(resolved)
+    resolved_counts = np.bincount(resolved_cells, minlength=n_cells)
+    on_time = np.bincount(
+        resolved_cells, weights=resolved_columns[-1] if resolved else None, minlength=n_cells
+    )
+    hours = np.array(resolved_columns[width + 1] if resolved else [], dtype=float) / 3600
+    percentiles = _percentiles(hours, resolved_cells, n_cells)
+
+    backlog = opening[:, None] + np.cumsum(
+        (created_counts - resolved_counts).reshape(len(groups), n_buckets), axis=1
+    )
+
+    series = {}
+    for key, index in groups.items():
+        rows = []
+        for bucket in range(n_buckets):
+            cell = index * n_buckets + bucket
+            count = int(resolved_counts[cell])
+            rows.append({
+                'bucket': (start + bucket * step).isoformat(),
+                'created': int(created_counts[cell]),
+                'resolved': count,
+                'backlog': int(backlog[index, bucket]),
+                'sla_compliance': round(on_time[cell] / count, 4) if count else None,
+                **{
+                    f'p{q}_hours': None if np.isnan(percentiles[q][cell]) else round(float(percentiles[q][cell]), 2)
+                    for q in PERCENTILES
+                },
+            })
+        series[key] = rows
+    return series
+
+
+def _empty_row(day):
+    return {
+        'bucket': day.isoformat(),
+        'created': 0,
+        'resolved': 0,
+        'backlog': 0,
+        'sla_compliance': None,
+        **{f'p{q}_hours': None for q in PERCENTILES},
+    }
+
+
+def _closed_buckets(period, start, end, filters, group_by) -> list:
+    """
+    {group: row} for each closed bucket in [start, end). Each bucket is
+    cached on its own, so a window that slides along only computes the
+    buckets that just closed; missing ones are computed a run at a time.
+    """
+    _, step = PERIODS[period]
+    days = [start + index * step for index in range((end - start) // step)]
+    scope = ':'.join([
+        filters.get('ward_number', ''), filters.get('issue_type', ''), ','.join(group_by),
+    ])
+    keys = [f'analytics:resolution:{period}:{day.isoformat()}:{scope}' for day in days]
+    generation = CacheGeneration.current(ANALYTICS_GENERATION)
+    cached = cache.get_many(keys, version=generation)
+    buckets = [cached.get(key) for key in keys]
+
+    computed = {}
+    for missing, run in groupby(range(len(days)), key=lambda index: buckets[index] is None):
+        if not missing:
+            continue
+        run = list(run)
+        series = _compute(period, days[run[0]], days[run[-1]] + step, filters, group_by)
+        for offset, index in enumerate(run):
+            buckets[index] = {group: rows[offset] for group, rows in series.items()}
+            computed[keys[index]] = buckets[index]
+    if computed:
+        cache.set_many(computed, timeout=CLOSED_BUCKETS_TIMEOUT, version=generation)
+    return buckets
+
+
+def resolution_series(period, start, end, ward_number='', issue_type='', group_by=GROUP_FIELDS) -> list:
+    """
+    Resolution analytics per ``period`` bucket from ``start`` up to (not
+    including) ``end``, both aligned with bucket_start(). One series per
+    combination of ``group_by`` fields; the closed buckets are cached.
+    """
+    filters = {}
+    if ward_number:
+        filters['ward_number'] = ward_number
+    if issue_type:
+        filters['issue_type'] = issue_type
+    group_by = tuple(group_by)
+    _, step = PERIODS[period]
+
+    closed_end = min(end, max(start, bucket_start(timezone.localdate(), period)))
+    closed = _closed_buckets(period, start, closed_end, filters, group_by) if start < closed_end else []
+    current = _compute(period, closed_end, end, filters, group_by) if closed_end < end else {}
+    current_days = [closed_end + index * step for index in range((end - closed_end) // step)]
+
+    keys = sorted({key for bucket in closed for key in bucket} | set(current))
+    return [
+        {
+            **dict(zip(group_by, key)),
+            'series': [
+                bucket.get(key) or _empty_row(start + index * step)
+                for index, bucket in enumerate(closed)
+            ] + (current.get(key) or [_empty_row(day) for day in current_days]),
+        }
+        for key in keys
+    ]
+
+
+def invalidate_analytics() -> None:
+    """
+    Drop every cached bucket, in every process, for writes that change the
+    past (imports, deletes).
+    """
+    CacheGeneration.bump(ANALYTICS_GENERATION)
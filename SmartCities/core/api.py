@@ -0,0 +1,65 @@
+import hashlib
+
+from .models import Complaint
+
+API_VERSION = 'v1'
+# API name -> model field. Reporter details are deliberately not exposed.
+API_FIELDS = {
+    'id': 'id',
+    'title': 'title',
+    'description': 'description',
+    'issue_type': 'issue_type',
+    'status': 'status',
+    'ward': 'ward_number',
+    'landmark': 'landmark',
+    'lat': 'latitude',
+    'lng': 'longitude',
+    'report_count': 'report_count',
+    'created_at': 'created_at',
+    'resolved_at': 'resolved_at',
+    'sla_deadline': 'sla_deadline',
+    'sla_breached_at': 'sla_breached_at',
+    'before_image': 'before_image',
+    'after_image': 'after_image',
+}
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+
+
+def parse_fields(value) -> list:
+    """``?fields=id,status,lat`` as API names; all of them when empty. Raises ValueError on unknown names."""
+    if not value:
+        return list(API_FIELDS)
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in API_FIELDS]
+    if unknown or not fields:
+        raise ValueError(f"Unknown fields: {', '.join(unknown) or value!r}. Choose from {', '.join(API_FIELDS)}.")
+    return fields
+
+
+def only_fields(complaints_qs, fields):
+    """Load just the columns ``fields`` and the queryset's ordering need."""
+    ordering = [
+        name.lstrip('-') for name in complaints_qs.query.order_by
+        if name.lstrip('-') not in complaints_qs.query.annotations
+    ]
+    return complaints_qs.only(*{API_FIELDS[name] for name in fields}, *ordering)
+
+
+def serialize(complaint, fields) -> dict:
+    data = {}
+    for name in fields:
+        value = getattr(complaint, API_FIELDS[name])
+        if API_FIELDS[name] in Complaint.IMAGE_FIELDS:
+            value = value.url if value else None
+        data[name] = value
+    return data
+
+
+def etag(marks, params) -> str:
+    """
+    ETag for a response built from complaints at ``marks`` (from
+    ComplaintQuerySet.watermark()) with query ``params`` (a QueryDict).
+    """
+    query = sorted((key, value) for key in params for value in params.getlist(key))
+    return hashlib.sha256(f'{API_VERSION}|{sorted(marks.items())}|{query}'.encode()).hexdigest()[:32]
@@ -0,0 +1,81 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.decorators import login_required as sync_login_required
+from django.contrib.auth.views import redirect_to_login
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+
+from .timing import current_timings
+
+
+def login_required(view):
+    """
+    django.contrib.auth's login_required, for async views as well (the
+    Django 4.2 one only wraps sync views).
+    """
+    if not asyncio.iscoroutinefunction(view):
+        return sync_login_required(view)
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        # The first look at request.user loads it from the database.
+        if await sync_to_async(lambda: request.user.is_authenticated)():
+            return await view(request, *args, **kwargs)
+        return redirect_to_login(request.get_full_path())
+
+    return wrapper
+
+
+@functools.lru_cache(maxsize=None)
+def _executor(threads):
+    return ThreadPoolExecutor(max_workers=threads, thread_name_prefix='page-queries')
+
+
+def _can_run_concurrently() -> bool:
+    if not settings.PAGE_QUERY_THREADS:
+        return False
+    # Other connections cannot see the rows of an open transaction (tests,
+    # ATOMIC_REQUESTS) or an in-memory SQLite database at all.
+    if any(conn.in_atomic_block for conn in connections.all(initialized_only=True)):
+        return False
+    default = connections[DEFAULT_DB_ALIAS]
+    return not (default.vendor == 'sqlite' and default.is_in_memory_db())
+
+
+def _on_own_connection(call):
+    def run():
+        # The pool's threads keep their connections between requests, so
+        # they get the same CONN_MAX_AGE handling as request threads.
+        close_old_connections()
+        timings = current_timings.get()
+        try:
+            with ExitStack() as stack:
+                if timings is not None:
+                    for conn in connections.all():
+                        stack.enter_context(conn.execute_wrapper(timings.record_query))
+                return call()
+        finally:
+            close_old_connections()
+
+    return run
+
+
+async def gather_queries(*calls) -> list:
+    """
+    Results of ``calls``, functions without arguments that query the
+    database, run at the same time on up to PAGE_QUERY_THREADS connections
+    of their own. Falls back to running them one after another on the
+    request's connection when those connections could not see its data.
+    """
+    if not await sync_to_async(_can_run_concurrently)():
+        return await sync_to_async(lambda: [call() for call in calls])()
+
+    executor = _executor(settings.PAGE_QUERY_THREADS)
+    return list(await asyncio.gather(*(
+        sync_to_async(_on_own_connection(call), thread_sensitive=False, executor=executor)()
+        for call in calls
+    )))
@@ -0,0 +1,23 @@
+# Most queries each page may run, whatever the size of the tables. The
+# session and user lookups are included. QueryBudgetTests and the
+# benchmark_views command both check against these.
+QUERY_BUDGETS = {
+    'index': 4,
+    'dashboard': 9,
+    'admin_dashboard': 8,
+    'complaints': 4,
+    'profile': 4,
+}
+
+# Slowest median, in milliseconds, that benchmark_views allows a complaints
+# search page at any table size. Broad terms are the worst case; see
+# MAX_SEARCH_MATCHES in core.search.
+SEARCH_BUDGET_MS = 100
+SEARCH_QUERIES = (
+    {'q': 'garbage'},
+    {'q': 'pothole road'},
+    {'q': 'streetlight night'},
+    # Filters that reject most matches: the most rows read before the cap.
+    {'q': 'garbage', 'status': 'resolved', 'ward': '3'},
+    {'q': 'pothole road', 'issue_type': 'pothole', 'status': 'pending'},
+)
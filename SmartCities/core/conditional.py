@@ -0,0 +1,91 @@
+import asyncio
+import functools
+import hashlib
+import time
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+def conditional_page(scope, renders_messages=False):
+    """
+    ETag/Last-Modified handling for an HTML page built from the complaints
+    in ``scope(request, *args, **kwargs)``: a ComplaintQuerySet, or the
+    ComplaintRollup one for city-wide pages. A repeat view whose
+    complaints, viewer and time window (CONDITIONAL_PAGE_WINDOW) are
+    unchanged is answered 304 after a single watermark query, without
+    running the view.
+    Pages that show flash messages render in full while one is waiting,
+    and a scope without complaints is never answered 304.
+    Works on sync and async views.
+    """
+    def check(request, *args, **kwargs):
+        """(etag, last_modified, 304 response or None); None to just run the view."""
+        if request.method not in ('GET', 'HEAD') or (
+            renders_messages and len(messages.get_messages(request))
+        ):
+            return None
+
+        marks = scope(request, *args, **kwargs).watermark()
+        if marks.get('count') == 0:
+            # Nothing to show (or a 404 to come): no ETag, or a matching
+            # If-None-Match would turn the 404 into a 304.
+            return None
+        window = settings.CONDITIONAL_PAGE_WINDOW
+        window_start = int(time.time() // window * window)
+        user = request.user
+        viewer = (
+            user.pk, getattr(user, 'name', ''), getattr(user, 'role', ''),
+            getattr(user, 'locality', ''), getattr(user, 'ward_number', ''),
+            # The page embeds a CSRF token; a rotated secret needs a new page.
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        )
+        key = f'{request.get_full_path()}|{viewer}|{window_start}|{sorted(marks.items())}'
+        etag = quote_etag(hashlib.sha256(key.encode()).hexdigest()[:32])
+        changes = [value.timestamp() for value in marks.values() if isinstance(value, datetime)]
+        # Relative times on the page ("5 minutes ago") change with the window too.
+        last_modified = int(max(changes + [window_start]))
+        return etag, last_modified, get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+    def finish(response, etag, last_modified):
+        response.headers.setdefault('ETag', etag)
+        response.headers.setdefault('Last-Modified', http_date(last_modified))
+        # Per-user pages: browsers may keep them but must ask every time.
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                checked = await sync_to_async(check)(request, *args, **kwargs)
+                if checked is None:
+                    return await view(request, *args, **kwargs)
+                etag, last_modified, response = checked
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                    if response.status_code != 200:
+                        return response
+                return finish(response, etag, last_modified)
+
+            return async_wrapper
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            checked = check(request, *args, **kwargs)
+            if checked is None:
+                return view(request, *args, **kwargs)
+            etag, last_modified, response = checked
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            return finish(response, etag, last_modified)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,78 @@
+import csv
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+# (header, queryset field); the sla_* and hours_* columns come from with_sla().
+EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('title', 'title'),
+    ('issue_type', 'issue_type'),
+    ('status', 'status'),
+    ('ward_number', 'ward_number'),
+    ('landmark', 'landmark'),
+    ('latitude', 'latitude'),
+    ('longitude', 'longitude'),
+    ('report_count', 'report_count'),
+    ('reporter', 'user__username'),
+    ('created_at', 'created_at'),
+    ('resolved_at', 'resolved_at'),
+    ('sla_hours', 'sla_window_hours'),
+    ('sla_deadline', 'sla_deadline'),
+    ('sla_status', 'sla_state'),
+    ('hours_open', 'hours_open'),
+    ('hours_overdue', 'hours_overdue'),
+    ('sla_breached_at', 'sla_breached_at'),
+]
+EXPORT_CHUNK_SIZE = 2000
+# Lines read per trip to a worker thread when streaming under ASGI.
+ASYNC_BATCH_LINES = 500
+
+
+class _Echo:
+    """File-like object whose write() hands back the line instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(complaints_qs):
+    """Tuples in EXPORT_COLUMNS order, read in chunks without building model instances."""
+    return (
+        complaints_qs.with_sla()
+        .values_list(*[field for _, field in EXPORT_COLUMNS])
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+def csv_lines(complaints_qs):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([header for header, _ in EXPORT_COLUMNS])
+    for row in export_rows(complaints_qs):
+        yield writer.writerow([
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in row
+        ])
+
+
+def ndjson_lines(complaints_qs):
+    headers = [header for header, _ in EXPORT_COLUMNS]
+    for row in export_rows(complaints_qs):
+        yield json.dumps(dict(zip(headers, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+async def async_lines(lines):
+    """
+    ``lines`` as an async iterator, read a batch at a time on a worker
+    thread. Under ASGI, Django reads a sync iterator into memory whole
+    before sending the first byte.
+    """
+    lines = iter(lines)
+    while True:
+        batch = await sync_to_async(lambda: list(islice(lines, ASYNC_BATCH_LINES)))()
+        if not batch:
+            return
+        for line in batch:
+            yield line
@@ -0,0 +1,238 @@
+import math
+
+from django.db.models import Avg, Count, F, FloatField, Q, Value
+from django.db.models.functions import ASin, Coalesce, Cos, Floor, Power, Radians, Sin, Sqrt, Substr
+
+# Complaints filed without coordinates are drawn at the city centre.
+DEFAULT_CENTER_LAT = 19.0760
+DEFAULT_CENTER_LNG = 72.8777
+
+# Leaflet's zoom levels; requests outside them are clamped.
+MIN_MAP_ZOOM = 0
+MAX_MAP_ZOOM = 22
+# From this zoom level in, the map gets individual points instead of grid clusters.
+POINTS_MIN_ZOOM = 14
+# Grid cells per 256px map tile when clustering.
+CLUSTER_CELLS_PER_TILE = 4
+# More points than this in one viewport are clustered whatever the zoom.
+MAX_MAP_POINTS = 1000
+
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE_LAT = 111320.0
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Stored precision; 9 characters is a cell of roughly 5m x 5m.
+GEOHASH_PRECISION = 9
+# near() picks the finest prefix length that covers the search circle
+# with at most this many cells.
+MAX_NEAR_CELLS = 16
+
+
+def geohash_encode(lat, lng, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        coord_range, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (coord_range[0] + coord_range[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            coord_range[0] = mid
+        else:
+            bits <<= 1
+            coord_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+
+    return ''.join(chars)
+
+
+def geohash_cell_size(precision):
+    """(height, width) in degrees of a geohash cell of ``precision`` characters."""
+    lng_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 - lng_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def radius_bbox(lat, lng, radius_m):
+    """(west, south, east, north) box enclosing a circle of ``radius_m`` metres."""
+    dlat = radius_m / METERS_PER_DEGREE_LAT
+    dlng = radius_m / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6))
+    return (
+        max(lng - dlng, -180.0), max(lat - dlat, -90.0),
+        min(lng + dlng, 180.0), min(lat + dlat, 90.0),
+    )
+
+
+def covering_geohashes(bbox):
+    """The geohash prefixes that together cover ``bbox``, as few as MAX_NEAR_CELLS allows."""
+    west, south, east, north = bbox
+
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        cell_h, cell_w = geohash_cell_size(precision)
+        rows = math.floor(north / cell_h) - math.floor(south / cell_h) + 1
+        cols = math.floor(east / cell_w) - math.floor(west / cell_w) + 1
+        if rows * cols <= MAX_NEAR_CELLS:
+            break
+
+    prefixes = set()
+    for row in range(rows):
+        lat = min(south + row * cell_h, north)
+        for col in range(cols):
+            lng = min(west + col * cell_w, east)
+            prefixes.add(geohash_encode(lat, lng, precision))
+        prefixes.add(geohash_encode(lat, east, precision))
+    for col in range(cols):
+        prefixes.add(geohash_encode(north, min(west + col * cell_w, east), precision))
+    prefixes.add(geohash_encode(north, east, precision))
+    return sorted(prefixes)
+
+
+def geohash_prefix_q(prefixes, **filters):
+    """
+    Match geohashes starting with any of ``prefixes``. Written as ranges
+    rather than LIKE so a plain B-tree index serves it on SQLite and
+    Postgres alike. Equality ``filters`` are repeated within each range,
+    so an index on (<filter columns>, geohash) can serve every one.
+    """
+    query = Q()
+    for prefix in prefixes:
+        upper = prefix + GEOHASH_ALPHABET[-1] * (GEOHASH_PRECISION - len(prefix))
+        query |= Q(geohash__range=(prefix, upper), **filters)
+    return query
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    dlat = math.radians(lat2 - lat1)
+    dlng = math.radians(lng2 - lng1)
+    a = (
+        math.sin(dlat / 2) ** 2
+        + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def haversine_expression(lat, lng):
+    """Database expression for the distance in metres from (lat, lng) to each row."""
+    dlat = Radians(F('latitude') - Value(lat))
+    dlng = Radians(F('longitude') - Value(lng))
+    a = (
+        Power(Sin(dlat / 2), 2)
+        + Value(math.cos(math.radians(lat))) * Cos(Radians('latitude')) * Power(Sin(dlng / 2), 2)
+    )
+    return Value(2 * EARTH_RADIUS_M, output_field=FloatField()) * ASin(Sqrt(a))
+
+
+def parse_bbox(value):
+    """
+    Parse a Leaflet ``toBBoxString()`` value, ``"west,south,east,north"``,
+    clamped to valid coordinates. Raises ValueError for anything else.
+    """
+    parts = [float(part) for part in (value or '').split(',')]
+    if len(parts) != 4:
+        raise ValueError('bbox must be "west,south,east,north"')
+    west, south, east, north = parts
+    if west > east or south > north:
+        raise ValueError('bbox corners are reversed')
+    return (
+        max(west, -180.0), max(south, -90.0),
+        min(east, 180.0), min(north, 90.0),
+    )
+
+
+def in_bbox(complaints_qs, bbox):
+    """Restrict complaints to the box, keeping uncoordinated ones if the centre is inside it."""
+    west, south, east, north = bbox
+    located = Q(
+        latitude__gte=south, latitude__lte=north,
+        longitude__gte=west, longitude__lte=east,
+    )
+    if south <= DEFAULT_CENTER_LAT <= north and west <= DEFAULT_CENTER_LNG <= east:
+        located |= Q(latitude__isnull=True) | Q(longitude__isnull=True)
+    return complaints_qs.filter(located).annotate(
+        map_lat=Coalesce('latitude', Value(DEFAULT_CENTER_LAT)),
+        map_lng=Coalesce('longitude', Value(DEFAULT_CENTER_LNG)),
+    )
+
+
+def _point(lng, lat, properties):
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [lng, lat]},
+        'properties': properties,
+    }
+
+
+def point_features(complaints_qs, limit=MAX_MAP_POINTS):
+    """One feature per complaint, or None if there are more than ``limit``."""
+    rows = list(
+        complaints_qs.with_sla()
+        .annotate(summary=Substr('description', 1, 50))
+        .values_list('id', 'issue_type', 'status', 'sla_state', 'summary', 'map_lat', 'map_lng')
+        .order_by()[:limit + 1]
+    )
+    if len(rows) > limit:
+        return None
+
+    return [
+        _point(lng, lat, {
+            'id': pk,
+            'issue_type': issue_type,
+            'status': status,
+            'sla_status': sla_state,
+            'description': summary,
+        })
+        for pk, issue_type, status, sla_state, summary, lat, lng in rows
+    ]
+
+
+def cluster_features(complaints_qs, zoom):
+    """Aggregate complaints into a lat/lng grid sized for ``zoom``."""
+    cell = 360 / (2 ** zoom) / CLUSTER_CELLS_PER_TILE
+    rows = (
+        complaints_qs.with_sla()
+        .annotate(
+            cell_x=Floor(F('map_lng') / cell),
+            cell_y=Floor(F('map_lat') / cell),
+        )
+        .values('cell_x', 'cell_y')
+        .annotate(
+            count=Count('id'),
+            lat=Avg('map_lat'),
+            lng=Avg('map_lng'),
+            pending=Count('id', filter=Q(status='pending')),
+            resolved=Count('id', filter=Q(status='resolved')),
+            sla_active=Count('id', filter=Q(sla_state='active')),
+            sla_breached=Count('id', filter=Q(sla_state='breached')),
+        )
+        .order_by()
+    )
+
+    return [
+        _point(row['lng'], row['lat'], {
+            'cluster': True,
+            'count': row['count'],
+            'status': {'pending': row['pending'], 'resolved': row['resolved']},
+            'sla': {'active': row['sla_active'], 'breached': row['sla_breached']},
+        })
+        for row in rows
+    ]
+
+
+def complaints_feature_collection(complaints_qs, bbox, zoom):
+    complaints_qs = in_bbox(complaints_qs, bbox)
+
+    features = point_features(complaints_qs) if zoom >= POINTS_MIN_ZOOM else None
+    if features is None:
+        features = cluster_features(complaints_qs, zoom)
+
+    return {'type': 'FeatureCollection', 'features': features}
@@ -0,0 +1,106 @@
+import logging
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .models import Complaint
+from .tasks import task
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels and WebP quality of each rendition. Thumbnails
+# are what list pages embed; medium is the detail page image.
+RENDITIONS = {
+    'thumb': (320, 70),
+    'medium': (1280, 80),
+}
+RENDITION_FORMAT = 'WEBP'
+
+
+class RenditionError(Exception):
+    """An image of a complaint could not be read or decoded."""
+
+
+def rendition_name(source_name, size):
+    """'complaints/before/a.jpg' -> 'complaints/before/a.thumb.webp'"""
+    stem, _ = posixpath.splitext(source_name)
+    return f'{stem}.{size}.webp'
+
+
+def render(image_file):
+    """
+    Return {size: WebP bytes} for an uploaded image: orientation applied
+    from EXIF, then EXIF and every other metadata block dropped.
+    """
+    largest = max(edge for edge, _ in RENDITIONS.values())
+    with Image.open(image_file) as image:
+        # JPEG can decode straight at a reduced scale, far cheaper than a
+        # full decode of a phone photo.
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+        rendered = {}
+        for size, (edge, quality) in RENDITIONS.items():
+            copy = image.copy()
+            copy.thumbnail((edge, edge), Image.LANCZOS)
+            buffer = BytesIO()
+            copy.save(buffer, RENDITION_FORMAT, quality=quality, method=4)
+            rendered[size] = buffer.getvalue()
+        return rendered
+
+
+def generate_renditions(complaint) -> bool:
+    """
+    Write missing or stale renditions for ``complaint`` and record them in
+    complaint.renditions. Returns whether anything was generated; raises
+    RenditionError, after recording the others, if an image could not be
+    rendered.
+    """
+    renditions = dict(complaint.renditions)
+    changed = False
+    failed = []
+
+    for field in complaint.pending_renditions():
+        image = getattr(complaint, field)
+        try:
+            with image.open('rb') as image_file:
+                rendered = render(image_file)
+        except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+            logger.warning('Could not render %s of complaint %s', field, complaint.pk, exc_info=True)
+            failed.append(field)
+            continue
+
+        entry = {'source': image.name}
+        for size, data in rendered.items():
+            name = rendition_name(image.name, size)
+            if image.storage.exists(name):
+                image.storage.delete(name)
+            entry[size] = image.storage.save(name, ContentFile(data))
+        renditions[field] = entry
+        changed = True
+
+    if changed:
+        # update() rather than save(): renditions are not a complaint edit
+        # and must not touch the SLA columns or the rollup.
+        Complaint.objects.filter(pk=complaint.pk).update(renditions=renditions, updated_at=timezone.now())
+        complaint.renditions = renditions
+    if failed:
+        raise RenditionError(f"Could not render {', '.join(failed)} of complaint {complaint.pk}")
+    return changed
+
+
+@task
+def render_complaint_images(complaint_id):
+    complaint = Complaint.objects.filter(pk=complaint_id).first()
+    if complaint is not None:
+        generate_renditions(complaint)
+
+
+def schedule_renditions(complaint) -> None:
+    """Queue rendition generation for ``complaint`` if an image needs it."""
+    if complaint.pending_renditions():
+        render_complaint_images.delay(complaint.pk)
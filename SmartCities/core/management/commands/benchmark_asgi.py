@@ -0,0 +1,98 @@
+import statistics
+import time
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from core.models import Complaint, UserProfile
+
+PAGES = ("dashboard", "admin_dashboard")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare p50/p95 latency of the dashboards through the WSGI handler, with their "
+        "queries run one after another, and the ASGI handler, with them run on "
+        "PAGE_QUERY_THREADS connections at once. Uses the complaints already in the "
+        "database (see seed_complaints)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=50, help="Requests per page, user and handler.")
+
+    def handle(self, *args, **options):
+        if not Complaint.objects.exists():
+            raise CommandError("No complaints to measure with; run seed_complaints first.")
+        if not settings.PAGE_QUERY_THREADS:
+            self.stderr.write("PAGE_QUERY_THREADS is 0: the ASGI numbers run their queries one by one too.")
+
+        runs = options["runs"]
+        self.stdout.write(f"{Complaint.objects.count()} complaints, {runs} runs")
+        self.stdout.write(f"{'page':<18}{'user':<9}{'handler':<9}{'p50 ms':>9}{'p95 ms':>9}")
+        for name in PAGES:
+            url = reverse(name)
+            for user in (self.benchmark_user("benchmark-admin@city.com", "Admin"),
+                         self.benchmark_user("benchmark-citizen@city.com", "Citizen")):
+                for handler, timings in (
+                    ("wsgi", self.measure_wsgi(user, url, runs)),
+                    ("asgi", self.measure_asgi(user, url, runs)),
+                ):
+                    p95 = statistics.quantiles(timings, n=20, method="inclusive")[18]
+                    self.stdout.write(
+                        f"{name:<18}{user.profile.role:<9}{handler:<9}"
+                        f"{statistics.median(timings):>9.1f}{p95:>9.1f}"
+                    )
+
+    def benchmark_user(self, username, role):
+        user, _ = get_user_model().objects.get_or_create(username=username)
+        UserProfile.objects.update_or_create(user=user, defaults={"role": role, "ward_number": "1"})
+        return get_user_model().objects.select_related("profile").get(pk=user.pk)
+
+    def test_settings(self, **overrides):
+        # Plain static storage: the pages must render without collectstatic.
+        # Django 4.2's AsyncClient always sends "Host: testserver".
+        return override_settings(
+            STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+            **overrides,
+        )
+
+    def check_status(self, response, url, user):
+        if response.status_code != 200:
+            raise CommandError(f"{url} returned {response.status_code} for {user.username}.")
+
+    # One extra request first in each, so the slowest run is not a cold start.
+
+    def measure_wsgi(self, user, url, runs):
+        client = Client()
+        client.force_login(user)
+        timings = []
+        # The queries run one by one, as they did in the sync views.
+        with self.test_settings(PAGE_QUERY_THREADS=0):
+            for _ in range(runs + 1):
+                start = time.perf_counter()
+                response = client.get(url, secure=True)
+                timings.append((time.perf_counter() - start) * 1000)
+                self.check_status(response, url, user)
+        return timings[1:]
+
+    def measure_asgi(self, user, url, runs):
+        client = AsyncClient()
+        client.force_login(user)
+
+        async def measure():
+            timings = []
+            for _ in range(runs + 1):
+                start = time.perf_counter()
+                response = await client.get(url, secure=True)
+                timings.append((time.perf_counter() - start) * 1000)
+                self.check_status(response, url, user)
+            return timings[1:]
+
+        with self.test_settings():
+            return async_to_sync(measure)()
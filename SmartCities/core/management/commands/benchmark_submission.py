@@ -0,0 +1,81 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from core.geo import DEFAULT_CENTER_LAT, DEFAULT_CENTER_LNG
+from core.models import Complaint, UserProfile
+from core.seeding import seed_complaints
+
+
+class Command(BaseCommand):
+    help = (
+        "Time complaint submission (duplicate lookup + insert or +1). "
+        "Timed submissions are rolled back; use --rows on a scratch database only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=0,
+            help="Top the table up to this many synthetic complaints first.",
+        )
+        parser.add_argument("--runs", type=int, default=200, help="Number of timed submissions.")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        user, _ = get_user_model().objects.get_or_create(username="benchmark@city.com")
+
+        existing = Complaint.objects.count()
+        if options["rows"] > existing:
+            self.top_up(user, options["rows"] - existing, rng)
+
+        timings = []
+        query_counts = []
+        merged = 0
+        with transaction.atomic():
+            for _ in range(options["runs"]):
+                lat, lng = self.random_point(rng)
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    _, created = Complaint.objects.report(
+                        user=user,
+                        title="Benchmark Issue",
+                        description="Benchmark submission",
+                        issue_type=rng.choice(Complaint.ISSUE_TYPE_CHOICES)[0],
+                        latitude=lat,
+                        longitude=lng,
+                    )
+                    timings.append((time.perf_counter() - start) * 1000)
+                query_counts.append(len(queries))
+                merged += not created
+            transaction.set_rollback(True)
+
+        timings.sort()
+        self.stdout.write(f"Complaints in table: {Complaint.objects.count()}")
+        self.stdout.write(f"Submissions: {len(timings)} ({merged} merged into duplicates)")
+        self.stdout.write(
+            "Latency ms: p50 {:.2f}  p95 {:.2f}  max {:.2f}".format(
+                statistics.median(timings),
+                timings[int(len(timings) * 0.95) - 1],
+                timings[-1],
+            )
+        )
+        self.stdout.write(f"Queries per submission: max {max(query_counts)}")
+
+    def random_point(self, rng):
+        return (
+            DEFAULT_CENTER_LAT + rng.uniform(-0.15, 0.15),
+            DEFAULT_CENTER_LNG + rng.uniform(-0.1, 0.1),
+        )
+
+    def top_up(self, user, count, rng):
+        self.stdout.write(f"Inserting {count} synthetic complaints...")
+        ward_number = UserProfile.objects.filter(user=user).values_list("ward_number", flat=True).first()
+        seed_complaints([(user.pk, ward_number or "")], count, rng, batch_size=10000)
@@ -0,0 +1,105 @@
+import random
+import statistics
+import time
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from core.benchmarks import QUERY_BUDGETS, SEARCH_BUDGET_MS, SEARCH_QUERIES
+from core.models import Complaint, UserProfile
+from core.seeding import seed_complaints, seed_users
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the main pages at growing table sizes and fail if any page runs more "
+        "queries than its budget in core.benchmarks, or a search page is slower than "
+        "SEARCH_BUDGET_MS. Adds synthetic rows: scratch databases only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="1000,100000,1000000",
+            help="Comma-separated complaint counts to measure at (default: 1000,100000,1000000).",
+        )
+        parser.add_argument("--runs", type=int, default=10, help="Requests per page and size.")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        sizes = sorted(int(size) for size in options["sizes"].split(","))
+        admin = self.benchmark_user("benchmark-admin@city.com", "Admin")
+        citizen = self.benchmark_user("benchmark-citizen@city.com", "Citizen")
+
+        users = list(UserProfile.objects.values_list("user_id", "ward_number")[:10000])
+        if len(users) < 100:
+            users += seed_users(max(100, sizes[-1] // 100), rng)
+
+        over_budget = []
+        for size in sizes:
+            missing = size - Complaint.objects.count()
+            if missing > 0:
+                self.stdout.write(f"Seeding {missing} complaints...")
+                seed_complaints(users, missing, rng, batch_size=10000)
+
+            self.stdout.write(f"\n{Complaint.objects.count()} complaints")
+            self.stdout.write(f"{'page':<18}{'user':<9}{'p50 ms':>9}{'max ms':>9}{'queries':>9}{'budget':>8}")
+            for name, budget in QUERY_BUDGETS.items():
+                for user in (admin, citizen):
+                    timings, queries = self.measure(name, user, options["runs"])
+                    self.stdout.write(
+                        f"{name:<18}{user.profile.role:<9}{statistics.median(timings):>9.1f}"
+                        f"{max(timings):>9.1f}{queries:>9}{budget:>8}"
+                    )
+                    if queries > budget:
+                        over_budget.append(f"{name} ({user.profile.role}, {size} rows): {queries} > {budget}")
+
+            self.stdout.write(f"{'search':<27}{'p50 ms':>9}{'max ms':>9}{'budget':>17}")
+            for params in SEARCH_QUERIES:
+                timings, _ = self.measure("complaints", admin, options["runs"], params)
+                p50 = statistics.median(timings)
+                label = urlencode(params)
+                self.stdout.write(f"{label:<27}{p50:>9.1f}{max(timings):>9.1f}{SEARCH_BUDGET_MS:>17}")
+                if p50 > SEARCH_BUDGET_MS:
+                    over_budget.append(f"search {label} ({size} rows): {p50:.1f} ms > {SEARCH_BUDGET_MS} ms")
+
+        if over_budget:
+            raise CommandError("Budget exceeded:\n  " + "\n  ".join(over_budget))
+        self.stdout.write(self.style.SUCCESS("\nAll pages within their query budgets and searches within SEARCH_BUDGET_MS."))
+
+    def benchmark_user(self, username, role):
+        user, _ = get_user_model().objects.get_or_create(username=username)
+        UserProfile.objects.update_or_create(user=user, defaults={"role": role, "ward_number": "1"})
+        return get_user_model().objects.select_related("profile").get(pk=user.pk)
+
+    # Plain static storage: the pages must render without collectstatic.
+    # Page queries run one by one, on the connection being counted.
+    @override_settings(
+        STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+        PAGE_QUERY_THREADS=0,
+    )
+    def measure(self, name, user, runs, params=None):
+        client = Client(HTTP_HOST="localhost")
+        client.force_login(user)
+        url = reverse(name)
+
+        timings = []
+        most_queries = 0
+        for _ in range(runs):
+            # Uncached numbers are the worst case for the landing page.
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = client.get(url, params, secure=True)
+                timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f"{name} returned {response.status_code} for {user.username}.")
+            most_queries = max(most_queries, len(queries))
+        return timings, most_queries
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from core.images import RenditionError, generate_renditions
+from core.models import Complaint
+
+
+class Command(BaseCommand):
+    help = "Generate missing thumbnail and medium renditions for complaint photos."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of complaints loaded per query (default: 500).",
+        )
+
+    def handle(self, *args, **options):
+        no_before = Q(before_image__isnull=True) | Q(before_image="")
+        no_after = Q(after_image__isnull=True) | Q(after_image="")
+        with_images = Complaint.objects.exclude(no_before & no_after).order_by("pk")
+
+        generated = 0
+        failed = 0
+        for complaint in with_images.iterator(chunk_size=options["batch_size"]):
+            try:
+                if generate_renditions(complaint):
+                    generated += 1
+            except RenditionError as error:
+                self.stderr.write(str(error))
+                failed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Generated renditions for {generated} complaints."))
+        if failed:
+            raise CommandError(f"{failed} complaints have images that could not be rendered.")
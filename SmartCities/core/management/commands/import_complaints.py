@@ -0,0 +1,243 @@
+import csv
+import json
+import sys
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from core.analytics import invalidate_analytics
+from core.forms import LOCALITY_WARD_CHOICES
+from core.models import Complaint, UserProfile
+from core.stats import invalidate_landing_stats
+
+WARD_BY_LOCALITY = {
+    value.split('|')[0].lower(): value.split('|')[1]
+    for value, _ in LOCALITY_WARD_CHOICES
+    if '|' in value
+}
+ISSUE_TYPES = {key for key, _ in Complaint.ISSUE_TYPE_CHOICES}
+STATUSES = {key for key, _ in Complaint.STATUS_CHOICES}
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+def read_csv(stream):
+    yield from csv.DictReader(stream)
+
+
+def read_ndjson(stream):
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as error:
+            # Passed on as a row so it is reported with its offset.
+            yield InvalidRow(f"bad JSON: {error}")
+
+
+def text(row, field):
+    return str(row.get(field) or "").strip()
+
+
+def parse_timestamp(value, field):
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                raise InvalidRow(f"{field}: cannot parse {value!r}")
+            parsed = parse_datetime(f"{day.isoformat()}T00:00:00")
+    except InvalidRow:
+        raise
+    except ValueError:
+        raise InvalidRow(f"{field}: not a valid date {value!r}")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_coordinate(value, field, limit):
+    if value in (None, ''):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise InvalidRow(f"{field}: not a number: {value!r}")
+    if not -limit <= number <= limit:
+        raise InvalidRow(f"{field}: out of range: {number}")
+    return number
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream legacy complaints from a CSV or NDJSON file into the database. "
+        "Columns: user, title, description, issue_type, status, created_at, "
+        "resolved_at, ward_number or locality, landmark, latitude, longitude."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, or - for stdin.")
+        parser.add_argument("--format", choices=["csv", "ndjson"], help="Default: from the file extension.")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows per transaction (default: 1000).")
+        parser.add_argument(
+            "--start-at",
+            type=int,
+            default=0,
+            help="Skip this many data rows first; use the offset printed by a failed run.",
+        )
+        parser.add_argument(
+            "--default-user",
+            help="Username to file rows under when their user does not exist (otherwise they are rejected).",
+        )
+        parser.add_argument("--max-errors", type=int, default=1000, help="Give up after this many invalid rows.")
+
+    def handle(self, *args, **options):
+        fmt = options["format"] or ("ndjson" if options["path"].endswith((".ndjson", ".jsonl")) else "csv")
+        reader = read_ndjson if fmt == "ndjson" else read_csv
+
+        self.default_user = None
+        if options["default_user"]:
+            self.default_user = (
+                get_user_model().objects.filter(username=options["default_user"]).first()
+            )
+            if self.default_user is None:
+                raise CommandError(f"No user {options['default_user']!r}.")
+
+        stream = sys.stdin if options["path"] == "-" else open(options["path"], newline="", encoding="utf-8")
+        try:
+            self.run(reader(stream), options)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+    def run(self, rows, options):
+        offset = options["start_at"]
+        batch_size = options["batch_size"]
+        rows = islice(rows, offset, None)
+
+        imported = 0
+        errors = 0
+        started = time.monotonic()
+
+        try:
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+
+                complaints, batch_errors = self.build(batch, offset)
+                for row_offset, message in batch_errors:
+                    self.stderr.write(f"row {row_offset}: {message}")
+                errors += len(batch_errors)
+                if errors > options["max_errors"]:
+                    raise CommandError(f"Too many invalid rows. Fix the file and resume with --start-at {offset}.")
+
+                try:
+                    with transaction.atomic():
+                        Complaint.objects.bulk_create_historical(complaints)
+                except DatabaseError as error:
+                    raise CommandError(f"Batch at row {offset} failed ({error}). Resume with --start-at {offset}.")
+
+                offset += len(batch)
+                imported += len(complaints)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"{offset} rows read, {imported} imported, {errors} invalid "
+                    f"({imported / elapsed if elapsed else 0:.0f} rows/s)"
+                )
+        finally:
+            # Committed batches change past buckets even if a later one failed.
+            invalidate_landing_stats()
+            invalidate_analytics()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {imported} complaints ({errors} invalid rows skipped) in {time.monotonic() - started:.1f}s."
+        ))
+
+    def build(self, batch, offset):
+        """Validate a batch of rows into unsaved Complaints; returns (complaints, [(offset, error)])."""
+        usernames = {
+            text(row, "user").lower()
+            for row in batch if isinstance(row, dict)
+        }
+        users = {
+            user.username.lower(): user
+            for user in get_user_model().objects.filter(username__in=usernames)
+        }
+        wards = dict(
+            UserProfile.objects.filter(user__in=users.values()).values_list("user_id", "ward_number")
+        )
+
+        complaints = []
+        errors = []
+        now = timezone.now()
+        for row_offset, row in enumerate(batch, start=offset):
+            try:
+                if isinstance(row, InvalidRow):
+                    raise row
+                if not isinstance(row, dict):
+                    raise InvalidRow("not an object")
+                complaints.append(self.build_one(row, users, wards, now))
+            except InvalidRow as error:
+                errors.append((row_offset, str(error)))
+        return complaints, errors
+
+    def build_one(self, row, users, wards, now):
+        user = users.get(text(row, "user").lower()) or self.default_user
+        if user is None:
+            raise InvalidRow(f"unknown user {row.get('user')!r}")
+
+        issue_type = (text(row, "issue_type") or "other").lower()
+        if issue_type not in ISSUE_TYPES:
+            raise InvalidRow(f"unknown issue_type {issue_type!r}")
+        status = (text(row, "status") or "pending").lower()
+        if status not in STATUSES:
+            raise InvalidRow(f"unknown status {status!r}")
+
+        description = text(row, "description")
+        if not description:
+            raise InvalidRow("description is required")
+
+        created_at = parse_timestamp(text(row, "created_at"), "created_at") or now
+        resolved_at = parse_timestamp(text(row, "resolved_at"), "resolved_at")
+        if status == "resolved":
+            resolved_at = resolved_at or created_at
+            if resolved_at < created_at:
+                raise InvalidRow("resolved_at is before created_at")
+        else:
+            resolved_at = None
+
+        latitude = parse_coordinate(row.get("latitude"), "latitude", 90)
+        longitude = parse_coordinate(row.get("longitude"), "longitude", 180)
+
+        ward_number = (
+            text(row, "ward_number")
+            or WARD_BY_LOCALITY.get(text(row, "locality").lower())
+            or wards.get(user.pk, "")
+        )
+
+        # geohash and the SLA columns are filled in by bulk_create_historical().
+        return Complaint(
+            user=user,
+            title=text(row, "title")[:200] or issue_type.title(),
+            description=description,
+            issue_type=issue_type,
+            status=status,
+            landmark=text(row, "landmark")[:200],
+            ward_number=ward_number,
+            latitude=latitude,
+            longitude=longitude,
+            created_at=created_at,
+            resolved_at=resolved_at,
+        )
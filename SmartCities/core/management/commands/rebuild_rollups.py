@@ -0,0 +1,89 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+
+from core.models import Complaint, ComplaintRollup
+from core.stats import invalidate_landing_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the ComplaintRollup table from scratch: a one-off backfill, or a repair "
+        "should the counters drift. Complaint writes wait until it finishes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10000,
+            help="Number of complaint ids aggregated per query (default: 10000).",
+        )
+
+    def handle(self, *args, **options):
+        # The count and the swap are one transaction, with complaint writes
+        # held off: each of those moves the rollup in its own transaction,
+        # so none can land between the two and be lost or counted twice.
+        with transaction.atomic():
+            self.lock_complaints()
+            rollups = self.count(options["batch_size"])
+            ComplaintRollup.objects.all().delete()
+            ComplaintRollup.objects.bulk_create(rollups, batch_size=1000)
+        invalidate_landing_stats()
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(rollups)} rollup rows."))
+
+    def lock_complaints(self):
+        if connection.vendor == "postgresql":
+            # Waits for the writes in progress; new ones wait for the commit.
+            with connection.cursor() as cursor:
+                cursor.execute(f"LOCK TABLE {connection.ops.quote_name(Complaint._meta.db_table)} IN SHARE MODE")
+        else:
+            # SQLite has one writer at a time: writing first takes the lock.
+            ComplaintRollup.objects.all().delete()
+
+    def count(self, batch_size) -> list:
+        bounds = Complaint.objects.aggregate(low=Min("pk"), high=Max("pk"))
+
+        totals = defaultdict(lambda: {
+            "created": 0,
+            "resolved": 0,
+            "breached": 0,
+            "resolution_seconds": 0,
+        })
+
+        resolution_time = ExpressionWrapper(
+            F("resolved_at") - F("created_at"),
+            output_field=DurationField(),
+        )
+
+        if bounds["low"] is not None:
+            for start in range(bounds["low"], bounds["high"] + 1, batch_size):
+                rows = (
+                    Complaint.objects
+                    .filter(pk__gte=start, pk__lt=start + batch_size)
+                    .annotate(day=TruncDate("created_at"))
+                    .values("ward_number", "issue_type", "day")
+                    .annotate(
+                        created=Count("pk"),
+                        resolved=Count("pk", filter=Q(status="resolved")),
+                        breached=Count("pk", filter=Q(sla_breached_at__isnull=False)),
+                        resolution=Sum(resolution_time, filter=Q(status="resolved")),
+                    )
+                    .order_by()
+                )
+                for row in rows:
+                    bucket = totals[(row["ward_number"], row["issue_type"], row["day"])]
+                    bucket["created"] += row["created"]
+                    bucket["resolved"] += row["resolved"]
+                    bucket["breached"] += row["breached"]
+                    if row["resolution"] is not None:
+                        bucket["resolution_seconds"] += int(row["resolution"].total_seconds())
+
+        return [
+            ComplaintRollup(ward_number=ward_number, issue_type=issue_type, day=day, **counts)
+            for (ward_number, issue_type, day), counts in totals.items()
+        ]
@@ -0,0 +1,74 @@
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.tasks import claim_tasks, prune_tasks, run_task
+
+# Seconds between deletions of old finished tasks.
+PRUNE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = "Run queued core.tasks jobs until stopped (SIGTERM/SIGINT finishes the current batch)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=2, help="Worker threads (default: 2).")
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait when the queue is empty (default: 2).",
+        )
+        parser.add_argument(
+            "--burst",
+            action="store_true",
+            help="Exit once no task is due instead of polling.",
+        )
+
+    def handle(self, *args, **options):
+        concurrency = options["concurrency"]
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        stopping = threading.Event()
+
+        def stop(signum, frame):
+            self.stdout.write("Stopping after the current batch...")
+            stopping.set()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        processed = 0
+        pruned_at = None
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="task") as pool:
+            while not stopping.is_set():
+                if pruned_at is None or time.monotonic() - pruned_at >= PRUNE_INTERVAL:
+                    pruned = prune_tasks()
+                    if pruned:
+                        self.stdout.write(f"Deleted {pruned} finished tasks.")
+                    pruned_at = time.monotonic()
+
+                claimed = claim_tasks(worker_id, concurrency)
+                if not claimed:
+                    if options["burst"]:
+                        break
+                    stopping.wait(options["poll_interval"])
+                    continue
+
+                wait([pool.submit(self.run_one, queued) for queued in claimed])
+                processed += len(claimed)
+
+        self.stdout.write(self.style.SUCCESS(f"Worker {worker_id} ran {processed} tasks."))
+
+    def run_one(self, queued):
+        # Each pool thread keeps its own connection; drop it if it broke.
+        close_old_connections()
+        try:
+            run_task(queued)
+        finally:
+            close_old_connections()
@@ -0,0 +1,48 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.analytics import invalidate_analytics
+from core.models import UserProfile
+from core.seeding import seed_complaints, seed_users
+from core.stats import invalidate_landing_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with synthetic citizens and complaints for load testing. "
+        "Use a scratch database: the rows are not marked and are not removed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100, help="Citizens to create (0: use existing users).")
+        parser.add_argument("--complaints", type=int, default=1000)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        started = time.monotonic()
+
+        if options["users"]:
+            users = seed_users(options["users"], rng, batch_size=options["batch_size"])
+            self.stdout.write(f"Created {len(users)} users.")
+        else:
+            users = list(UserProfile.objects.values_list("user_id", "ward_number"))
+            if not users:
+                raise CommandError("No users to file complaints under; pass --users.")
+
+        def progress(inserted):
+            rate = inserted / (time.monotonic() - started)
+            self.stdout.write(f"  {inserted} complaints ({rate:.0f}/s)")
+
+        seed_complaints(
+            users, options["complaints"], rng,
+            batch_size=options["batch_size"], progress=progress,
+        )
+        invalidate_landing_stats()
+        invalidate_analytics()
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {options['complaints']} complaints in {time.monotonic() - started:.1f}s."
+        ))
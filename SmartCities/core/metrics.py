@@ -0,0 +1,160 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# name -> (help text, bucket upper bounds). +Inf is implied.
+HISTOGRAMS = {
+    'smartcities_request_duration_seconds': (
+        'Request latency by URL name.',
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ),
+    'smartcities_request_queries': (
+        'Database queries per request by URL name.',
+        (1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+    ),
+}
+# Seconds between writes of a worker's counts to METRICS_DIR.
+FLUSH_INTERVAL = 1.0
+
+
+class MetricsStore:
+    """
+    Histogram counts of this process, keyed by metric then view name as
+    [bucket counts..., +Inf count, sum]. With a ``directory`` each process
+    writes its counts to its own file there and snapshot() adds up every
+    file, so a scrape that lands on any gunicorn worker sees all of them.
+    Files of exited workers are kept: their counts are part of the totals.
+    """
+
+    def __init__(self, directory=''):
+        self.directory = Path(directory) if directory else None
+        if self.directory:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        self.counts = {name: {} for name in HISTOGRAMS}
+        self.flushed_at = 0.0
+        # Unique per process start: a reused pid must not overwrite the
+        # file of the process that had it before.
+        self.filename = f'{self.pid}-{uuid.uuid4().hex[:8]}.json'
+
+    def observe(self, name, view, value):
+        _, bounds = HISTOGRAMS[name]
+        with self.lock:
+            if os.getpid() != self.pid:
+                # Forked after import: the parent's counts are not ours.
+                self.reset()
+            row = self.counts[name].setdefault(view, [0] * (len(bounds) + 2))
+            for index, bound in enumerate(bounds):
+                if value <= bound:
+                    row[index] += 1
+                    break
+            else:
+                row[len(bounds)] += 1
+            row[-1] += value
+        if self.directory and time.monotonic() - self.flushed_at >= FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        if not self.directory:
+            return
+        with self.lock:
+            data = json.dumps(self.counts)
+            self.flushed_at = time.monotonic()
+        temporary = self.directory / f'.{self.filename}.{threading.get_ident()}.tmp'
+        try:
+            temporary.write_text(data)
+            # Atomic, so a scrape never reads half a file.
+            os.replace(temporary, self.directory / self.filename)
+        except OSError:
+            logger.warning('Could not write metrics to %s', self.directory, exc_info=True)
+
+    def snapshot(self) -> dict:
+        """Counts of every process sharing the directory (or just this one)."""
+        if not self.directory:
+            with self.lock:
+                return json.loads(json.dumps(self.counts))
+
+        self.flush()
+        totals = {name: {} for name in HISTOGRAMS}
+        for path in self.directory.glob('*.json'):
+            try:
+                counts = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            for name, views in counts.items():
+                if name not in totals:
+                    continue
+                for view, row in views.items():
+                    total = totals[name].setdefault(view, [0] * len(row))
+                    for index, value in enumerate(row):
+                        total[index] += value
+        return totals
+
+
+_store = None
+
+
+def get_store() -> MetricsStore:
+    global _store
+    if _store is None or _store.directory != (Path(settings.METRICS_DIR) if settings.METRICS_DIR else None):
+        _store = MetricsStore(settings.METRICS_DIR)
+    return _store
+
+
+@atexit.register
+def _flush_at_exit():
+    # Counts since the last flush would otherwise go with the worker.
+    if _store is not None:
+        _store.flush()
+
+
+def observe_request(view, seconds, queries) -> None:
+    store = get_store()
+    store.observe('smartcities_request_duration_seconds', view, seconds)
+    store.observe('smartcities_request_queries', view, queries)
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render_metrics(gauges) -> str:
+    """
+    Prometheus text exposition of the request histograms plus ``gauges``,
+    a list of (name, help text, value).
+    """
+    lines = []
+    for name, counts in get_store().snapshot().items():
+        help_text, bounds = HISTOGRAMS[name]
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for view in sorted(counts):
+            row = counts[view]
+            label = f'view="{_label(view)}"'
+            cumulative = 0
+            for bound, count in zip((*bounds, '+Inf'), row):
+                cumulative += count
+                le = bound if bound == '+Inf' else _number(bound)
+                lines.append(f'{name}_bucket{{{label},le="{le}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{label}}} {_number(row[-1])}')
+            lines.append(f'{name}_count{{{label}}} {cumulative}')
+
+    for name, help_text, value in gauges:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} gauge', f'{name} {_number(value)}']
+    return '\n'.join(lines) + '\n'
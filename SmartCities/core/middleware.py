@@ -0,0 +1,138 @@
+import logging
+import random
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth.middleware import get_user
+from django.db import connections
+from django.utils.functional import SimpleLazyObject
+
+from .metrics import observe_request
+from .models import UserProfile
+from .routers import STICKY_COOKIE, RoutingState, current_routing
+from .timing import RequestTimings, current_timings
+
+timing_logger = logging.getLogger('core.timing')
+
+
+def attach_profile(user):
+    """Copy the profile fields the templates read (user.role, user.name, ...) onto ``user``."""
+    if not user.is_authenticated:
+        return user
+
+    try:
+        profile = user.profile
+    except UserProfile.DoesNotExist:
+        # Accounts created before profiles were made on sign-up. Reads never
+        # write: the profile is only saved if the user edits their settings.
+        profile = UserProfile(user=user, name=user.get_full_name() or user.get_username())
+        user.profile = profile
+
+    user.name = profile.name or user.get_full_name() or user.get_username()
+    user.role = profile.role
+    user.locality = profile.locality
+    user.ward_number = profile.ward_number
+    user.mobile = profile.mobile
+    user.age = profile.age
+    return user
+
+
+class ProfileMiddleware:
+    """
+    Resolve request.user with its profile attached, lazily and once per
+    request. Must come after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.user = SimpleLazyObject(lambda: attach_profile(get_user(request)))
+        return self.get_response(request)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Track the database writes of each request for PrimaryReplicaRouter.
+    A response to a request that wrote carries a cookie that keeps its
+    browser reading from the primary for REPLICA_STICKY_SECONDS. Goes
+    before SessionMiddleware so session saves count as writes.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RoutingState(sticky=STICKY_COOKIE in request.COOKIES)
+        token = current_routing.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_routing.reset(token)
+
+        if state.wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                STICKY_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+class RequestTimingMiddleware:
+    """
+    Record the query count, SQL time, slowest query and template time of
+    every request and add its latency and query count to core.metrics.
+    Requests that took REQUEST_TIMING_SLOW_MS or more always get a
+    Server-Timing header and a core.timing WARNING line; a
+    REQUEST_TIMING_SAMPLE_RATE share of the others get the header and an
+    INFO line. Goes first in MIDDLEWARE so the total covers the other
+    middleware too.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings.record_query))
+                response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+
+        # Streamed bodies run their queries after this point; the numbers
+        # only cover what ran before the first byte.
+        match = request.resolver_match
+        observe_request(match.view_name if match else 'unmatched', timings.elapsed(), timings.query_count)
+
+        total_ms = timings.elapsed() * 1000
+        slow = total_ms >= settings.REQUEST_TIMING_SLOW_MS
+        if slow or random.random() < settings.REQUEST_TIMING_SAMPLE_RATE:
+            response['Server-Timing'] = timings.server_timing()
+            self.log(request, response, timings, total_ms, slow)
+        return response
+
+    def log(self, request, response, timings, total_ms, slow):
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 1),
+            'queries': timings.query_count,
+            'sql_ms': round(timings.sql_seconds * 1000, 1),
+            'template_ms': round(timings.template_seconds * 1000, 1),
+            'slowest_sql_ms': round(timings.slowest_seconds * 1000, 1),
+        }
+        if slow:
+            fields['slowest_sql'] = timings.slowest_sql[:500]
+        timing_logger.log(
+            logging.WARNING if slow else logging.INFO,
+            ' '.join(f'{key}={value}' for key, value in fields.items()),
+            extra={'timing': fields},
+        )
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:41
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_ward_number(apps, schema_editor):
+    Complaint = apps.get_model('core', 'Complaint')
+    UserProfile = apps.get_model('core', 'UserProfile')
+
+    profile_ward = UserProfile.objects.filter(
+        user_id=OuterRef('user_id')
+    ).values('ward_number')[:1]
+    Complaint.objects.update(
+        ward_number=Coalesce(Subquery(profile_ward), Value(''))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_alter_complaint_landmark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ward_number', models.CharField(blank=True, default='', max_length=50)),
+                ('issue_type', models.CharField(max_length=50)),
+                ('day', models.DateField()),
+                ('created', models.PositiveIntegerField(default=0)),
+                ('resolved', models.PositiveIntegerField(default=0)),
+                ('breached', models.PositiveIntegerField(default=0)),
+                ('resolution_seconds', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='ward_number',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.RunPython(backfill_ward_number, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='complaintrollup',
+            constraint=models.UniqueConstraint(fields=('ward_number', 'issue_type', 'day'), name='unique_complaint_rollup'),
+        ),
+    ]
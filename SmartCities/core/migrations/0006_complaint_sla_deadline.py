@@ -0,0 +1,62 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:43
+
+from datetime import timedelta
+
+from django.db import migrations, models, transaction
+from django.db.models import F, Max, Min
+
+# Frozen copy of Complaint.SLA_TIERS at the time of this migration.
+SLA_TIERS = {
+    'garbage': 24,
+    'streetlight': 48,
+    'pothole': 72,
+    'other': 72,
+}
+DEFAULT_SLA_HOURS = 72
+CHUNK_SIZE = 5000
+
+
+def backfill_sla_columns(apps, schema_editor):
+    Complaint = apps.get_model('core', 'Complaint')
+    bounds = Complaint.objects.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return
+
+    for start in range(bounds['low'], bounds['high'] + 1, CHUNK_SIZE):
+        with transaction.atomic():
+            chunk = Complaint.objects.filter(pk__gte=start, pk__lt=start + CHUNK_SIZE)
+            for issue_type, hours in SLA_TIERS.items():
+                chunk.filter(issue_type=issue_type).update(
+                    sla_deadline=F('created_at') + timedelta(hours=hours)
+                )
+            chunk.exclude(issue_type__in=SLA_TIERS).update(
+                sla_deadline=F('created_at') + timedelta(hours=DEFAULT_SLA_HOURS)
+            )
+            # Pending breaches are left for sweep_sla_breaches to flag.
+            chunk.filter(
+                status='resolved',
+                resolved_at__gt=F('sla_deadline'),
+            ).update(sla_breached_at=F('resolved_at'))
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0005_complaint_ward_number_complaintrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='sla_breached_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='sla_deadline',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(backfill_sla_columns, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_complaint_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['latitude', 'longitude'], name='complaint_lat_lng_idx'),
+        ),
+    ]
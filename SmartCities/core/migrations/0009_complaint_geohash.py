@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:48
+
+from django.db import migrations, models, transaction
+
+from core.geo import geohash_encode
+
+CHUNK_SIZE = 2000
+
+
+def backfill_geohash(apps, schema_editor):
+    Complaint = apps.get_model('core', 'Complaint')
+    located = Complaint.objects.filter(
+        latitude__isnull=False, longitude__isnull=False
+    ).order_by('pk')
+
+    last_pk = 0
+    while True:
+        chunk = list(
+            located.filter(pk__gt=last_pk).only('pk', 'latitude', 'longitude')[:CHUNK_SIZE]
+        )
+        if not chunk:
+            break
+        for complaint in chunk:
+            complaint.geohash = geohash_encode(complaint.latitude, complaint.longitude)
+        with transaction.atomic():
+            Complaint.objects.bulk_update(chunk, ['geohash'])
+        last_pk = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0008_complaint_lat_lng_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=12),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_complaint_geohash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='report_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_complaint_report_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['ward_number', 'created_at'], name='complaint_ward_created_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def create_missing_profiles(apps, schema_editor):
+    # Profiles used to be created on the first authenticated request; they
+    # are now created with the account, so backfill the accounts that never
+    # made a request.
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    UserProfile = apps.get_model('core', 'UserProfile')
+    UserProfile.objects.bulk_create(
+        [
+            UserProfile(
+                user=user,
+                name=f'{user.first_name} {user.last_name}'.strip() or user.username,
+            )
+            for user in User.objects.filter(profile__isnull=True).iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_complaint_ward_created_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_profiles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_create_missing_profiles'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
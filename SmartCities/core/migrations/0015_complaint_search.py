@@ -0,0 +1,30 @@
+from django.db import migrations
+
+from core.search import install_search_index, remove_search_index
+
+
+# The index lives outside Django's model state. On Postgres it is a
+# generated search_vector column added with a raw ALTER TABLE, which the
+# Complaint model does not declare: a later migration that alters title,
+# description or landmark must call remove_search_index() before its
+# AlterField and install_search_index() after it, or Postgres refuses the
+# change (or drops the column along with a dropped field). On SQLite,
+# migrations that rebuild core_complaint drop the FTS triggers; the
+# post_migrate hook puts them back.
+def install(apps, schema_editor):
+    install_search_index(schema_editor.connection)
+
+
+def remove(apps, schema_editor):
+    remove_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_task'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, remove),
+    ]
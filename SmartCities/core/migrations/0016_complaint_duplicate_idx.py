@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 12:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_complaint_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['status', 'issue_type', 'geohash', 'created_at'], name='complaint_duplicate_idx'),
+        ),
+    ]
@@ -1,8 +1,278 @@
-from django.db import models
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import connections, models, router, transaction
 from django.conf import settings
+from django.db.models import Case, When, Value, F, Func, ExpressionWrapper, Q
+from django.db.models.functions import Coalesce, Greatest, Now
 
 from django.utils import timezone
 
+from .geo import covering_geohashes, geohash_encode, geohash_prefix_q, haversine_expression, radius_bbox
+from .search import SearchMatch, SearchRank, search_terms
+
+
+class HoursBetween(Func):
+    """Whole hours in a DurationField expression, truncated like ``timedelta // 3600``."""
+    output_field = models.IntegerField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        # SQLite and MySQL hand durations back as microsecond integers.
+        return super().as_sql(
+            compiler, connection,
+            template='CAST((%(expressions)s) / 3600000000 AS INTEGER)',
+            **extra_context
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection,
+            template='FLOOR(EXTRACT(EPOCH FROM (%(expressions)s)) / 3600)::integer',
+            **extra_context
+        )
+
+
+class SecondsBetween(Func):
+    """Seconds, with fractions, in a DurationField expression."""
+    output_field = models.FloatField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection,
+            template='((%(expressions)s) / 1000000.0)',
+            **extra_context
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection,
+            template='EXTRACT(EPOCH FROM (%(expressions)s))::double precision',
+            **extra_context
+        )
+
+
+class ComplaintQuerySet(models.QuerySet):
+    def with_sla(self):
+        """
+        Annotate SLA fields computed by the database:
+        sla_window_hours, hours_open, sla_state and hours_overdue.
+        They mirror the sla_hours, hours_pending, sla_status and
+        sla_hours_overdue properties so counts can be done with filter().
+        Breach state is read from the stored sla_deadline column.
+        """
+        sla_window = Case(
+            *[
+                When(issue_type=issue_type, then=Value(hours))
+                for issue_type, hours in Complaint.SLA_TIERS.items()
+            ],
+            default=Value(Complaint.DEFAULT_SLA_HOURS),
+            output_field=models.IntegerField(),
+        )
+        end_time = Coalesce('resolved_at', Now())
+        elapsed = ExpressionWrapper(
+            end_time - F('created_at'),
+            output_field=models.DurationField(),
+        )
+
+        return self.annotate(
+            sla_window_hours=sla_window,
+            hours_open=HoursBetween(elapsed),
+            sla_end_time=end_time,
+        ).annotate(
+            sla_state=Case(
+                When(sla_deadline__lt=F('sla_end_time'), then=Value('breached')),
+                When(status='resolved', then=Value('resolved')),
+                default=Value('active'),
+                output_field=models.CharField(),
+            ),
+            hours_overdue=Case(
+                When(
+                    sla_deadline__lt=F('sla_end_time'),
+                    then=F('hours_open') - F('sla_window_hours'),
+                ),
+                default=Value(0),
+                output_field=models.IntegerField(),
+            ),
+        )
+
+    def sla_breached(self):
+        return self.with_sla().filter(sla_state='breached')
+
+    def near(self, lat, lng, radius_m, **filters):
+        """
+        Complaints within ``radius_m`` metres of (lat, lng), and matching
+        the equality ``filters``, annotated with ``distance_m``. Candidates
+        are narrowed to the covering geohash cells through the geohash
+        indexes before the exact haversine check.
+        """
+        prefixes = covering_geohashes(radius_bbox(lat, lng, radius_m))
+        return (
+            self.filter(geohash_prefix_q(prefixes, **filters))
+            .annotate(distance_m=haversine_expression(lat, lng))
+            .filter(distance_m__lte=radius_m)
+        )
+
+    def find_duplicate(self, issue_type, lat, lng, radius_m=None, window_hours=None):
+        """
+        The closest pending complaint of ``issue_type`` filed within the
+        duplicate radius and time window, or None.
+        """
+        radius_m = radius_m or settings.COMPLAINT_DUPLICATE_RADIUS_M
+        window_hours = window_hours or settings.COMPLAINT_DUPLICATE_WINDOW_HOURS
+        since = timezone.now() - timedelta(hours=window_hours)
+
+        return (
+            self.near(lat, lng, radius_m, status='pending', issue_type=issue_type)
+            .filter(created_at__gte=since)
+            .order_by('distance_m', 'pk')
+            .first()
+        )
+
+    def _lock_report_cells(self, issue_type, lat, lng) -> None:
+        """
+        On Postgres, hold a transaction-level advisory lock on the geohash
+        cells around (lat, lng), so that two reports of the same issue close
+        to each other are handled one after the other.
+        """
+        connection = connections[router.db_for_write(self.model)]
+        if connection.vendor != 'postgresql':
+            return
+        radius = settings.COMPLAINT_DUPLICATE_RADIUS_M
+        keys = sorted(
+            f'complaint-report:{issue_type}:{prefix}'
+            for prefix in covering_geohashes(radius_bbox(lat, lng, radius))
+        )
+        with connection.cursor() as cursor:
+            # Taken in sorted order, so overlapping cell sets cannot deadlock.
+            cursor.execute(
+                'SELECT pg_advisory_xact_lock(hashtext(key)) FROM unnest(%s::text[]) AS key ORDER BY key',
+                [keys],
+            )
+
+    def report(self, **fields):
+        """
+        Record a citizen report. A pending duplicate nearby gets a +1 on its
+        report_count instead of a new row. Returns (complaint, created).
+        """
+        lat = fields.get('latitude')
+        lng = fields.get('longitude')
+        if lat is None or lng is None:
+            return self.create(**fields), True
+
+        issue_type = fields.get('issue_type', 'other')
+        with transaction.atomic():
+            self._lock_report_cells(issue_type, lat, lng)
+            # Locked, so the duplicate cannot be resolved under us.
+            duplicate = self.select_for_update().find_duplicate(issue_type, lat, lng)
+            if duplicate is not None:
+                self.filter(pk=duplicate.pk).update(
+                    report_count=F('report_count') + 1, updated_at=timezone.now(),
+                )
+                duplicate.report_count += 1
+                return duplicate, False
+            return self.create(**fields), True
+
+    def filter_sla(self, sla, now=None):
+        """
+        Filter by SLA state ('active', 'resolved' or 'breached') using the
+        stored deadline and breach columns, so the filter can use indexes.
+        """
+        now = now or timezone.now()
+        if sla == 'active':
+            return self.filter(status='pending', sla_deadline__gte=now)
+        if sla == 'resolved':
+            return self.filter(status='resolved', sla_breached_at__isnull=True)
+        if sla == 'breached':
+            return self.filter(
+                Q(status='pending', sla_deadline__lt=now)
+                | Q(status='resolved', sla_breached_at__isnull=False)
+            )
+        return self
+
+    def apply_filters(self, status=None, issue_type=None, sla=None, ward_number=None):
+        """Apply the complaint list filters; empty values are ignored."""
+        complaints_qs = self
+        if status:
+            complaints_qs = complaints_qs.filter(status=status)
+        if issue_type:
+            complaints_qs = complaints_qs.filter(issue_type=issue_type)
+        if ward_number:
+            complaints_qs = complaints_qs.filter(ward_number=ward_number)
+        if sla:
+            complaints_qs = complaints_qs.filter_sla(sla)
+        return complaints_qs
+
+    def search(self, text):
+        """
+        Complaints containing every word of ``text``, found through the
+        full-text index (a tsvector on Postgres, FTS5 on SQLite) and
+        annotated with search_rank, higher for better matches. Filter
+        before searching: only filters applied already count towards
+        MAX_SEARCH_MATCHES.
+        """
+        terms = search_terms(text)
+        if not terms:
+            return self.none()
+        searched = self._chain()
+        # The filters are checked inside SearchMatch; left on the outer query
+        # too, they make the database scan every complaint they accept
+        # rather than look up the matches by primary key.
+        searched.query.clear_where()
+        return searched.filter(SearchMatch(terms, self)).annotate(search_rank=SearchRank(terms, self))
+
+    def sort_by(self, sort):
+        """Order by one of Complaint.SORT_ORDERS, newest first by default."""
+        ordering = Complaint.SORT_ORDERS.get(sort, Complaint.SORT_ORDERS['recent'])
+        if sort == 'relevance' and 'search_rank' not in self.query.annotations:
+            # Relevance needs a search(); without one it means newest first.
+            ordering = Complaint.SORT_ORDERS['recent']
+        complaints_qs = self
+        if 'sla_rank' in ordering:
+            complaints_qs = complaints_qs.annotate(sla_rank=Case(
+                When(status='pending', then=Value(0)),
+                default=Value(1),
+                output_field=models.IntegerField(),
+            ))
+        return complaints_qs.order_by(*ordering)
+
+    def pending_past_deadline(self, now=None):
+        """Pending complaints whose SLA deadline has passed (an index range scan)."""
+        return self.filter(status='pending', sla_deadline__lt=now or timezone.now())
+
+    def watermark(self) -> dict:
+        """
+        Row count and latest updated_at in one aggregate query: it changes
+        whenever a complaint in the set is added, deleted or written to.
+        """
+        return self.order_by().aggregate(
+            count=models.Count('pk'),
+            updated=models.Max('updated_at'),
+        )
+
+    def bulk_create_historical(self, complaints, batch_size=None):
+        """
+        bulk_create for imported or generated complaints: keeps each one's
+        own created_at, fills in the columns save() would derive, and adds
+        the complaints to ComplaintRollup. Call inside a transaction.
+        """
+        for complaint in complaints:
+            complaint.created_at = complaint.created_at or timezone.now()
+            if complaint.status == 'resolved' and not complaint.resolved_at:
+                complaint.resolved_at = complaint.created_at
+            complaint.geohash = (
+                geohash_encode(complaint.latitude, complaint.longitude)
+                if complaint.latitude is not None and complaint.longitude is not None
+                else ''
+            )
+            complaint.sla_deadline = Complaint.deadline_for(complaint.issue_type, complaint.created_at)
+            if complaint.resolved_at and complaint.resolved_at > complaint.sla_deadline:
+                complaint.sla_breached_at = complaint.resolved_at
+
+        created = self.bulk_create(complaints, batch_size=batch_size)
+        ComplaintRollup.record_many(created)
+        return created
+
+
 class Complaint(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -21,6 +291,24 @@ class Complaint(models.Model):
         'pothole': 72,
         'other': 72,
     }
+    DEFAULT_SLA_HOURS = 72
+
+    SLA_STATE_CHOICES = [
+        ('active', 'Within SLA'),
+        ('resolved', 'Resolved'),
+        ('breached', 'Breached'),
+    ]
+    SORT_ORDERS = {
+        'recent': ('-created_at', '-id'),
+        'oldest': ('created_at', 'id'),
+        # Pending first, most overdue at the top.
+        'sla_breach': ('sla_rank', 'sla_deadline', '-id'),
+        'relevance': ('-search_rank', '-id'),
+    }
+
+    IMAGE_FIELDS = ('before_image', 'after_image')
+
+    objects = ComplaintQuerySet.as_manager()
 
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -38,8 +326,10 @@ class Complaint(models.Model):
     )
 
     landmark = models.CharField(max_length=200, blank=True)
+    ward_number = models.CharField(max_length=50, blank=True, default='')
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, default='', db_index=True)
 
     status = models.CharField(
         max_length=20,
@@ -58,18 +348,115 @@ class Complaint(models.Model):
         null=True
     )
 
-    created_at = models.DateTimeField(auto_now_add=True)
+    report_count = models.PositiveIntegerField(default=1)
+    # {'before_image': {'source': <original name>, 'thumb': <name>, 'medium': <name>}, ...}
+    # filled in by core.images after upload.
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
+
+    # A default rather than auto_now_add, which would overwrite the
+    # timestamps of imported complaints in bulk_create().
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     resolved_at = models.DateTimeField(null=True, blank=True)
 
+    sla_deadline = models.DateTimeField(null=True, blank=True, db_index=True)
+    sla_breached_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    # Set by save() and by every update() of a complaint, for the API ETags
+    # (watermark()); update() calls must set it themselves.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='complaint_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='complaint_status_created_idx'),
+            models.Index(fields=['user', 'created_at'], name='complaint_user_created_idx'),
+            models.Index(
+                fields=['issue_type', 'status', 'created_at'],
+                name='complaint_type_status_idx',
+            ),
+            models.Index(fields=['status', 'sla_deadline'], name='complaint_status_sla_idx'),
+            models.Index(fields=['latitude', 'longitude'], name='complaint_lat_lng_idx'),
+            models.Index(fields=['ward_number', 'created_at'], name='complaint_ward_created_idx'),
+            # Duplicate checks: the equalities first, then the geohash cell
+            # ranges. Led by geohash, planners take complaint_type_status_idx instead.
+            models.Index(
+                fields=['status', 'issue_type', 'geohash', 'created_at'],
+                name='complaint_duplicate_idx',
+            ),
+        ]
+
+    @classmethod
+    def deadline_for(cls, issue_type, created_at):
+        """SLA deadline for a complaint of ``issue_type`` created at ``created_at``."""
+        return created_at + timedelta(
+            hours=cls.SLA_TIERS.get(issue_type, cls.DEFAULT_SLA_HOURS)
+        )
+
     def save(self, *args, **kwargs):
-        if self.status == 'resolved' and not self.resolved_at:
-            self.resolved_at = timezone.now()
-        super().save(*args, **kwargs)
+        if self._state.adding and not self.ward_number:
+            self.ward_number = (
+                UserProfile.objects.filter(user_id=self.user_id)
+                .values_list('ward_number', flat=True)
+                .first()
+            ) or ''
+
+        self.geohash = (
+            geohash_encode(self.latitude, self.longitude)
+            if self.latitude is not None and self.longitude is not None
+            else ''
+        )
+
+        with transaction.atomic():
+            stored = None
+            if not self._state.adding:
+                # Locked (where the database can) so that a concurrent save
+                # or sweep of this row waits and is counted once.
+                stored = (
+                    Complaint.objects.select_for_update()
+                    .only(*ComplaintRollup.COMPLAINT_FIELDS)
+                    .filter(pk=self.pk)
+                    .first()
+                )
+
+            if self.status == 'resolved' and not self.resolved_at:
+                self.resolved_at = (stored and stored.resolved_at) or timezone.now()
+            self.sla_deadline = self.deadline_for(
+                self.issue_type, self.created_at or timezone.now()
+            )
+
+            if stored is None:
+                super().save(*args, **kwargs)
+            else:
+                # sla_breached_at is only ever set by the sweeper and the
+                # conditional update below: an instance loaded before either
+                # ran would otherwise put it back to NULL.
+                self.sla_breached_at = stored.sla_breached_at
+                kwargs['update_fields'] = [
+                    name for name in kwargs.get('update_fields') or [
+                        field.name for field in self._meta.concrete_fields if not field.primary_key
+                    ]
+                    if name not in ('sla_breached_at', 'updated_at')
+                ] + ['updated_at']
+                super().save(*args, **kwargs)
+            ComplaintRollup.move(stored, self)
+
+            if (
+                self.status == 'resolved' and not self.sla_breached_at
+                and self.resolved_at > self.sla_deadline
+            ):
+                flagged = Complaint.objects.filter(
+                    pk=self.pk, sla_breached_at__isnull=True
+                ).update(sla_breached_at=self.resolved_at, updated_at=self.updated_at)
+                if flagged:
+                    self.sla_breached_at = self.resolved_at
+                    ComplaintRollup.bump(*ComplaintRollup.bucket_of(self), breached=1)
+                else:
+                    # Flagged, and counted, by a sweep in the meantime.
+                    self.refresh_from_db(fields=['sla_breached_at'])
 
     @property
     def sla_hours(self) -> int:
         """Return SLA hours based on issue type"""
-        return self.SLA_TIERS.get(self.issue_type, 72)
+        return self.SLA_TIERS.get(self.issue_type, self.DEFAULT_SLA_HOURS)
 
     @property
     def hours_pending(self) -> int:
@@ -80,12 +467,19 @@ class Complaint(models.Model):
 
     @property
     def sla_status(self) -> str:
-        if self.status == 'resolved':
-            return 'breached' if self.hours_pending > self.sla_hours else 'resolved'
+        deadline = self.sla_deadline or self.deadline_for(self.issue_type, self.created_at)
+        end_time = self.resolved_at or timezone.now()
 
-        return 'breached' if self.hours_pending > self.sla_hours else 'active'
+        if end_time > deadline:
+            return 'breached'
+        return 'resolved' if self.status == 'resolved' else 'active'
 
 
+    @property
+    def sla_bucket(self) -> str:
+        """What a complaint card shows of the SLA; it changes at most hourly."""
+        return f'{self.sla_status}:{self.hours_pending}'
+
     @property
     def sla_hours_remaining(self):
         if self.status != 'pending':
@@ -95,8 +489,8 @@ class Complaint(models.Model):
 
     @property
     def sla_hours_overdue(self):
-        if self.hours_pending > self.sla_hours:
-            return self.hours_pending - self.sla_hours
+        if self.sla_status == 'breached':
+            return max(0, self.hours_pending - self.sla_hours)
         return 0
 
     @property
@@ -113,6 +507,40 @@ class Complaint(models.Model):
         delta = self.resolved_at - self.created_at
         return round(delta.total_seconds() / 3600, 2)
 
+    def pending_renditions(self) -> list:
+        """Image fields whose renditions are missing or were made from an older upload."""
+        return [
+            field for field in self.IMAGE_FIELDS
+            if getattr(self, field)
+            and self.renditions.get(field, {}).get('source') != getattr(self, field).name
+        ]
+
+    def rendition_url(self, field, size) -> str:
+        """URL of a rendition of ``field``, or of the original while it is being made."""
+        image = getattr(self, field)
+        if not image:
+            return ''
+        rendition = self.renditions.get(field, {})
+        if rendition.get('source') == image.name and size in rendition:
+            return image.storage.url(rendition[size])
+        return image.url
+
+    @property
+    def before_thumb_url(self) -> str:
+        return self.rendition_url('before_image', 'thumb')
+
+    @property
+    def before_medium_url(self) -> str:
+        return self.rendition_url('before_image', 'medium')
+
+    @property
+    def after_thumb_url(self) -> str:
+        return self.rendition_url('after_image', 'thumb')
+
+    @property
+    def after_medium_url(self) -> str:
+        return self.rendition_url('after_image', 'medium')
+
     def __str__(self):
         return f"{self.issue_type.upper()} | {self.title}"
 
@@ -132,4 +560,187 @@ class UserProfile(models.Model):
     age = models.PositiveIntegerField(null=True, blank=True)
 
     def __str__(self) -> str:
-        return self.name or self.user.get_username()
\ No newline at end of file
+        return self.name or self.user.get_username()
+
+
+class ComplaintRollupQuerySet(models.QuerySet):
+    def watermark(self) -> dict:
+        """
+        Totals of the counters in one aggregate over the rollup, whose size
+        follows wards and days rather than complaints. They change whenever
+        a complaint is added, deleted, resolved, re-opened or flagged as
+        breached: the city-wide counterpart of ComplaintQuerySet.watermark().
+        """
+        return self.aggregate(
+            created=models.Sum('created', default=0),
+            resolved=models.Sum('resolved', default=0),
+            breached=models.Sum('breached', default=0),
+            resolution_seconds=models.Sum('resolution_seconds', default=0),
+        )
+
+
+class ComplaintRollup(models.Model):
+    """
+    Per ward, issue type and creation day counters, maintained by
+    Complaint.save(), the post_delete hook in core.signals and
+    sweep_sla_breaches, and recomputed by the rebuild_rollups command.
+    ``breached`` counts complaints whose sla_breached_at has been set.
+    """
+    ward_number = models.CharField(max_length=50, blank=True, default='')
+    issue_type = models.CharField(max_length=50)
+    day = models.DateField()
+
+    objects = ComplaintRollupQuerySet.as_manager()
+
+    # The Complaint columns the counters are derived from.
+    COMPLAINT_FIELDS = ('ward_number', 'issue_type', 'created_at', 'status', 'resolved_at', 'sla_breached_at')
+
+    created = models.PositiveIntegerField(default=0)
+    resolved = models.PositiveIntegerField(default=0)
+    breached = models.PositiveIntegerField(default=0)
+    resolution_seconds = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['ward_number', 'issue_type', 'day'],
+                name='unique_complaint_rollup',
+            ),
+        ]
+
+    @classmethod
+    def bump(cls, ward_number, issue_type, day, **counters) -> None:
+        """Atomically add ``counters`` (e.g. ``created=1``, or -1 to take one away) to a bucket."""
+        if not counters:
+            return
+        rollup, _ = cls.objects.get_or_create(
+            ward_number=ward_number,
+            issue_type=issue_type,
+            day=day,
+        )
+        cls.objects.filter(pk=rollup.pk).update(**{
+            # Never below zero, should the bucket have drifted from the
+            # complaints (rebuild_rollups puts it right).
+            name: F(name) + value if value > 0 else Greatest(F(name) + value, Value(0))
+            for name, value in counters.items()
+        })
+
+    @staticmethod
+    def bucket_of(complaint) -> tuple:
+        """(ward_number, issue_type, day) of the bucket ``complaint`` is counted in."""
+        return (
+            complaint.ward_number,
+            complaint.issue_type,
+            timezone.localdate(complaint.created_at),
+        )
+
+    @staticmethod
+    def counters_of(complaint) -> dict:
+        """What ``complaint`` adds to its bucket; the same as rebuild_rollups counts."""
+        counters = {'created': 1}
+        if complaint.status == 'resolved':
+            counters['resolved'] = 1
+            if complaint.resolved_at:
+                counters['resolution_seconds'] = int(
+                    (complaint.resolved_at - complaint.created_at).total_seconds()
+                )
+        if complaint.sla_breached_at:
+            counters['breached'] = 1
+        return counters
+
+    @classmethod
+    def move(cls, before, after) -> None:
+        """
+        Replace complaint ``before`` (as stored; None when it is new) by
+        ``after`` (None once deleted) in the counters. Covers resolving,
+        re-opening and edits that move a complaint to another bucket.
+        """
+        changes = defaultdict(lambda: defaultdict(int))
+        for complaint, sign in ((before, -1), (after, 1)):
+            if complaint is not None:
+                bucket = changes[cls.bucket_of(complaint)]
+                for name, value in cls.counters_of(complaint).items():
+                    bucket[name] += sign * value
+
+        for (ward_number, issue_type, day), counters in changes.items():
+            cls.bump(
+                ward_number, issue_type, day,
+                **{name: value for name, value in counters.items() if value}
+            )
+
+    @classmethod
+    def record_many(cls, complaints) -> None:
+        """move() for a batch of new complaints, one bump per bucket. Pending breaches are left to the sweeper."""
+        buckets = defaultdict(lambda: defaultdict(int))
+        for complaint in complaints:
+            counters = buckets[cls.bucket_of(complaint)]
+            for name, value in cls.counters_of(complaint).items():
+                counters[name] += value
+
+        for (ward_number, issue_type, day), counters in buckets.items():
+            cls.bump(ward_number, issue_type, day, **counters)
+
+    def __str__(self) -> str:
+        return f"Ward {self.ward_number or '-'} | {self.issue_type} | {self.day}"
+
+
+class Task(models.Model):
+    """
+    A deferred call to a function decorated with core.tasks.task, run by
+    the run_worker command. The row is committed with the request that
+    queued it, so no broker is needed.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    last_error = models.TextField(blank=True, default='')
+
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True, default='')
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='task_status_run_at_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.name} [{self.status}]"
+
+
+class CacheGeneration(models.Model):
+    """
+    Version numbers of cached data sets, bumped to drop a whole set at
+    once. Kept in the database, not the cache: management commands run in
+    processes of their own, and with the per-process local memory cache
+    their invalidations would never reach the web server.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.PositiveBigIntegerField(default=1)
+
+    @classmethod
+    def current(cls, name) -> int:
+        return cls.objects.filter(name=name).values_list('value', flat=True).first() or 1
+
+    @classmethod
+    def bump(cls, name) -> None:
+        if not cls.objects.filter(name=name).update(value=F('value') + 1):
+            # First bump of ``name``: any row (ours or a concurrent one) is
+            # already a generation after the implicit 1.
+            cls.objects.get_or_create(name=name, defaults={'value': 2})
+
+    def __str__(self) -> str:
+        return f"{self.name} = {self.value}"
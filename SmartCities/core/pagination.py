@@ -0,0 +1,130 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+def _json_default(value):
+    # Full precision: DjangoJSONEncoder would cut datetimes to milliseconds
+    # and the cursor would no longer match the row it was taken from.
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+class CursorPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None, estimated_total=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.estimated_total = estimated_total
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self) -> bool:
+        return self.has_next or self.has_previous
+
+
+class CursorPaginator:
+    """
+    Keyset pagination over a queryset's ordering, e.g. ('-created_at', '-id').
+
+    Pages are addressed by opaque cursors holding the ordering values of
+    the row at the page edge, so every page is an index range read with
+    no COUNT(*) and no OFFSET. The last ordering field must be unique.
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = [str(field) for field in queryset.query.order_by]
+        if not self.ordering or self.ordering[-1].lstrip('-') not in ('id', 'pk'):
+            raise ValueError('CursorPaginator needs an ordering ending in id.')
+
+    def get_page(self, cursor=None, estimated_total=None) -> CursorPage:
+        position = self.decode_cursor(cursor)
+        backwards = position is not None and position[0] == 'prev'
+
+        queryset = self.queryset
+        if position is not None:
+            queryset = queryset.filter(self._after(position[1], reverse=backwards))
+        if backwards:
+            queryset = queryset.reverse()
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        has_next = (has_more and not backwards) or backwards
+        has_previous = (has_more and backwards) or (position is not None and not backwards)
+
+        return CursorPage(
+            rows,
+            next_cursor=self.encode_cursor('next', rows[-1]) if rows and has_next else None,
+            previous_cursor=self.encode_cursor('prev', rows[0]) if rows and has_previous else None,
+            estimated_total=estimated_total,
+        )
+
+    def _values(self, obj):
+        return [getattr(obj, field.lstrip('-')) for field in self.ordering]
+
+    def _after(self, values, reverse=False) -> Q:
+        """Rows strictly after ``values`` in the ordering (before, if ``reverse``)."""
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            step = Q(**{f'{name}__{"lt" if descending else "gt"}': values[index]})
+            for prior_field, prior_value in zip(self.ordering[:index], values):
+                step &= Q(**{prior_field.lstrip('-'): prior_value})
+            condition |= step
+        return condition
+
+    def encode_cursor(self, direction, obj) -> str:
+        payload = json.dumps([direction, self._values(obj)], default=_json_default)
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Return (direction, values), or None for a missing or invalid cursor."""
+        if not cursor:
+            return None
+        try:
+            payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            direction, raw_values = json.loads(payload)
+            if direction not in ('next', 'prev') or len(raw_values) != len(self.ordering):
+                return None
+            values = [
+                self._to_python(field.lstrip('-'), value)
+                for field, value in zip(self.ordering, raw_values)
+            ]
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            return None
+        return direction, values
+
+    def _to_python(self, name, value):
+        try:
+            field = self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Annotations are stored as plain JSON values.
+            return value
+        return field.to_python(value)
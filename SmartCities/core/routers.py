@@ -0,0 +1,79 @@
+import asyncio
+import functools
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Browsers that wrote recently send this cookie and read from the primary.
+STICKY_COOKIE = 'primary_reads'
+
+
+class RoutingState:
+    """Where the reads of one request go; set up by ReplicaRoutingMiddleware."""
+
+    def __init__(self, sticky=False):
+        self.sticky = sticky
+        self.replica = None
+        self.wrote = False
+
+
+# RoutingState of the request being handled; None outside requests.
+current_routing = ContextVar('current_routing', default=None)
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes go to the default (primary) database. Reads go to a replica in
+    DATABASE_REPLICAS while a read_from_replica view runs, unless the
+    browser wrote within REPLICA_STICKY_SECONDS or this request has
+    written already, so nobody reads older data than they just saved.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = current_routing.get()
+        if state is None or state.wrote:
+            return None
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = current_routing.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary.
+        return db not in settings.DATABASE_REPLICAS
+
+
+def read_from_replica(view):
+    """Serve the reads of a GET/HEAD ``view`` (sync or async) from a replica."""
+    def choose(request):
+        state = current_routing.get()
+        if (
+            state is not None and not state.sticky and settings.DATABASE_REPLICAS
+            and request.method in ('GET', 'HEAD')
+        ):
+            # One replica per request, so its reads agree with each other.
+            state.replica = random.choice(settings.DATABASE_REPLICAS)
+
+    if asyncio.iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            choose(request)
+            return await view(request, *args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        choose(request)
+        return view(request, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,198 @@
+import re
+
+from django.db import NotSupportedError
+from django.db.models import BooleanField, F, FloatField, Func, IntegerField
+from django.db.models.expressions import RawSQL
+
+SEARCH_TERM_RE = re.compile(r'\w+')
+MAX_SEARCH_TERMS = 8
+# A search ranks the newest this many complaints that contain its words and
+# pass the list's filters, so Best Match is exact for any search with fewer
+# matches and means "best of the most recent" for broader ones. Ranking
+# every match of a broad term ("garbage" matches 40% of the seeded data)
+# takes close to a second at 1M complaints on SQLite; capped, a search stays
+# under SEARCH_BUDGET_MS (core.benchmarks), see benchmark_views.
+MAX_SEARCH_MATCHES = 2000
+FTS_TABLE = 'core_complaint_fts'
+
+# Postgres: a stored tsvector, weighted title > description > landmark,
+# kept current by the database itself. Note that changing the type of one
+# of these columns means dropping the generated column first.
+POSTGRES_SETUP = [
+    """
+    ALTER TABLE core_complaint ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(description, '')), 'B')
+        || setweight(to_tsvector('english', coalesce(landmark, '')), 'C')
+    ) STORED
+    """,
+    'CREATE INDEX IF NOT EXISTS core_complaint_search_idx ON core_complaint USING GIN (search_vector)',
+]
+POSTGRES_TEARDOWN = [
+    'DROP INDEX IF EXISTS core_complaint_search_idx',
+    'ALTER TABLE core_complaint DROP COLUMN IF EXISTS search_vector',
+]
+
+# SQLite: an FTS5 index over core_complaint (external content, so the text
+# is not stored twice) kept in step by triggers.
+_FTS_COLUMNS = 'title, description, landmark'
+_FTS_NEW = 'new.id, new.title, new.description, new.landmark'
+_FTS_DELETE_OLD = (
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_FTS_COLUMNS}) "
+    f"VALUES ('delete', old.id, old.title, old.description, old.landmark);"
+)
+SQLITE_TRIGGERS = {
+    f'{FTS_TABLE}_insert': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON core_complaint BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, {_FTS_COLUMNS}) VALUES ({_FTS_NEW});
+        END
+    """,
+    f'{FTS_TABLE}_delete': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON core_complaint BEGIN
+            {_FTS_DELETE_OLD}
+        END
+    """,
+    f'{FTS_TABLE}_update': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update
+        AFTER UPDATE OF {_FTS_COLUMNS} ON core_complaint BEGIN
+            {_FTS_DELETE_OLD}
+            INSERT INTO {FTS_TABLE}(rowid, {_FTS_COLUMNS}) VALUES ({_FTS_NEW});
+        END
+    """,
+}
+
+
+def install_search_index(connection) -> None:
+    """
+    Create the full-text index for ``connection`` if it is missing. On
+    SQLite, migrations that rebuild core_complaint drop its triggers, so
+    this also runs after every migrate and re-indexes when it puts them back.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for sql in POSTGRES_SETUP:
+                cursor.execute(sql)
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+                [f'{FTS_TABLE}_%'],
+            )
+            if {name for name, in cursor.fetchall()} == set(SQLITE_TRIGGERS):
+                return
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"{_FTS_COLUMNS}, content='core_complaint', content_rowid='id', "
+                f"tokenize='porter unicode61')"
+            )
+            for sql in SQLITE_TRIGGERS.values():
+                cursor.execute(sql)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def remove_search_index(connection) -> None:
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for sql in POSTGRES_TEARDOWN:
+                cursor.execute(sql)
+        elif connection.vendor == 'sqlite':
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def search_terms(text) -> list:
+    """Words of a user's search, lowercased; operators and punctuation are dropped."""
+    return [term.lower() for term in SEARCH_TERM_RE.findall(text or '')][:MAX_SEARCH_TERMS]
+
+
+def _fts5_query(terms):
+    # Each word quoted, so user input is never parsed as FTS5 syntax.
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+class _SearchFunc(Func):
+    def __init__(self, terms, scope, **extra):
+        super().__init__(F('id'), **extra)
+        self.terms = terms
+        # The queryset being searched: its filters are checked while the
+        # matches are collected, before MAX_SEARCH_MATCHES cuts them off.
+        self.scope = scope
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError(f'Full-text search is not set up for {connection.vendor}.')
+
+    def _table(self, compiler, connection):
+        # The complaint table's alias in this query (U0 inside subqueries).
+        return connection.ops.quote_name(self.source_expressions[0].alias)
+
+    def _id(self, compiler, connection):
+        return compiler.compile(self.source_expressions[0])
+
+    def _in_scope(self, connection, match_id):
+        """EXISTS (...) for the complaint ``match_id`` (SQL) passing the scope's filters."""
+        scope = self.scope.order_by().filter(
+            pk=RawSQL(match_id, (), output_field=IntegerField())
+        ).values('pk')
+        sql, params = scope.query.get_compiler(connection=connection).as_sql()
+        return f'EXISTS ({sql})', params
+
+    def _sqlite_matches(self, connection, columns):
+        in_scope_sql, in_scope_params = self._in_scope(connection, f'{FTS_TABLE}.rowid')
+        # The doclists are in rowid order, so the newest matches come first
+        # without reading the rest.
+        return (
+            f'SELECT {columns} FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND {in_scope_sql} '
+            f'ORDER BY rowid DESC LIMIT {MAX_SEARCH_MATCHES}',
+            [_fts5_query(self.terms), *in_scope_params],
+        )
+
+
+class SearchMatch(_SearchFunc):
+    """
+    The newest MAX_SEARCH_MATCHES complaints of ``scope`` containing every
+    one of ``terms``, through the full-text index.
+    """
+
+    output_field = BooleanField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        id_sql, id_params = self._id(compiler, connection)
+        matches_sql, matches_params = self._sqlite_matches(connection, 'rowid')
+        return f'{id_sql} IN ({matches_sql})', [*id_params, *matches_params]
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        id_sql, id_params = self._id(compiler, connection)
+        in_scope_sql, in_scope_params = self._in_scope(connection, 'search_match.id')
+        return (
+            f'{id_sql} IN (SELECT search_match.id FROM core_complaint AS search_match '
+            f"WHERE search_match.search_vector @@ plainto_tsquery('english', %s) AND {in_scope_sql} "
+            f'ORDER BY search_match.id DESC LIMIT {MAX_SEARCH_MATCHES})',
+            [*id_params, ' '.join(self.terms), *in_scope_params],
+        )
+
+
+class SearchRank(_SearchFunc):
+    """Relevance of a matching complaint to ``terms``; higher is better."""
+
+    output_field = FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        id_sql, id_params = self._id(compiler, connection)
+        # bm25() run per row re-reads every match to weigh the terms, so
+        # the scores of all matches are computed once and looked up.
+        materialized = ' MATERIALIZED' if connection.Database.sqlite_version_info >= (3, 35) else ''
+        # bm25 is lower for better matches; weights follow the Postgres ones.
+        scores_sql, scores_params = self._sqlite_matches(
+            connection, f'rowid AS id, -bm25({FTS_TABLE}, 1.0, 0.4, 0.2) AS score'
+        )
+        return (
+            f'(WITH scores AS{materialized} ({scores_sql}) SELECT score FROM scores WHERE id = {id_sql})',
+            [*scores_params, *id_params],
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return (
+            f"ts_rank_cd({self._table(compiler, connection)}.search_vector, plainto_tsquery('english', %s))",
+            [' '.join(self.terms)],
+        )
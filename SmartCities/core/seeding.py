@@ -0,0 +1,145 @@
+import math
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from .forms import LOCALITY_WARD_CHOICES
+from .geo import DEFAULT_CENTER_LAT, DEFAULT_CENTER_LNG
+from .models import Complaint, UserProfile
+
+# (locality, ward_number) pairs from the registration form.
+WARDS = [tuple(value.split('|')) for value, _ in LOCALITY_WARD_CHOICES if '|' in value]
+# Relative frequency of each issue type.
+ISSUE_TYPE_WEIGHTS = {'garbage': 40, 'pothole': 30, 'streetlight': 20, 'other': 10}
+SEED_DESCRIPTIONS = {
+    'garbage': (
+        'Garbage has not been collected from the corner bin for days.',
+        'Overflowing dustbin, waste spilling onto the footpath and attracting stray dogs.',
+        'Construction debris dumped on the roadside.',
+        'Burning of plastic waste behind the market every evening.',
+    ),
+    'pothole': (
+        'Large pothole in the middle of the road, dangerous for two-wheelers.',
+        'Road surface broken after the pipeline work, deep craters filled with water.',
+        'Speed breaker damaged and a pothole forming beside it.',
+        'Manhole cover sunk below the road level.',
+    ),
+    'streetlight': (
+        'Streetlight is not working, the lane is completely dark at night.',
+        'Lamp post flickering the whole night.',
+        'Street lights stay on during the day and off after sunset.',
+        'Electric pole leaning and the wires are hanging low.',
+    ),
+    'other': (
+        'Water logging near the bus stop after every rain.',
+        'Drinking water supply contaminated and smells of sewage.',
+        'Fallen tree blocking half of the road.',
+        'Stray cattle sitting in the middle of the junction.',
+    ),
+}
+SEED_LANDMARKS = (
+    'Near the railway station', 'Opposite the municipal school', 'Behind the vegetable market',
+    'Next to the temple', 'Outside the hospital gate', 'Near the bus depot', 'By the lake promenade',
+    'Opposite the post office', 'Near the police chowki', 'Main road junction', '',
+)
+
+
+def _ward_centres(rng):
+    """A fixed point per ward, spread over roughly 20km around the city centre."""
+    return {
+        ward_number: (
+            DEFAULT_CENTER_LAT + rng.uniform(-0.09, 0.09),
+            DEFAULT_CENTER_LNG + rng.uniform(-0.06, 0.06),
+        )
+        for _, ward_number in WARDS
+    }
+
+
+def seed_users(count, rng, batch_size=5000) -> list:
+    """Create ``count`` citizens with profiles; returns [(user_id, ward_number)]."""
+    User = get_user_model()
+    password = make_password('seed-password')  # hashed once, shared
+    run = uuid.UUID(int=rng.getrandbits(128)).hex[:8]
+
+    seeded = []
+    for offset in range(0, count, batch_size):
+        size = min(batch_size, count - offset)
+        wards = [rng.choice(WARDS) for _ in range(size)]
+        with transaction.atomic():
+            # bulk_create skips the post_save signal that makes profiles.
+            users = User.objects.bulk_create([
+                User(username=f'seed-{run}-{offset + index}@city.com', password=password)
+                for index in range(size)
+            ])
+            UserProfile.objects.bulk_create([
+                UserProfile(
+                    user=user,
+                    name=f'Citizen {offset + index}',
+                    locality=locality,
+                    ward_number=ward_number,
+                )
+                for index, (user, (locality, ward_number)) in enumerate(zip(users, wards))
+            ])
+        seeded.extend((user.pk, ward_number) for user, (_, ward_number) in zip(users, wards))
+    return seeded
+
+
+def generate_complaints(users, count, rng, now=None, days=365):
+    """
+    Yield ``count`` unsaved complaints from ``users`` ([(user_id, ward_number)]),
+    created over the last ``days`` days. Points scatter around their ward's
+    centre. Resolution times are log-normal around 60% of the SLA window,
+    so roughly one in five is resolved late; most older complaints are
+    resolved and most recent ones are still pending.
+    """
+    now = now or timezone.now()
+    centres = _ward_centres(rng)
+    issue_types = list(ISSUE_TYPE_WEIGHTS)
+    weights = list(ISSUE_TYPE_WEIGHTS.values())
+
+    for _ in range(count):
+        user_id, ward_number = rng.choice(users)
+        issue_type = rng.choices(issue_types, weights)[0]
+        centre_lat, centre_lng = centres.get(ward_number, (DEFAULT_CENTER_LAT, DEFAULT_CENTER_LNG))
+        # Skewed towards the present, like a growing user base.
+        created_at = now - timedelta(seconds=days * 86400 * rng.random() ** 1.5)
+
+        resolved_at = None
+        age_days = (now - created_at).days
+        if rng.random() < (0.95 if age_days > 30 else 0.4):
+            sla_hours = Complaint.SLA_TIERS.get(issue_type, Complaint.DEFAULT_SLA_HOURS)
+            hours = rng.lognormvariate(math.log(sla_hours * 0.6), 0.6)
+            if created_at + timedelta(hours=hours) < now:
+                resolved_at = created_at + timedelta(hours=hours)
+
+        yield Complaint(
+            user_id=user_id,
+            title=f'{issue_type.title()} issue',
+            description=rng.choice(SEED_DESCRIPTIONS[issue_type]),
+            landmark=rng.choice(SEED_LANDMARKS),
+            issue_type=issue_type,
+            status='resolved' if resolved_at else 'pending',
+            ward_number=ward_number,
+            latitude=rng.gauss(centre_lat, 0.01),
+            longitude=rng.gauss(centre_lng, 0.01),
+            created_at=created_at,
+            resolved_at=resolved_at,
+        )
+
+
+def seed_complaints(users, count, rng, batch_size=5000, now=None, progress=None) -> int:
+    """Insert ``count`` generated complaints in batches; returns the number inserted."""
+    complaints = generate_complaints(users, count, rng, now=now)
+    inserted = 0
+    while inserted < count:
+        batch = [next(complaints) for _ in range(min(batch_size, count - inserted))]
+        with transaction.atomic():
+            Complaint.objects.bulk_create_historical(batch)
+        inserted += len(batch)
+        if progress:
+            progress(inserted)
+    return inserted
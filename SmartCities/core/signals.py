@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from .analytics import invalidate_analytics
+from .images import schedule_renditions
+from .models import Complaint, ComplaintRollup, UserProfile
+from .search import install_search_index
+from .stats import invalidate_landing_stats
+
+
+def _invalidate_on_commit():
+    # Dropping the entry before commit would let a concurrent request
+    # cache the old numbers again.
+    transaction.on_commit(invalidate_landing_stats)
+
+
+@receiver(post_save, sender=Complaint)
+def complaint_saved(sender, instance, created, **kwargs):
+    schedule_renditions(instance)
+
+    # A new complaint can add an active citizen; a resolved one moves the
+    # resolved count. Edits to pending complaints change neither.
+    if created or instance.status == 'resolved':
+        _invalidate_on_commit()
+
+
+@receiver(post_delete, sender=Complaint)
+def complaint_deleted(sender, instance, **kwargs):
+    # Runs in the delete's transaction, for queryset and cascade deletes too.
+    ComplaintRollup.move(instance, None)
+    _invalidate_on_commit()
+    transaction.on_commit(invalidate_analytics)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def profile_changed(sender, instance, **kwargs):
+    _invalidate_on_commit()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def create_profile(sender, instance, created, raw=False, **kwargs):
+    # Every account gets its profile at sign-up, so requests only read it.
+    if created and not raw:
+        UserProfile.objects.get_or_create(
+            user=instance,
+            defaults={'name': instance.get_full_name() or instance.get_username()},
+        )
+
+
+@receiver(post_migrate)
+def restore_search_index(sender, using, **kwargs):
+    # SQLite migrations that rebuild core_complaint drop the FTS triggers.
+    connection = connections[using]
+    if sender.name == 'core' and ('core', '0015_complaint_search') in MigrationRecorder(connection).applied_migrations():
+        install_search_index(connection)
@@ -0,0 +1,185 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Avg, Count, DurationField, Exists, ExpressionWrapper, F, OuterRef, Q, Sum
+from django.utils import timezone
+
+from .models import CacheGeneration, Complaint, ComplaintRollup, UserProfile
+
+
+# Bump when the shape of the cached landing stats changes.
+LANDING_STATS_KEY = 'landing-stats'
+LANDING_STATS_VERSION = 1
+# CacheGeneration of the cached landing stats.
+LANDING_STATS_GENERATION = 'landing-stats'
+
+
+def _month_start():
+    return timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def complaint_stats(user=None, ward_number=None, role=None) -> dict:
+    """
+    Headline complaint numbers computed with a single aggregate query.
+
+    Scope with ``user`` (complaints filed by that user), ``ward_number``
+    (ward the complaint was filed in) or ``role`` (reporter's profile
+    role); leave them all empty for city-wide numbers.
+    """
+    complaints_qs = Complaint.objects.all()
+    if user is not None:
+        complaints_qs = complaints_qs.filter(user=user)
+    if ward_number:
+        complaints_qs = complaints_qs.filter(ward_number=ward_number)
+    if role:
+        complaints_qs = complaints_qs.filter(user__profile__role=role)
+
+    resolution_time = ExpressionWrapper(
+        F('resolved_at') - F('created_at'),
+        output_field=DurationField(),
+    )
+
+    stats = complaints_qs.with_sla().aggregate(
+        total=Count('id'),
+        resolved=Count('id', filter=Q(status='resolved')),
+        pending=Count('id', filter=Q(status='pending')),
+        monthly=Count('id', filter=Q(created_at__gte=_month_start())),
+        sla_breached=Count('id', filter=Q(sla_state='breached')),
+        pending_sla_breached=Count('id', filter=Q(status='pending', sla_state='breached')),
+        pending_in_sla=Count('id', filter=Q(status='pending', sla_state='active')),
+        reporters=Count('user', distinct=True),
+        avg_resolution=Avg(
+            resolution_time,
+            filter=Q(status='resolved', resolved_at__isnull=False),
+        ),
+    )
+
+    avg_resolution = stats.pop('avg_resolution')
+    stats['avg_resolution_hours'] = (
+        round(avg_resolution.total_seconds() / 3600, 2)
+        if avg_resolution is not None
+        else None
+    )
+    stats['resolution_rate'] = (
+        int((stats['resolved'] / stats['total']) * 100)
+        if stats['total'] > 0
+        else 0
+    )
+    return stats
+
+
+def rollup_stats(ward_number=None) -> dict:
+    """
+    Ward or city-wide headline numbers read from ComplaintRollup, so the
+    cost follows the number of wards and days rather than complaints.
+    Returns the same keys as complaint_stats() apart from the per-user ones.
+    """
+    rollups = ComplaintRollup.objects.all()
+    complaints_qs = Complaint.objects.all()
+    if ward_number:
+        rollups = rollups.filter(ward_number=ward_number)
+        complaints_qs = complaints_qs.filter(ward_number=ward_number)
+
+    totals = rollups.aggregate(
+        total=Sum('created', default=0),
+        resolved=Sum('resolved', default=0),
+        monthly=Sum('created', default=0, filter=Q(day__gte=timezone.localdate(_month_start()))),
+        breached=Sum('breached', default=0),
+        resolution_seconds=Sum('resolution_seconds', default=0),
+    )
+
+    # Breaches enter the rollup when sweep_sla_breaches flags them; the
+    # ones that crossed their deadline since the last sweep are added live.
+    now = timezone.now()
+    past_deadline = complaints_qs.pending_past_deadline(now)
+    pending_sla_breached = past_deadline.count()
+    unswept_breaches = past_deadline.filter(sla_breached_at__isnull=True).count()
+
+    total = totals['total']
+    resolved = totals['resolved']
+    return {
+        'total': total,
+        'resolved': resolved,
+        'pending': total - resolved,
+        'monthly': totals['monthly'],
+        'sla_breached': totals['breached'] + unswept_breaches,
+        'pending_sla_breached': pending_sla_breached,
+        'avg_resolution_hours': (
+            round(totals['resolution_seconds'] / resolved / 3600, 2)
+            if resolved > 0
+            else None
+        ),
+        'resolution_rate': int((resolved / total) * 100) if total > 0 else 0,
+    }
+
+
+def estimated_complaint_count(ward_number='', issue_type='', status='', sla=''):
+    """
+    Complaint count for the listing filters, read from ComplaintRollup.
+    Returns None when the filters include one the rollup cannot answer.
+    """
+    if sla or status not in ('', 'pending', 'resolved'):
+        return None
+
+    rollups = ComplaintRollup.objects.all()
+    if ward_number:
+        rollups = rollups.filter(ward_number=ward_number)
+    if issue_type:
+        rollups = rollups.filter(issue_type=issue_type)
+
+    totals = rollups.aggregate(
+        created=Sum('created', default=0),
+        resolved=Sum('resolved', default=0),
+    )
+    if status == 'resolved':
+        return totals['resolved']
+    if status == 'pending':
+        return totals['created'] - totals['resolved']
+    return totals['created']
+
+
+def active_reporters(role='Citizen') -> int:
+    """Number of users with ``role`` (any role if None) who have filed at least one complaint."""
+    users = get_user_model().objects.all()
+    if role is not None:
+        users = users.filter(profile__role=role)
+    return users.filter(Exists(Complaint.objects.filter(user=OuterRef('pk')))).count()
+
+
+def localities_covered(role='Citizen') -> int:
+    """Number of distinct localities with at least one profile of ``role``."""
+    return (
+        UserProfile.objects.filter(role=role)
+        .exclude(locality='')
+        .values('locality')
+        .distinct()
+        .count()
+    )
+
+
+def landing_stats() -> dict:
+    """
+    The public landing page numbers, cached. core.signals drops the entry
+    when a complaint or profile change could move them.
+    """
+    key = f'{LANDING_STATS_KEY}:{CacheGeneration.current(LANDING_STATS_GENERATION)}'
+    stats = cache.get(key, version=LANDING_STATS_VERSION)
+    if stats is None:
+        stats = {
+            'resolved_count': ComplaintRollup.objects.aggregate(
+                resolved=Sum('resolved', default=0)
+            )['resolved'],
+            'active_citizens': active_reporters('Citizen'),
+            'localities_covered': localities_covered('Citizen'),
+        }
+        cache.set(
+            key, stats,
+            timeout=settings.LANDING_STATS_TIMEOUT,
+            version=LANDING_STATS_VERSION,
+        )
+    return stats
+
+
+def invalidate_landing_stats() -> None:
+    """Drop the cached landing stats in every process, management commands' writes included."""
+    CacheGeneration.bump(LANDING_STATS_GENERATION)
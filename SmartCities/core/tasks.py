@@ -0,0 +1,152 @@
+import functools
+import logging
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# Retry n waits BACKOFF_BASE_SECONDS * 2 ** (n - 1), capped at BACKOFF_MAX_SECONDS.
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+# A task still marked running after this long belongs to a worker that
+# died or hung; it is handed out again while it has attempts left.
+STALE_AFTER = timedelta(minutes=15)
+
+
+def task(func=None, *, max_attempts=3):
+    """
+    Make ``func`` deferrable: ``func.delay(*args, **kwargs)`` queues a Task
+    row in the current transaction and returns it. Arguments must be JSON
+    serialisable, so pass ids rather than model instances.
+    """
+    def decorate(func):
+        name = f'{func.__module__}.{func.__qualname__}'
+
+        @functools.wraps(func)
+        def delay(*args, **kwargs):
+            return enqueue(name, args, kwargs, max_attempts=max_attempts)
+
+        func.task_name = name
+        func.delay = delay
+        return func
+
+    return decorate(func) if func is not None else decorate
+
+
+def enqueue(name, args=(), kwargs=None, max_attempts=3, run_at=None) -> Task:
+    queued = Task.objects.create(
+        name=name,
+        args=list(args),
+        kwargs=kwargs or {},
+        max_attempts=max_attempts,
+        run_at=run_at or timezone.now(),
+    )
+    if settings.TASKS_EAGER:
+        # No worker in development and tests: run it once the caller's
+        # transaction commits, as a worker would.
+        transaction.on_commit(lambda: run_task(claim_task(queued.pk)))
+    return queued
+
+
+def _claimable(now):
+    return Task.objects.filter(
+        Q(status='queued', run_at__lte=now)
+        | Q(status='running', locked_at__lt=now - STALE_AFTER, attempts__lt=F('max_attempts'))
+    )
+
+
+def fail_stale_tasks(now=None) -> int:
+    """Mark stale running tasks without attempts left as failed; returns how many."""
+    now = now or timezone.now()
+    exhausted = Task.objects.filter(
+        status='running', locked_at__lt=now - STALE_AFTER, attempts__gte=F('max_attempts')
+    )
+    for pk, name, attempts in exhausted.values_list('pk', 'name', 'attempts'):
+        logger.error('Task %s (%s) failed after %s attempts: worker stopped responding', pk, name, attempts)
+    return exhausted.update(
+        status='failed',
+        finished_at=now,
+        last_error=f'Worker stopped responding for over {STALE_AFTER}.',
+        locked_by='',
+        locked_at=None,
+    )
+
+
+def prune_tasks(now=None) -> int:
+    """Delete tasks that finished over TASK_RETENTION_DAYS ago; returns how many."""
+    cutoff = (now or timezone.now()) - timedelta(days=settings.TASK_RETENTION_DAYS)
+    deleted, _ = Task.objects.filter(status='done', finished_at__lt=cutoff).delete()
+    return deleted
+
+
+def claim_tasks(worker_id, limit) -> list:
+    """Lock up to ``limit`` due tasks for ``worker_id`` and mark them running."""
+    now = timezone.now()
+    token = f'{worker_id}:{uuid.uuid4().hex[:12]}'
+
+    with transaction.atomic():
+        fail_stale_tasks(now)
+        due = _claimable(now).order_by('run_at', 'pk')
+        if connection.features.has_select_for_update_skip_locked:
+            # Postgres: concurrent workers skip each other's rows.
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('pk', flat=True)[:limit])
+        # SQLite has no row locks; writers are serialised instead, and the
+        # status condition here means a row only goes to one of two racing
+        # workers.
+        _claimable(now).filter(pk__in=ids).update(
+            status='running',
+            locked_by=token,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+    return list(Task.objects.filter(pk__in=ids, locked_by=token, status='running'))
+
+
+def claim_task(pk):
+    """Claim one specific task, for eager execution. Returns None if already taken."""
+    now = timezone.now()
+    token = f'eager:{uuid.uuid4().hex[:12]}'
+    _claimable(now).filter(pk=pk).update(
+        status='running', locked_by=token, locked_at=now, attempts=F('attempts') + 1,
+    )
+    return Task.objects.filter(pk=pk, locked_by=token).first()
+
+
+def backoff(attempts) -> timedelta:
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS))
+
+
+def run_task(claimed) -> None:
+    """Run a claimed task and record the outcome: done, queued for a retry, or failed."""
+    if claimed is None:
+        return
+
+    try:
+        func = import_string(claimed.name)
+        if getattr(func, 'task_name', None) != claimed.name:
+            raise ImportError(f'{claimed.name} is not a task')
+        func(*claimed.args, **claimed.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        if claimed.attempts < claimed.max_attempts:
+            update = {'status': 'queued', 'run_at': timezone.now() + backoff(claimed.attempts)}
+        else:
+            update = {'status': 'failed', 'finished_at': timezone.now()}
+            logger.error('Task %s (%s) failed after %s attempts', claimed.pk, claimed.name, claimed.attempts)
+        Task.objects.filter(pk=claimed.pk, locked_by=claimed.locked_by).update(
+            last_error=error, locked_by='', locked_at=None, **update
+        )
+    else:
+        Task.objects.filter(pk=claimed.pk, locked_by=claimed.locked_by).update(
+            status='done', finished_at=timezone.now(), locked_by='', locked_at=None,
+        )
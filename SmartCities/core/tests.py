@@ -1 +1,1598 @@
-from django.test import TestCase
+import json
+import random
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, router
+from django.db.models import QuerySet
+from django.http import HttpResponse
+from django.test.utils import CaptureQueriesContext
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+import numpy as np
+from PIL import Image
+
+from . import metrics
+from .asyncviews import gather_queries
+from .benchmarks import QUERY_BUDGETS
+from .geo import geohash_encode, haversine_m
+from .metrics import MetricsStore
+from .middleware import ReplicaRoutingMiddleware
+from .models import Complaint, ComplaintRollup, Task, UserProfile
+from .pagination import CursorPaginator
+from .routers import STICKY_COOKIE, read_from_replica
+from .seeding import seed_complaints, seed_users
+from .stats import complaint_stats, invalidate_landing_stats, rollup_stats
+from .tasks import STALE_AFTER, claim_tasks, run_task, task
+
+# No core.timing log lines in the test output, sampled or slow; the
+# timing tests opt back in with their own override_settings.
+_quiet_timing = override_settings(REQUEST_TIMING_SAMPLE_RATE=0.0, REQUEST_TIMING_SLOW_MS=60000)
+
+
+def setUpModule():
+    _quiet_timing.enable()
+
+
+def tearDownModule():
+    _quiet_timing.disable()
+
+
+def make_user(username, role='Citizen', ward_number='', locality=''):
+    user = get_user_model().objects.create_user(username=username, password='pw')
+    UserProfile.objects.update_or_create(
+        user=user,
+        defaults={
+            'name': username,
+            'role': role,
+            'ward_number': ward_number,
+            'locality': locality,
+        },
+    )
+    return user
+
+
+def make_complaint(user, hours_ago=0, resolved_after=None, **fields):
+    """Create a complaint backdated by ``hours_ago``, optionally resolved ``resolved_after`` hours later."""
+    fields.setdefault('title', 'Issue')
+    fields.setdefault('description', 'Description')
+    complaint = Complaint.objects.create(user=user, **fields)
+
+    created_at = timezone.now() - timedelta(hours=hours_ago)
+    sla_deadline = Complaint.deadline_for(complaint.issue_type, created_at)
+    update = {'created_at': created_at, 'sla_deadline': sla_deadline}
+    if resolved_after is not None:
+        resolved_at = created_at + timedelta(hours=resolved_after)
+        update.update(status='resolved', resolved_at=resolved_at)
+        if resolved_at > sla_deadline:
+            update['sla_breached_at'] = resolved_at
+    Complaint.objects.filter(pk=complaint.pk).update(**update)
+    complaint.refresh_from_db()
+    return complaint
+
+
+class SlaBoundaryTests(TestCase):
+    """A complaint is breached only once its end time is past sla_deadline."""
+
+    def setUp(self):
+        self.alice = make_user('alice')
+        self.deadline = timezone.now().replace(microsecond=0) - timedelta(hours=1)
+
+    def complaint(self, resolved_at=None, deadline=None):
+        # Garbage has a 24 hour SLA.
+        deadline = deadline or self.deadline
+        complaint = make_complaint(self.alice, issue_type='garbage')
+        update = {'created_at': deadline - timedelta(hours=24), 'sla_deadline': deadline}
+        if resolved_at is not None:
+            update.update(status='resolved', resolved_at=resolved_at)
+            if resolved_at > deadline:
+                update['sla_breached_at'] = resolved_at
+        Complaint.objects.filter(pk=complaint.pk).update(**update)
+        complaint.refresh_from_db()
+        return complaint
+
+    def assertSlaState(self, complaint, state, now=None):
+        self.assertEqual(complaint.sla_status, state)
+        self.assertEqual(Complaint.objects.with_sla().get(pk=complaint.pk).sla_state, state)
+        self.assertEqual(
+            [sla for sla, _ in Complaint.SLA_STATE_CHOICES
+             if Complaint.objects.filter_sla(sla, now=now).filter(pk=complaint.pk).exists()],
+            [state],
+        )
+
+    def test_resolved_exactly_at_deadline_is_on_time(self):
+        complaint = self.complaint(resolved_at=self.deadline)
+        self.assertSlaState(complaint, 'resolved')
+        self.assertEqual(Complaint.objects.with_sla().get(pk=complaint.pk).hours_overdue, 0)
+
+    def test_resolved_one_second_late_is_breached(self):
+        complaint = self.complaint(resolved_at=self.deadline + timedelta(seconds=1))
+        self.assertSlaState(complaint, 'breached')
+        # Still within the same whole hour as the SLA window.
+        self.assertEqual(complaint.hours_pending, complaint.sla_hours)
+
+    def test_pending_at_and_past_deadline(self):
+        deadline = timezone.now() + timedelta(minutes=5)
+        complaint = self.complaint(deadline=deadline)
+        self.assertSlaState(complaint, 'active')
+        self.assertTrue(Complaint.objects.filter_sla('active', now=deadline).filter(pk=complaint.pk).exists())
+        self.assertTrue(
+            Complaint.objects.filter_sla('breached', now=deadline + timedelta(seconds=1))
+            .filter(pk=complaint.pk).exists()
+        )
+
+        complaint = self.complaint(deadline=timezone.now() - timedelta(seconds=1))
+        self.assertSlaState(complaint, 'breached')
+        self.assertEqual(complaint.hours_pending, complaint.sla_hours)
+
+
+class ComplaintStatsTests(TestCase):
+    def setUp(self):
+        self.alice = make_user('alice', ward_number='1')
+        self.bob = make_user('bob', ward_number='2')
+
+        make_complaint(self.alice, hours_ago=2, issue_type='garbage')
+        make_complaint(self.alice, hours_ago=30, issue_type='garbage')
+        make_complaint(self.alice, hours_ago=100, resolved_after=10, issue_type='pothole')
+        make_complaint(self.bob, hours_ago=200, resolved_after=90, issue_type='pothole')
+        make_complaint(self.bob, hours_ago=5, issue_type='streetlight')
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            complaint_stats()
+        with self.assertNumQueries(1):
+            complaint_stats(user=self.alice)
+        with self.assertNumQueries(1):
+            complaint_stats(ward_number='2')
+
+    def test_matches_python_properties(self):
+        stats = complaint_stats()
+        complaints = list(Complaint.objects.all())
+
+        self.assertEqual(stats['total'], len(complaints))
+        self.assertEqual(stats['resolved'], sum(c.status == 'resolved' for c in complaints))
+        self.assertEqual(stats['pending'], sum(c.status == 'pending' for c in complaints))
+        self.assertEqual(stats['sla_breached'], sum(c.sla_status == 'breached' for c in complaints))
+        self.assertEqual(stats['pending_sla_breached'], 1)
+        self.assertEqual(stats['pending_in_sla'], 2)
+        self.assertEqual(stats['reporters'], 2)
+        self.assertEqual(stats['avg_resolution_hours'], 50.0)
+        self.assertEqual(stats['resolution_rate'], 40)
+
+    def test_scopes(self):
+        alice_stats = complaint_stats(user=self.alice)
+        self.assertEqual(alice_stats['total'], 3)
+        self.assertEqual(alice_stats['reporters'], 1)
+        self.assertEqual(alice_stats['avg_resolution_hours'], 10.0)
+
+        ward_stats = complaint_stats(ward_number='2')
+        self.assertEqual(ward_stats['total'], 2)
+        self.assertEqual(ward_stats['resolved'], 1)
+
+    def test_empty(self):
+        Complaint.objects.all().delete()
+        stats = complaint_stats()
+        self.assertEqual(stats['total'], 0)
+        self.assertIsNone(stats['avg_resolution_hours'])
+        self.assertEqual(stats['resolution_rate'], 0)
+
+
+class ComplaintRollupTests(TestCase):
+    def setUp(self):
+        self.alice = make_user('alice', ward_number='1')
+        self.bob = make_user('bob', ward_number='2')
+
+    def rollup_rows(self):
+        return sorted(
+            ComplaintRollup.objects.values_list(
+                'ward_number', 'issue_type', 'day', 'created', 'resolved', 'breached'
+            )
+        )
+
+    def test_save_maintains_rollup(self):
+        complaint = Complaint.objects.create(
+            user=self.alice, title='Issue', description='Description', issue_type='garbage'
+        )
+        self.assertEqual(complaint.ward_number, '1')
+        Complaint.objects.create(
+            user=self.bob, title='Issue', description='Description', issue_type='garbage'
+        )
+
+        complaint.status = 'resolved'
+        complaint.save()
+        complaint.save()
+
+        stats = rollup_stats()
+        self.assertEqual(stats['total'], 2)
+        self.assertEqual(stats['resolved'], 1)
+        self.assertEqual(stats['pending'], 1)
+        self.assertEqual(rollup_stats(ward_number='1')['resolved'], 1)
+        self.assertEqual(rollup_stats(ward_number='2')['resolved'], 0)
+
+    def test_rebuild_matches_incremental(self):
+        for user, issue_type in ((self.alice, 'garbage'), (self.bob, 'streetlight')):
+            Complaint.objects.create(
+                user=user, title='Issue', description='Description', issue_type=issue_type
+            )
+        for complaint in Complaint.objects.all():
+            complaint.status = 'resolved'
+            complaint.save()
+        incremental = self.rollup_rows()
+
+        call_command('rebuild_rollups', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.rollup_rows(), incremental)
+
+    def test_edits_and_deletes_move_the_counters(self):
+        complaints = [
+            Complaint.objects.create(
+                user=user, title='Issue', description='Description', issue_type='garbage'
+            )
+            for user in (self.alice, self.alice, self.bob)
+        ]
+        complaints[0].status = 'resolved'
+        complaints[0].save()
+        complaints[0].issue_type = 'pothole'
+        complaints[0].ward_number = '2'
+        complaints[0].save()
+        complaints[1].status = 'resolved'
+        complaints[1].save()
+        complaints[1].status = 'pending'
+        complaints[1].save()
+        complaints[2].delete()
+        incremental = [row for row in self.rollup_rows() if row[3:] != (0, 0, 0)]
+
+        call_command('rebuild_rollups', stdout=StringIO())
+        self.assertEqual(self.rollup_rows(), incremental)
+        self.assertEqual(rollup_stats()['total'], 2)
+        self.assertEqual(rollup_stats(ward_number='2')['resolved'], 1)
+
+    def test_matches_live_stats(self):
+        make_complaint(self.alice, hours_ago=2, issue_type='garbage')
+        make_complaint(self.alice, hours_ago=30, issue_type='garbage')
+        make_complaint(self.alice, hours_ago=100, resolved_after=10, issue_type='pothole')
+        make_complaint(self.bob, hours_ago=200, resolved_after=90, issue_type='pothole')
+        call_command('rebuild_rollups', stdout=StringIO())
+
+        live = complaint_stats()
+        rolled_up = rollup_stats()
+        for key in ('total', 'resolved', 'pending', 'monthly', 'sla_breached',
+                    'pending_sla_breached', 'avg_resolution_hours', 'resolution_rate'):
+            self.assertEqual(rolled_up[key], live[key], key)
+
+
+class SweepSlaBreachesTests(TestCase):
+    def setUp(self):
+        self.alice = make_user('alice', ward_number='1')
+
+    def test_flags_each_breach_once(self):
+        overdue = make_complaint(self.alice, hours_ago=30, issue_type='garbage')
+        within_sla = make_complaint(self.alice, hours_ago=30, issue_type='pothole')
+        call_command('rebuild_rollups', stdout=StringIO())
+
+        out = StringIO()
+        call_command('sweep_sla_breaches', stdout=out)
+        self.assertIn('Flagged 1 newly breached', out.getvalue())
+
+        overdue.refresh_from_db()
+        within_sla.refresh_from_db()
+        self.assertIsNotNone(overdue.sla_breached_at)
+        self.assertIsNone(within_sla.sla_breached_at)
+
+        out = StringIO()
+        call_command('sweep_sla_breaches', stdout=out)
+        self.assertIn('Flagged 0 newly breached', out.getvalue())
+
+        swept = sorted(ComplaintRollup.objects.values_list('issue_type', 'breached'))
+        call_command('rebuild_rollups', stdout=StringIO())
+        rebuilt = sorted(ComplaintRollup.objects.values_list('issue_type', 'breached'))
+        self.assertEqual(swept, rebuilt)
+        self.assertEqual(swept, [('garbage', 1), ('pothole', 0)])
+
+    def test_resolving_a_swept_complaint_counts_once(self):
+        overdue = make_complaint(self.alice, hours_ago=30, issue_type='garbage')
+        call_command('rebuild_rollups', stdout=StringIO())
+        call_command('sweep_sla_breaches', stdout=StringIO())
+
+        overdue.refresh_from_db()
+        overdue.status = 'resolved'
+        overdue.save()
+
+        self.assertEqual(ComplaintRollup.objects.get().breached, 1)
+        self.assertEqual(rollup_stats()['sla_breached'], 1)
+
+    def test_instance_loaded_before_the_sweep_keeps_its_breach(self):
+        edited = make_complaint(self.alice, hours_ago=30, issue_type='garbage')
+        resolved = make_complaint(self.alice, hours_ago=30, issue_type='garbage')
+        call_command('rebuild_rollups', stdout=StringIO())
+        call_command('sweep_sla_breaches', stdout=StringIO())
+
+        edited.title = 'Edited'
+        edited.save()
+        resolved.status = 'resolved'
+        resolved.save()
+        edited.refresh_from_db()
+        self.assertIsNotNone(edited.sla_breached_at)
+        self.assertNotEqual(resolved.sla_breached_at, resolved.resolved_at)
+
+        out = StringIO()
+        call_command('sweep_sla_breaches', stdout=out)
+        self.assertIn('Flagged 0 newly breached', out.getvalue())
+        self.assertEqual(ComplaintRollup.objects.get().breached, 2)
+
+
+class QueryPlanTests(TestCase):
+    """Fail if a view's main complaint query falls back to a full table scan."""
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Query plan checks use SQLite EXPLAIN QUERY PLAN.')
+        self.alice = make_user('alice', ward_number='1')
+
+    def assertUsesIndex(self, queryset):
+        plan = queryset.explain()
+        for line in plan.splitlines():
+            detail = line.split(maxsplit=3)[-1]
+            if detail.startswith('SCAN core_complaint') and 'INDEX' not in detail:
+                self.fail(f'Full table scan:\n{plan}\n{queryset.query}')
+            if 'TEMP B-TREE' in detail:
+                self.fail(f'Unindexed sort:\n{plan}\n{queryset.query}')
+
+    def test_complaints_list(self):
+        self.assertUsesIndex(
+            Complaint.objects.select_related('user', 'user__profile')
+            .order_by('-created_at')[:6]
+        )
+
+    def test_user_complaints(self):
+        # dashboard (citizen) and profile
+        self.assertUsesIndex(Complaint.objects.filter(user=self.alice).order_by('-created_at'))
+
+    def test_pending_complaints(self):
+        # dashboard top complaints and admin_dashboard pending list
+        self.assertUsesIndex(
+            Complaint.objects.select_related('user')
+            .filter(status='pending').order_by('-created_at')[:5]
+        )
+
+    def test_sla_breached_complaints(self):
+        # admin_dashboard breached list and sweep_sla_breaches
+        self.assertUsesIndex(
+            Complaint.objects.pending_past_deadline().with_sla().order_by('sla_deadline')
+        )
+        self.assertUsesIndex(
+            Complaint.objects.pending_past_deadline()
+            .filter(issue_type='garbage', sla_breached_at__isnull=True)
+        )
+
+    def test_near(self):
+        self.assertUsesIndex(Complaint.objects.near(19.076, 72.8777, 250))
+
+    def test_duplicate_check(self):
+        with CaptureQueriesContext(connection) as queries:
+            Complaint.objects.find_duplicate('pothole', 19.076, 72.8777)
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {queries[0]['sql']}")
+            plan = str(cursor.fetchall())
+        self.assertIn('complaint_duplicate_idx', plan)
+
+    def test_complaint_list_filters(self):
+        self.assertUsesIndex(Complaint.objects.apply_filters(ward_number='1').sort_by('recent')[:6])
+        self.assertUsesIndex(Complaint.objects.filter_sla('breached'))
+        self.assertUsesIndex(Complaint.objects.filter_sla('active'))
+
+    def test_cursor_page(self):
+        paginator = CursorPaginator(Complaint.objects.sort_by('recent'), 6)
+        make_complaint(self.alice)
+        cursor = paginator.encode_cursor('next', Complaint.objects.get())
+        values = paginator.decode_cursor(cursor)[1]
+        self.assertUsesIndex(paginator.queryset.filter(paginator._after(values))[:7])
+
+    def test_issue_type_filter(self):
+        self.assertUsesIndex(
+            Complaint.objects.filter(issue_type='pothole', status='pending')
+            .order_by('-created_at')
+        )
+
+
+class ComplaintsGeoJsonTests(TestCase):
+    def setUp(self):
+        self.admin = make_user('admin', role='Admin')
+        self.alice = make_user('alice')
+        for offset in range(5):
+            make_complaint(
+                self.alice, issue_type='garbage',
+                latitude=19.07 + offset * 0.001, longitude=72.87,
+            )
+        make_complaint(self.alice, latitude=28.61, longitude=77.20)
+        self.client.force_login(self.admin)
+
+    def get(self, **params):
+        return self.client.get(reverse('complaints_geojson'), params, secure=True)
+
+    def test_points_inside_bbox(self):
+        response = self.get(bbox='72.8,19.0,72.9,19.1', zoom=16)
+        self.assertEqual(response.status_code, 200)
+        features = response.json()['features']
+        self.assertEqual(len(features), 5)
+        self.assertEqual(features[0]['properties']['sla_status'], 'active')
+
+    def test_clusters_at_low_zoom(self):
+        response = self.get(bbox='60,10,90,30', zoom=5)
+        clusters = [f['properties'] for f in response.json()['features']]
+        self.assertTrue(all(c['cluster'] for c in clusters))
+        self.assertEqual(sorted(c['count'] for c in clusters), [1, 5])
+
+    def test_citizen_sees_own_complaints(self):
+        self.client.force_login(make_user('bob'))
+        response = self.get(bbox='72.8,19.0,72.9,19.1', zoom=16)
+        self.assertEqual(response.json()['features'], [])
+
+    def test_zoom_is_clamped(self):
+        # Far past the maximum the grid cell would round to zero; clustered
+        # here as if the viewport held too many points.
+        with patch('core.geo.point_features', return_value=None):
+            response = self.get(bbox='72.8,19.0,72.9,19.1', zoom=2000)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([f['properties']['count'] for f in response.json()['features']], [1] * 5)
+
+        response = self.get(bbox='60,10,90,30', zoom=-40)
+        self.assertEqual([f['properties']['count'] for f in response.json()['features']], [6])
+
+    def test_invalid_bbox(self):
+        self.assertEqual(self.get(bbox='1,2,3', zoom=16).status_code, 400)
+        self.assertEqual(self.get(bbox='10,0,0,10', zoom=16).status_code, 400)
+
+
+class NearTests(TestCase):
+    def setUp(self):
+        self.alice = make_user('alice')
+
+    def test_geohash_encode(self):
+        self.assertEqual(geohash_encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(geohash_encode(19.0760, 72.8777, 5), 'te7ud')
+
+    def test_geohash_kept_in_sync(self):
+        complaint = make_complaint(self.alice, latitude=19.0760, longitude=72.8777)
+        self.assertEqual(complaint.geohash, geohash_encode(19.0760, 72.8777))
+        complaint.latitude = complaint.longitude = None
+        complaint.save()
+        self.assertEqual(complaint.geohash, '')
+
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        center = (19.0760, 72.8777)
+        points = [
+            (center[0] + rng.uniform(-0.02, 0.02), center[1] + rng.uniform(-0.02, 0.02))
+            for _ in range(300)
+        ]
+        for lat, lng in points:
+            make_complaint(self.alice, latitude=lat, longitude=lng)
+        make_complaint(self.alice)
+
+        for radius in (50, 300, 1500):
+            expected = sum(haversine_m(*center, lat, lng) <= radius for lat, lng in points)
+            nearby = Complaint.objects.near(*center, radius)
+            self.assertEqual(nearby.count(), expected, radius)
+            self.assertTrue(all(c.distance_m <= radius for c in nearby))
+
+
+class DuplicateReportTests(TestCase):
+    def setUp(self):
+        self.alice = make_user('alice')
+        self.original = make_complaint(
+            self.alice, issue_type='pothole', latitude=19.0760, longitude=72.8777
+        )
+
+    def report(self, **fields):
+        fields.setdefault('issue_type', 'pothole')
+        fields.setdefault('latitude', 19.0762)
+        fields.setdefault('longitude', 72.8777)
+        return Complaint.objects.report(
+            user=self.alice, title='Issue', description='Description', **fields
+        )
+
+    def test_nearby_report_is_merged(self):
+        complaint, created = self.report()
+        self.assertFalse(created)
+        self.assertEqual(complaint.pk, self.original.pk)
+        self.original.refresh_from_db()
+        self.assertEqual(self.original.report_count, 2)
+        self.assertEqual(Complaint.objects.count(), 1)
+
+    def test_distinct_reports_create_complaints(self):
+        self.assertTrue(self.report(issue_type='garbage')[1])
+        self.assertTrue(self.report(latitude=19.0800)[1])
+        self.assertTrue(self.report(latitude=None, longitude=None)[1])
+
+    def test_only_recent_pending_complaints_match(self):
+        Complaint.objects.filter(pk=self.original.pk).update(
+            created_at=timezone.now() - timedelta(hours=100)
+        )
+        self.assertTrue(self.report()[1])
+
+        recent = Complaint.objects.latest('pk')
+        recent.status = 'resolved'
+        recent.save()
+        self.assertTrue(self.report()[1])
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class ComplaintListFilterTests(TestCase):
+    def setUp(self):
+        self.alice = make_user('alice', ward_number='1')
+        self.bob = make_user('bob', ward_number='2')
+        self.breached_pothole = make_complaint(self.alice, hours_ago=100, issue_type='pothole')
+        self.active_pothole = make_complaint(self.bob, hours_ago=1, issue_type='pothole')
+        self.late_garbage = make_complaint(self.alice, hours_ago=50, resolved_after=30, issue_type='garbage')
+        self.on_time_garbage = make_complaint(self.bob, hours_ago=50, resolved_after=3, issue_type='garbage')
+        self.client.force_login(self.alice)
+
+    def listed(self, **params):
+        response = self.client.get(reverse('complaints'), params, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return [c.pk for c in response.context['complaints']]
+
+    def test_sla_filter_matches_sla_status(self):
+        for sla in ('active', 'resolved', 'breached'):
+            expected = {c.pk for c in Complaint.objects.all() if c.sla_status == sla}
+            self.assertEqual(set(self.listed(sla=sla)), expected, sla)
+
+    def test_combined_filters(self):
+        self.assertEqual(
+            self.listed(status='pending', issue_type='pothole', sla='breached'),
+            [self.breached_pothole.pk],
+        )
+        self.assertEqual(
+            set(self.listed(ward='2')),
+            {self.active_pothole.pk, self.on_time_garbage.pk},
+        )
+
+    def test_sort_and_unknown_values(self):
+        self.assertEqual(self.listed(sort='sla_breach')[0], self.breached_pothole.pk)
+        self.assertEqual(self.listed(sort='oldest')[0], self.breached_pothole.pk)
+        self.assertEqual(len(self.listed(status='bogus', sort='bogus')), 4)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.alice = make_user('alice', ward_number='1')
+        # Several rows share a created_at, so the id tie-break is exercised.
+        self.complaints = []
+        for hours_ago in (1, 1, 1, 2, 3, 3, 4, 5, 6, 7, 8, 9, 9, 10):
+            self.complaints.append(make_complaint(
+                self.alice, hours_ago=hours_ago, before_image='complaints/before.jpg'
+            ))
+        self.client.force_login(self.alice)
+
+    def walk(self, queryset, per_page=4):
+        paginator = CursorPaginator(queryset, per_page)
+        pages = [paginator.get_page()]
+        while pages[-1].has_next:
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        return paginator, pages
+
+    def test_forward_pages_match_full_ordering(self):
+        for sort in Complaint.SORT_ORDERS:
+            queryset = Complaint.objects.sort_by(sort)
+            _, pages = self.walk(queryset)
+            seen = [c.pk for page in pages for c in page]
+            self.assertEqual(seen, [c.pk for c in queryset], sort)
+            self.assertFalse(pages[0].has_previous)
+
+    def test_previous_cursor_returns_same_page(self):
+        paginator, pages = self.walk(Complaint.objects.sort_by('recent'))
+        for earlier, later in zip(pages, pages[1:]):
+            back = paginator.get_page(later.previous_cursor)
+            self.assertEqual([c.pk for c in back], [c.pk for c in earlier])
+            self.assertTrue(back.has_next)
+        self.assertFalse(paginator.get_page(pages[1].previous_cursor).has_previous)
+
+    def test_invalid_cursor_is_first_page(self):
+        paginator = CursorPaginator(Complaint.objects.sort_by('recent'), 4)
+        first = [c.pk for c in paginator.get_page()]
+        for cursor in ('garbage', 'WyJuZXh0Il0', paginator.encode_cursor('next', self.complaints[0])[:-3]):
+            self.assertEqual([c.pk for c in paginator.get_page(cursor)], first)
+
+    def test_ordering_must_end_in_id(self):
+        with self.assertRaises(ValueError):
+            CursorPaginator(Complaint.objects.order_by('-created_at'), 4)
+
+    def test_views_page_by_cursor(self):
+        response = self.client.get(reverse('complaints'), {'sort': 'oldest'}, secure=True)
+        page = response.context['complaints']
+        self.assertEqual(len(page), 6)
+        self.assertEqual(page.estimated_total, len(self.complaints))
+        self.assertContains(response, f'?cursor={page.next_cursor}&sort=oldest')
+
+        response = self.client.get(reverse('profile'), secure=True)
+        page = response.context['user_complaints']
+        self.assertEqual(len(page), 10)
+        response = self.client.get(reverse('profile'), {'cursor': page.next_cursor}, secure=True)
+        self.assertEqual(len(response.context['user_complaints']), 4)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class SearchTests(TestCase):
+    def setUp(self):
+        self.alice = make_user('alice', ward_number='1')
+        self.in_title = make_complaint(
+            self.alice, hours_ago=5, issue_type='water', ward_number='1',
+            title='Burst water pipe', description='Road is flooded.',
+        )
+        self.in_description = make_complaint(
+            self.alice, hours_ago=1, issue_type='water', ward_number='2',
+            title='Flooding near school', description='Looks like a pipe burst under the road.',
+        )
+        self.in_landmark = make_complaint(
+            self.alice, hours_ago=2, issue_type='garbage', ward_number='1',
+            title='Overflowing bin', description='Not cleared for days.', landmark='Pipeline Road junction',
+        )
+        self.client.force_login(self.alice)
+
+    def found(self, text, queryset=None):
+        return [c.pk for c in (Complaint.objects.all() if queryset is None else queryset).search(text).sort_by('relevance')]
+
+    def test_ranked_by_relevance(self):
+        self.assertEqual(self.found('burst pipe'), [self.in_title.pk, self.in_description.pk])
+        # Stemmed: "flooding" finds "flooded".
+        self.assertEqual(set(self.found('flooding')), {self.in_title.pk, self.in_description.pk})
+        self.assertEqual(self.found('pipeline'), [self.in_landmark.pk])
+        self.assertEqual(self.found('sewage'), [])
+
+    def test_combines_with_filters(self):
+        self.assertEqual(self.found('pipe', Complaint.objects.apply_filters(ward_number='2')), [self.in_description.pk])
+        self.assertEqual(self.found('road', Complaint.objects.apply_filters(issue_type='garbage')), [self.in_landmark.pk])
+        self.assertEqual(self.found('pipe', Complaint.objects.apply_filters(status='resolved')), [])
+
+    def test_filtered_search_finds_older_matches(self):
+        resolved = Complaint.objects.filter(pk=self.in_title.pk)
+        resolved.update(status='resolved', resolved_at=timezone.now())
+        with patch('core.search.MAX_SEARCH_MATCHES', 1):
+            # Newer matches outside the filters do not use up the cap.
+            self.assertEqual(self.found('road', Complaint.objects.filter(status='resolved')), [self.in_title.pk])
+            self.assertEqual(self.found('road', Complaint.objects.apply_filters(ward_number='2')), [self.in_description.pk])
+            self.assertEqual(
+                self.found('pipe', Complaint.objects.apply_filters(issue_type='water', ward_number='1')),
+                [self.in_title.pk],
+            )
+            # Unfiltered, the cap keeps the newest match.
+            self.assertEqual(self.found('road'), [self.in_landmark.pk])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.in_landmark.title = 'Burst sewage pipe'
+        self.in_landmark.save()
+        self.assertIn(self.in_landmark.pk, self.found('sewage'))
+        self.in_landmark.delete()
+        self.assertEqual(self.found('sewage'), [])
+        self.assertEqual(len(self.found('pipe')), 2)
+
+    def test_operators_and_punctuation_are_plain_text(self):
+        for text in ('pipe OR -"', 'burst* AND (pipe', 'title:pipe', "'; DROP TABLE core_complaint; --"):
+            self.assertIsInstance(self.found(text), list, text)
+        self.assertFalse(Complaint.objects.search('?!').exists())
+
+    def test_views_search(self):
+        response = self.client.get(reverse('complaints'), {'q': 'burst pipe'}, secure=True)
+        page = response.context['complaints']
+        self.assertEqual([c.pk for c in page], [self.in_title.pk, self.in_description.pk])
+        self.assertIsNone(page.estimated_total)
+        self.assertContains(response, 'value="burst pipe"')
+
+        response = self.client.get(reverse('complaints'), {'q': 'pipe', 'sort': 'recent'}, secure=True)
+        self.assertEqual([c.pk for c in response.context['complaints']], [self.in_description.pk, self.in_title.pk])
+
+        body = self.client.get(reverse('api_complaints'), {'q': 'pipe', 'fields': 'id'}, secure=True).json()
+        self.assertEqual([row['id'] for row in body['results']], [self.in_title.pk, self.in_description.pk])
+
+    def test_relevance_pages_by_cursor(self):
+        for hours_ago in range(5):
+            make_complaint(self.alice, hours_ago=hours_ago, title='Pothole', description='Pothole on the road.')
+        queryset = Complaint.objects.search('road').sort_by('relevance')
+        paginator = CursorPaginator(queryset, 2)
+        pages = [paginator.get_page()]
+        while pages[-1].has_next:
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        self.assertEqual([c.pk for page in pages for c in page], [c.pk for c in queryset])
+        self.assertEqual(len(pages), 4)
+
+
+
+class ComplaintApiTests(TestCase):
+    def setUp(self):
+        self.alice = make_user('alice', ward_number='1')
+        self.complaints = [
+            make_complaint(self.alice, hours_ago=hours_ago, ward_number='1', latitude=19.1, longitude=72.8)
+            for hours_ago in (1, 2, 3, 4, 5)
+        ]
+        self.client.force_login(self.alice)
+
+    def get(self, url, params=None, **headers):
+        return self.client.get(url, params or {}, secure=True, **headers)
+
+    def test_list_pages_with_sparse_fields(self):
+        url = reverse('api_complaints')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(url, {'fields': 'id,status,lat,lng', 'limit': 3})
+        body = response.json()
+        self.assertEqual(body['results'][0], {
+            'id': self.complaints[0].pk, 'status': 'pending', 'lat': 19.1, 'lng': 72.8,
+        })
+        self.assertEqual(len(body['results']), 3)
+        page_query = [q['sql'] for q in queries.captured_queries if 'LIMIT 4' in q['sql']][0]
+        self.assertNotIn('"description"', page_query)
+
+        body = self.get(url, {'fields': 'id', 'limit': 3, 'cursor': body['next_cursor']}).json()
+        self.assertEqual([row['id'] for row in body['results']], [c.pk for c in self.complaints[3:]])
+        self.assertIsNone(body['next_cursor'])
+
+    def test_unchanged_poll_is_not_modified(self):
+        url = reverse('api_complaints')
+        response = self.get(url, {'status': 'pending'})
+        etag = response['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(url, {'status': 'pending'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([q for q in queries.captured_queries if 'LIMIT' in q['sql'] and 'core_complaint' in q['sql']])
+
+        # Other params are a different representation.
+        self.assertEqual(self.get(url, {'status': 'pending', 'fields': 'id'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        complaint = self.complaints[0]
+        complaint.status = 'resolved'
+        complaint.save()
+        response = self.get(url, {'status': 'pending'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()['results']), 4)
+
+    def test_detail(self):
+        complaint = self.complaints[0]
+        url = reverse('api_complaint_detail', args=[complaint.pk])
+        response = self.get(url)
+        self.assertEqual(response.json()['ward'], '1')
+        self.assertIsNone(response.json()['before_image'])
+        self.assertEqual(self.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        missing = reverse('api_complaint_detail', args=[complaint.pk + 100])
+        self.assertEqual(self.get(missing).status_code, 404)
+        self.assertFalse(self.get(missing).has_header('ETag'))
+
+    def test_every_write_changes_the_etag(self):
+        complaint = self.complaints[0]
+        list_url = reverse('api_complaints')
+        detail_url = reverse('api_complaint_detail', args=[complaint.pk])
+
+        def retitle():
+            complaint.title = 'Renamed'
+            complaint.save()
+
+        for write in (
+            retitle,
+            # A duplicate report is an update() of report_count alone.
+            lambda: Complaint.objects.report(
+                user=self.alice, title='Same again', description='Still there.',
+                issue_type=complaint.issue_type, latitude=19.1, longitude=72.8,
+            ),
+        ):
+            etags = {url: self.get(url)['ETag'] for url in (list_url, detail_url)}
+            write()
+            for url, etag in etags.items():
+                self.assertEqual(self.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.get(detail_url).json()['report_count'], 2)
+
+    def test_bad_params(self):
+        url = reverse('api_complaints')
+        self.assertEqual(self.get(url, {'fields': 'id,password'}).status_code, 400)
+        self.assertEqual(self.get(url, {'limit': 0}).status_code, 400)
+        self.assertEqual(self.get(url, {'sort': 'random'}).status_code, 400)
+        self.assertEqual(self.client.post(url, secure=True).status_code, 405)
+
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class ConditionalPageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = make_user('alice', ward_number='1')
+        self.complaint = make_complaint(self.alice, hours_ago=2, before_image='complaints/before.jpg')
+        self.client.force_login(self.alice)
+
+    def get(self, name, *args, **headers):
+        return self.client.get(reverse(name, args=args), secure=True, **headers)
+
+    def test_repeat_view_is_not_modified(self):
+        response = self.get('dashboard')
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertTrue(response.has_header('Last-Modified'))
+        etag = response['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get('dashboard', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertLessEqual(len(queries), 3)
+
+        make_complaint(self.alice, hours_ago=1)
+        self.assertEqual(self.get('dashboard', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_depends_on_viewer(self):
+        etag = self.get('dashboard')['ETag']
+        self.client.force_login(make_user('bob', ward_number='1'))
+        self.assertEqual(self.get('dashboard', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_complaint_detail_changes_when_resolved(self):
+        etag = self.get('complaint_detail', self.complaint.pk)['ETag']
+        self.assertEqual(self.get('complaint_detail', self.complaint.pk, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.complaint.status = 'resolved'
+        self.complaint.save()
+        self.assertEqual(self.get('complaint_detail', self.complaint.pk, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_missing_complaint_stays_not_found(self):
+        missing = self.complaint.pk + 100
+        self.assertEqual(self.get('complaint_detail', missing, HTTP_IF_NONE_MATCH='*').status_code, 404)
+
+    def test_pending_message_forces_full_render(self):
+        self.client.force_login(make_user('admin', role='Admin'))
+        resolve = {'complaint_id': self.complaint.pk}
+        self.client.post(reverse('resolve_complaint'), resolve, secure=True)
+        self.assertContains(self.get('complaint_detail', self.complaint.pk), 'Complaint marked as resolved.')
+        etag = self.get('complaint_detail', self.complaint.pk)['ETag']
+
+        # Resolving another complaint changes nothing here, but its message
+        # must still be shown.
+        other = make_complaint(self.complaint.user, hours_ago=1)
+        self.client.post(reverse('resolve_complaint'), {'complaint_id': other.pk}, secure=True)
+        response = self.get('complaint_detail', self.complaint.pk, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Complaint marked as resolved.')
+        self.assertEqual(self.get('complaint_detail', self.complaint.pk, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # The admin dashboard shows no messages, so it stays conditional.
+        # (Its first render sets the CSRF cookie, which is part of the ETag.)
+        self.get('admin_dashboard')
+        etag = self.get('admin_dashboard')['ETag']
+        self.assertEqual(self.get('admin_dashboard', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_city_wide_pages_check_the_rollup(self):
+        self.client.force_login(make_user('admin', role='Admin'))
+        for name in ('admin_dashboard', 'dashboard'):
+            self.get(name)
+            etag = self.get(name)['ETag']
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.get(name, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            self.assertFalse([q for q in queries.captured_queries if 'core_complaint"' in q['sql']])
+
+        etags = {name: self.get(name)['ETag'] for name in ('admin_dashboard', 'dashboard')}
+        self.complaint.status = 'resolved'
+        self.complaint.save()
+        for name, etag in etags.items():
+            self.assertEqual(self.get(name, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etags = {name: self.get(name)['ETag'] for name in ('admin_dashboard', 'dashboard')}
+        self.complaint.delete()
+        for name, etag in etags.items():
+            self.assertEqual(self.get(name, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_complaint_cards_are_cached_until_they_change(self):
+        self.assertContains(self.get('complaints'), 'Description')
+        Complaint.objects.filter(pk=self.complaint.pk).update(description='Edited quietly')
+        self.assertNotContains(self.get('complaints'), 'Edited quietly')
+
+        Complaint.objects.filter(pk=self.complaint.pk).update(report_count=2)
+        self.assertContains(self.get('complaints'), 'Edited quietly')
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class AsyncDashboardTests(TestCase):
+    def setUp(self):
+        self.admin = make_user('admin', role='Admin', ward_number='1')
+        self.alice = make_user('alice', ward_number='1')
+        make_complaint(self.alice, hours_ago=100, issue_type='garbage')
+        make_complaint(self.alice, hours_ago=1, issue_type='pothole')
+        make_complaint(self.alice, hours_ago=50, resolved_after=3, issue_type='garbage')
+        call_command('rebuild_rollups', stdout=StringIO())
+
+    def asgi_get(self, url, **params):
+        async def get():
+            return await self.async_client.get(url, params, secure=True)
+        return async_to_sync(get)()
+
+    def comparable(self, context, keys):
+        return {
+            key: [getattr(item, 'pk', item) for item in context[key]]
+            if isinstance(context[key], (list, QuerySet)) else context[key]
+            for key in keys
+        }
+
+    def test_asgi_context_matches_wsgi(self):
+        pages = {
+            'dashboard': ('total_complaints', 'pending_in_sla', 'active_reporters', 'recent_activities', 'top_complaints'),
+            'admin_dashboard': ('total_complaints', 'pending_sla_breached_count', 'sla_breached_complaints', 'pending_complaints_list'),
+        }
+        for user in (self.admin, self.alice):
+            self.client.force_login(user)
+            self.async_client.force_login(user)
+            for name, keys in pages.items():
+                wsgi = self.client.get(reverse(name), secure=True)
+                asgi = self.asgi_get(reverse(name))
+                self.assertEqual(asgi.status_code, 200, name)
+                self.assertEqual(self.comparable(asgi.context, keys), self.comparable(wsgi.context, keys), name)
+
+    def test_async_views_require_login(self):
+        response = self.asgi_get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('next=/dashboard/', response['Location'])
+
+    def test_gather_queries_keeps_order(self):
+        calls = (lambda: 'first', Complaint.objects.count, lambda: 'last')
+        self.assertEqual(async_to_sync(gather_queries)(*calls), ['first', 3, 'last'])
+        with override_settings(PAGE_QUERY_THREADS=0):
+            self.assertEqual(async_to_sync(gather_queries)(*calls), ['first', 3, 'last'])
+
+    def test_export_streams_under_asgi(self):
+        self.client.force_login(self.admin)
+        self.async_client.force_login(self.admin)
+        url = reverse('export_complaints')
+        wsgi = b''.join(self.client.get(url, secure=True).streaming_content)
+
+        async def read():
+            response = await self.async_client.get(url, secure=True)
+            self.assertTrue(response.is_async)
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        self.assertEqual(async_to_sync(read)(), wsgi)
+
+
+def routed_reads(request):
+    """A view answering with the database its reads would go to."""
+    return HttpResponse(router.db_for_read(Complaint))
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    DATABASE_REPLICAS=['replica1', 'replica2'],
+)
+class ReplicaRoutingTests(TestCase):
+    def serve(self, view, method='get', **cookies):
+        request = getattr(RequestFactory(), method)('/')
+        request.COOKIES.update(cookies)
+        return ReplicaRoutingMiddleware(view)(request)
+
+    def test_read_only_views_read_from_a_replica(self):
+        response = self.serve(read_from_replica(routed_reads))
+        self.assertIn(response.content.decode(), {'replica1', 'replica2'})
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+        async def async_view(request):
+            return routed_reads(request)
+
+        self.assertIn(self.serve(async_to_sync(read_from_replica(async_view))).content.decode(), {'replica1', 'replica2'})
+        self.assertEqual(router.db_for_write(Complaint), 'default')
+
+    def test_everything_else_reads_from_the_primary(self):
+        self.assertEqual(self.serve(routed_reads).content, b'default')
+        self.assertEqual(self.serve(read_from_replica(routed_reads), method='post').content, b'default')
+        self.assertEqual(self.serve(read_from_replica(routed_reads), **{STICKY_COOKIE: '1'}).content, b'default')
+        self.assertEqual(router.db_for_read(Complaint), 'default')
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(self.serve(read_from_replica(routed_reads)).content, b'default')
+
+    def test_reads_after_a_write_stay_on_the_primary(self):
+        def write_then_read(request):
+            router.db_for_write(Complaint)
+            return routed_reads(request)
+
+        response = self.serve(read_from_replica(write_then_read))
+        self.assertEqual(response.content, b'default')
+        self.assertEqual(response.cookies[STICKY_COOKIE]['max-age'], settings.REPLICA_STICKY_SECONDS)
+
+    def test_login_sticks_to_the_primary(self):
+        response = self.client.post(
+            reverse('login'), {'email': 'demo@city.com', 'password': 'demo12345'}, secure=True,
+        )
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        # Only the primary exists here: a replica read would fail.
+        self.assertEqual(self.client.get(reverse('admin_dashboard'), secure=True).status_code, 200)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class LandingStatsCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = make_user('alice', locality='Andheri')
+
+    def landing(self):
+        response = self.client.get(reverse('index'), secure=True)
+        self.assertEqual(response.status_code, 200)
+        return {key: response.context[key] for key in ('resolved_count', 'active_citizens', 'localities_covered')}
+
+    def test_cached_hit_runs_one_query(self):
+        self.landing()
+        # The CacheGeneration lookup.
+        with self.assertNumQueries(1):
+            self.landing()
+
+    def test_invalidation_from_another_process(self):
+        self.assertEqual(self.landing()['active_citizens'], 0)
+        make_complaint(self.alice)  # Its on-commit invalidation never runs here.
+        self.assertEqual(self.landing()['active_citizens'], 0)
+        # As import_complaints would, from a process with a cache of its own.
+        with patch('core.stats.cache', LocMemCache('elsewhere', {})):
+            invalidate_landing_stats()
+        self.assertEqual(self.landing()['active_citizens'], 1)
+
+    def test_complaint_changes_invalidate(self):
+        self.assertEqual(self.landing()['active_citizens'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            complaint = make_complaint(self.alice)
+        self.assertEqual(self.landing()['active_citizens'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            complaint.status = 'resolved'
+            complaint.save()
+        self.assertEqual(self.landing()['resolved_count'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            complaint.delete()
+        self.assertEqual(self.landing()['active_citizens'], 0)
+
+    def test_profile_changes_invalidate(self):
+        self.assertEqual(self.landing()['localities_covered'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_user('bob', locality='Bandra')
+        self.assertEqual(self.landing()['localities_covered'], 2)
+
+    def test_pending_edit_keeps_cache(self):
+        complaint = make_complaint(self.alice)
+        self.landing()
+        with self.captureOnCommitCallbacks() as callbacks:
+            complaint.description = 'Edited'
+            complaint.save()
+        self.assertEqual(callbacks, [])
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class ProfileMiddlewareTests(TestCase):
+    def test_profile_created_with_account(self):
+        user = get_user_model().objects.create_user(username='carol', password='pw')
+        self.assertEqual(user.profile.name, 'carol')
+        self.assertEqual(user.profile.role, 'Citizen')
+
+    def test_session_user_loaded_with_profile_and_no_writes(self):
+        alice = make_user('alice', role='Admin', ward_number='3', locality='Andheri')
+        self.client.force_login(alice)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('dashboard'), secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['user'].role, 'Admin')
+        self.assertEqual(response.context['user'].ward_number, '3')
+
+        sql = [query['sql'] for query in queries.captured_queries]
+        user_queries = [q for q in sql if 'FROM "auth_user"' in q and 'WHERE "auth_user"."id"' in q]
+        self.assertEqual(len(user_queries), 1)
+        self.assertIn('core_userprofile', user_queries[0])
+        self.assertFalse([q for q in sql if q.startswith(('INSERT', 'UPDATE')) and 'django_session' not in q])
+
+    def test_sessions_from_before_profile_backend_stay_signed_in(self):
+        self.client.force_login(make_user('alice'), backend='django.contrib.auth.backends.ModelBackend')
+        self.assertEqual(self.client.get(reverse('profile'), secure=True).status_code, 200)
+
+    def test_wrong_password_is_checked_once(self):
+        get_user_model().objects.create_user(username='carol', password='pw')
+        with patch('django.contrib.auth.models.User.check_password', return_value=False) as check:
+            self.assertIsNone(authenticate(username='carol', password='wrong'))
+        self.assertEqual(check.call_count, 1)
+
+    def test_missing_profile_is_not_created_on_read(self):
+        bob = make_user('bob')
+        UserProfile.objects.filter(user=bob).delete()
+        self.client.force_login(bob)
+
+        response = self.client.get(reverse('profile'), secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['user'].role, 'Citizen')
+        self.assertFalse(UserProfile.objects.filter(user=bob).exists())
+
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class RequestTimingMiddlewareTests(TestCase):
+    def setUp(self):
+        self.client.force_login(make_user('alice', ward_number='1'))
+
+    def server_timing(self, response):
+        metrics = {}
+        for entry in response['Server-Timing'].split(', '):
+            name, *params = entry.split(';')
+            metrics[name] = dict(param.split('=', 1) for param in params)
+        return metrics
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=1.0, REQUEST_TIMING_SLOW_MS=60000)
+    def test_server_timing_header_and_log_line(self):
+        with self.assertLogs('core.timing', 'INFO') as logs:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('complaints'), secure=True)
+
+        metrics = self.server_timing(response)
+        self.assertEqual(set(metrics), {'db', 'db-slowest', 'tpl', 'total'})
+        self.assertEqual(metrics['db']['desc'], f'"{len(queries)} queries"')
+        self.assertGreater(float(metrics['tpl']['dur']), 0)
+        self.assertGreaterEqual(float(metrics['total']['dur']), float(metrics['db']['dur']))
+
+        [record] = logs.records
+        self.assertEqual(record.levelname, 'INFO')
+        self.assertEqual(record.timing['path'], reverse('complaints'))
+        self.assertEqual(record.timing['queries'], len(queries))
+        self.assertNotIn('slowest_sql', record.timing)
+
+    # Slow requests are reported whatever the sample rate.
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0.0, REQUEST_TIMING_SLOW_MS=0)
+    def test_slow_request_logs_slowest_query(self):
+        with self.assertLogs('core.timing', 'WARNING') as logs:
+            response = self.client.get(reverse('complaints'), secure=True)
+        self.assertTrue(response.has_header('Server-Timing'))
+        [record] = logs.records
+        self.assertIn('SELECT', record.timing['slowest_sql'])
+        self.assertNotIn('alice', record.timing['slowest_sql'])
+
+    @override_settings(REQUEST_TIMING_SAMPLE_RATE=0.0, REQUEST_TIMING_SLOW_MS=60000)
+    def test_unsampled_request_is_not_instrumented(self):
+        with self.assertNoLogs('core.timing'):
+            response = self.client.get(reverse('complaints'), secure=True)
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.metrics_dir, ignore_errors=True)
+        # Or the store left behind flushes into the removed directory at exit.
+        self.addCleanup(setattr, metrics, '_store', None)
+        self.settings_override = override_settings(METRICS_DIR=self.metrics_dir, METRICS_TOKEN='s3cret')
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def scrape(self, **headers):
+        headers.setdefault('HTTP_AUTHORIZATION', 'Bearer s3cret')
+        response = self.client.get(reverse('metrics'), secure=True, **headers)
+        samples = {}
+        for line in response.content.decode().splitlines() if response.status_code == 200 else []:
+            if line and not line.startswith('#'):
+                name, value = line.rsplit(' ', 1)
+                samples[name] = float(value)
+        return response, samples
+
+    def test_request_histograms_and_complaint_gauges(self):
+        alice = make_user('alice', ward_number='1')
+        make_complaint(alice, hours_ago=2, issue_type='garbage')
+        make_complaint(alice, hours_ago=30 * 24, issue_type='garbage')
+        make_complaint(alice, hours_ago=10, resolved_after=1, issue_type='pothole')
+        call_command('rebuild_rollups', stdout=StringIO())
+
+        for _ in range(2):
+            self.client.get(reverse('index'), secure=True)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('index'), secure=True)
+
+        response, samples = self.scrape()
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        self.assertEqual(samples['smartcities_request_duration_seconds_count{view="index"}'], 3)
+        self.assertEqual(samples['smartcities_request_duration_seconds_bucket{view="index",le="+Inf"}'], 3)
+        self.assertEqual(samples['smartcities_request_queries_bucket{view="index",le="89"}'], 3)
+        self.assertGreaterEqual(samples['smartcities_request_queries_sum{view="index"}'], len(queries))
+        self.assertEqual(samples['smartcities_complaints_pending'], 2)
+        self.assertEqual(samples['smartcities_complaints_pending_sla_breached'], 1)
+
+    def test_counts_from_other_workers_are_added(self):
+        self.client.get(reverse('index'), secure=True)
+        other_worker = MetricsStore(self.metrics_dir)
+        other_worker.observe('smartcities_request_duration_seconds', 'index', 0.2)
+        other_worker.observe('smartcities_request_duration_seconds', 'dashboard', 20)
+        other_worker.flush()
+
+        _, samples = self.scrape()
+        self.assertEqual(samples['smartcities_request_duration_seconds_count{view="index"}'], 2)
+        self.assertEqual(samples['smartcities_request_duration_seconds_bucket{view="dashboard",le="10"}'], 0)
+        self.assertEqual(samples['smartcities_request_duration_seconds_bucket{view="dashboard",le="+Inf"}'], 1)
+        self.assertEqual(samples['smartcities_request_duration_seconds_sum{view="dashboard"}'], 20)
+
+    def test_token(self):
+        response, _ = self.scrape(HTTP_AUTHORIZATION='')
+        self.assertEqual(response.status_code, 401)
+        response, _ = self.scrape(HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 401)
+
+    def test_disabled_without_token_unless_debug(self):
+        with override_settings(METRICS_TOKEN=''):
+            response, _ = self.scrape(HTTP_AUTHORIZATION='')
+            self.assertEqual(response.status_code, 403)
+            with override_settings(DEBUG=True):
+                response, _ = self.scrape(HTTP_AUTHORIZATION='')
+                self.assertEqual(response.status_code, 200)
+
+
+def make_photo(width=4000, height=3000):
+    """A phone-sized JPEG with EXIF (orientation + camera model)."""
+    image = Image.effect_noise((width, height), 64).convert('RGB')
+    exif = Image.Exif()
+    exif[0x0110] = 'Test Phone'
+    exif[0x0112] = 6  # rotated 90 degrees
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=95, exif=exif)
+    return SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+
+@override_settings(TASKS_EAGER=True)
+class ImageRenditionTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.alice = make_user('alice')
+
+    def test_upload_gets_small_renditions_without_exif(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            complaint = Complaint.objects.create(
+                user=self.alice, title='Issue', description='Description', before_image=make_photo()
+            )
+        complaint.refresh_from_db()
+
+        self.assertEqual(complaint.pending_renditions(), [])
+        storage = complaint.before_image.storage
+        thumb = complaint.renditions['before_image']['thumb']
+        self.assertLess(storage.size(thumb), 50 * 1024)
+        self.assertEqual(complaint.before_thumb_url, storage.url(thumb))
+
+        with storage.open(complaint.renditions['before_image']['medium']) as medium_file:
+            medium = Image.open(medium_file)
+            medium.load()
+        # Portrait after applying the EXIF orientation, with no EXIF left.
+        self.assertEqual(medium.size, (960, 1280))
+        self.assertFalse(medium.getexif())
+
+    def test_original_served_until_rendered_and_backfill(self):
+        complaint = Complaint.objects.create(
+            user=self.alice, title='Issue', description='Description', before_image=make_photo(800, 600)
+        )
+        self.assertEqual(complaint.before_thumb_url, complaint.before_image.url)
+
+        call_command('generate_renditions', stdout=StringIO())
+        complaint.refresh_from_db()
+        self.assertEqual(complaint.pending_renditions(), [])
+        self.assertTrue(complaint.before_thumb_url.endswith('.thumb.webp'))
+
+        complaint.after_image = make_photo(800, 600)
+        self.assertEqual(complaint.pending_renditions(), ['after_image'])
+
+
+    def test_unreadable_image_fails_the_task(self):
+        with self.assertLogs('core.images', 'WARNING'), self.captureOnCommitCallbacks(execute=True):
+            complaint = Complaint.objects.create(
+                user=self.alice, title='Issue', description='Description',
+                before_image='complaints/before/missing.jpg',
+            )
+        queued = Task.objects.get()
+        self.assertEqual(queued.status, 'queued')  # For a retry.
+        self.assertIn('Could not render before_image', queued.last_error)
+        complaint.refresh_from_db()
+        self.assertEqual(complaint.pending_renditions(), ['before_image'])
+
+        with self.assertLogs('core.images', 'WARNING'), self.assertRaises(CommandError):
+            call_command('generate_renditions', stdout=StringIO(), stderr=StringIO())
+
+
+TASK_CALLS = []
+
+
+@task(max_attempts=2)
+def record_call(value, fail=False):
+    TASK_CALLS.append(value)
+    if fail:
+        raise RuntimeError('boom')
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        TASK_CALLS.clear()
+
+    def test_delay_queues_until_a_worker_runs_it(self):
+        queued = record_call.delay(1)
+        self.assertEqual((queued.name, queued.args, queued.status), ('core.tests.record_call', [1], 'queued'))
+        self.assertEqual(TASK_CALLS, [])
+
+        claimed = claim_tasks('w1', 10)
+        self.assertEqual([t.pk for t in claimed], [queued.pk])
+        self.assertEqual(claim_tasks('w2', 10), [])
+
+        run_task(claimed[0])
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), ('done', 1))
+        self.assertEqual(TASK_CALLS, [1])
+
+    def test_retry_with_backoff_then_fail(self):
+        queued = record_call.delay(2, fail=True)
+        run_task(claim_tasks('w1', 10)[0])
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'queued')
+        self.assertGreater(queued.run_at, timezone.now())
+        self.assertIn('boom', queued.last_error)
+        self.assertEqual(claim_tasks('w1', 10), [])
+
+        Task.objects.filter(pk=queued.pk).update(run_at=timezone.now())
+        run_task(claim_tasks('w1', 10)[0])
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), ('failed', 2))
+
+    def test_stale_running_task_is_reclaimed(self):
+        queued = record_call.delay(3)
+        claim_tasks('dead', 10)
+        self.assertEqual(claim_tasks('w1', 10), [])
+        Task.objects.filter(pk=queued.pk).update(locked_at=timezone.now() - STALE_AFTER * 2)
+        self.assertEqual([t.pk for t in claim_tasks('w1', 10)], [queued.pk])
+
+    def test_stale_task_without_attempts_left_fails(self):
+        queued = record_call.delay(4)
+        for _ in range(queued.max_attempts):
+            Task.objects.filter(pk=queued.pk).update(locked_at=timezone.now() - STALE_AFTER * 2)
+            self.assertEqual(len(claim_tasks('hung', 10)), 1)
+
+        Task.objects.filter(pk=queued.pk).update(locked_at=timezone.now() - STALE_AFTER * 2)
+        self.assertEqual(claim_tasks('w1', 10), [])
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), ('failed', queued.max_attempts))
+        self.assertIn('stopped responding', queued.last_error)
+
+    @override_settings(TASK_RETENTION_DAYS=7)
+    def test_old_finished_tasks_are_pruned(self):
+        old, recent, failed = (record_call.delay(n) for n in (5, 6, 7))
+        Task.objects.filter(pk__in=[old.pk, recent.pk]).update(status='done')
+        Task.objects.filter(pk=failed.pk).update(status='failed')
+        Task.objects.update(finished_at=timezone.now() - timedelta(days=8))
+        Task.objects.filter(pk=recent.pk).update(finished_at=timezone.now() - timedelta(days=6))
+
+        out = StringIO()
+        call_command('run_worker', burst=True, stdout=out)
+        self.assertIn('Deleted 1 finished tasks.', out.getvalue())
+        self.assertEqual(sorted(Task.objects.values_list('pk', flat=True)), [recent.pk, failed.pk])
+
+    def test_unregistered_name_is_not_run(self):
+        queued = Task.objects.create(name='os.remove', args=['/tmp/nothing'], max_attempts=1)
+        run_task(claim_tasks('w1', 10)[0])
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'failed')
+
+
+class ImportComplaintsTests(TestCase):
+    def setUp(self):
+        self.alice = make_user('alice@city.com', ward_number='7')
+        self.legacy = make_user('legacy@city.com')
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, content):
+        path = f'{self.directory}/{name}'
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(content)
+        return path
+
+    def run_import(self, path, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_complaints', path, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_import(self):
+        path = self.write('legacy.csv', (
+            'user,title,description,issue_type,status,created_at,resolved_at,locality,latitude,longitude\n'
+            'alice@city.com,Pothole,Deep pothole,pothole,resolved,2020-01-01T10:00:00,2020-01-05T10:00:00,,19.07,72.87\n'
+            'alice@city.com,Dark,Streetlight out,streetlight,pending,2020-01-02,,Bandra,,\n'
+            'nobody@city.com,Bad user,Text,other,pending,2020-01-02,,,,\n'
+            'alice@city.com,Bad type,Text,volcano,pending,2020-01-02,,,,\n'
+            'alice@city.com,Bad date,Text,other,pending,2020-13-45,,,,\n'
+        ))
+        _, err = self.run_import(path, '--batch-size=2')
+        self.assertIn('row 2: unknown user', err)
+        self.assertIn('row 3: unknown issue_type', err)
+        self.assertIn('row 4: created_at', err)
+
+        pothole = Complaint.objects.get(title='Pothole')
+        self.assertEqual(pothole.created_at.year, 2020)
+        self.assertEqual(pothole.ward_number, '7')
+        self.assertEqual(pothole.geohash, geohash_encode(19.07, 72.87))
+        # 96h to resolve against a 72h pothole SLA
+        self.assertEqual(pothole.sla_breached_at, pothole.resolved_at)
+        self.assertEqual(Complaint.objects.get(title='Dark').ward_number, '2')
+
+        totals = rollup_stats()
+        self.assertEqual((totals['total'], totals['resolved'], totals['sla_breached']), (2, 1, 2))
+
+    def test_ndjson_resume_and_default_user(self):
+        path = self.write('legacy.ndjson', '\n'.join([
+            json.dumps({'user': 'alice@city.com', 'description': 'First'}),
+            '{not json',
+            json.dumps({'user': 'ghost@city.com', 'description': 'Second', 'latitude': 19.1, 'longitude': 72.9}),
+        ]))
+        _, err = self.run_import(path, '--start-at=1', '--default-user=legacy@city.com')
+        self.assertIn('row 1: bad JSON', err)
+        self.assertEqual(list(Complaint.objects.values_list('description', 'user')), [('Second', self.legacy.pk)])
+
+
+class ExportComplaintsTests(TestCase):
+    def setUp(self):
+        self.admin = make_user('admin', role='Admin')
+        self.alice = make_user('alice', ward_number='1')
+        self.old = make_complaint(self.alice, hours_ago=24 * 40, issue_type='pothole')
+        self.recent = make_complaint(self.alice, hours_ago=1, resolved_after=0, issue_type='garbage')
+        self.other_ward = make_complaint(make_user('bob', ward_number='2'), hours_ago=1)
+        self.client.force_login(self.admin)
+
+    def export(self, **params):
+        response = self.client.get(reverse('export_complaints'), params, secure=True)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_with_sla_fields_and_filters(self):
+        lines = self.export(format='csv', ward='1').splitlines()
+        header = lines[0].split(',')
+        self.assertIn('sla_status', header)
+        rows = [dict(zip(header, line.split(','))) for line in lines[1:]]
+        self.assertEqual([int(row['id']) for row in rows], [self.old.pk, self.recent.pk])
+        self.assertEqual(rows[0]['sla_status'], 'breached')
+        self.assertEqual(rows[1]['sla_status'], 'resolved')
+
+    def test_ndjson_date_range(self):
+        since = (timezone.localdate() - timedelta(days=1)).isoformat()
+        rows = [json.loads(line) for line in self.export(format='ndjson', **{'from': since}).splitlines()]
+        self.assertEqual({row['id'] for row in rows}, {self.recent.pk, self.other_ward.pk})
+        self.assertEqual(self.export(format='ndjson', to='2000-01-01'), '')
+
+    def test_rejects_non_admins_and_bad_params(self):
+        self.assertEqual(self.client.get(reverse('export_complaints'), {'format': 'xml'}, secure=True).status_code, 400)
+        self.assertEqual(self.client.get(reverse('export_complaints'), {'from': 'soon'}, secure=True).status_code, 400)
+        self.client.force_login(self.alice)
+        self.assertEqual(self.client.get(reverse('export_complaints'), secure=True).status_code, 403)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class ResolutionAnalyticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = make_user('admin', role='Admin')
+        self.alice = make_user('alice', ward_number='1')
+        self.client.force_login(self.admin)
+
+    def get(self, **params):
+        response = self.client.get(reverse('resolution_analytics'), params, secure=True)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_percentiles_compliance_and_backlog(self):
+        rng = random.Random(7)
+        hours = [rng.uniform(1, 60) for _ in range(25)]
+        resolved_at = timezone.now() - timedelta(days=3)
+        for resolved_after in hours:
+            complaint = make_complaint(self.alice, issue_type='pothole')
+            Complaint.objects.filter(pk=complaint.pk).update(
+                status='resolved',
+                created_at=resolved_at - timedelta(hours=resolved_after),
+                resolved_at=resolved_at,
+                sla_breached_at=resolved_at if resolved_after > 48 else None,
+            )
+        make_complaint(self.alice, hours_ago=1, issue_type='pothole')
+
+        data = self.get(group_by='ward', **{'from': (timezone.localdate() - timedelta(days=10)).isoformat()})
+        [group] = data['groups']
+        self.assertEqual(group['ward_number'], '1')
+        self.assertEqual(len(group['series']), 11)
+
+        [bucket] = [row for row in group['series'] if row['bucket'] == resolved_at.date().isoformat()]
+        self.assertEqual(bucket['resolved'], 25)
+        for q in (50, 90, 99):
+            self.assertAlmostEqual(bucket[f'p{q}_hours'], float(np.percentile(hours, q)), places=1)
+        self.assertAlmostEqual(bucket['sla_compliance'], sum(h <= 48 for h in hours) / 25, places=3)
+        self.assertEqual(group['series'][-1]['backlog'], 1)
+        self.assertEqual(sum(row['created'] for row in group['series']), 26)
+
+    def test_closed_buckets_cached(self):
+        make_complaint(self.alice, hours_ago=24 * 3, resolved_after=2)
+        self.get(period='week', group_by='ward,issue_type')
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get(period='week', group_by='ward,issue_type')
+        complaint_queries = [q for q in queries.captured_queries if 'core_complaint' in q['sql']]
+        # Only the open (current week) bucket is computed: 3 queries.
+        self.assertEqual(len(complaint_queries), 3)
+        self.assertEqual(len(data['groups'][0]['series']), 30)
+
+    def test_sliding_window_reuses_closed_buckets(self):
+        make_complaint(self.alice, hours_ago=24 * 20)
+        make_complaint(self.alice, hours_ago=24 * 13, resolved_after=30)
+        today = timezone.localdate()
+        first = self.get(**{'from': (today - timedelta(days=14)).isoformat()})
+
+        def complaint_queries(**params):
+            with CaptureQueriesContext(connection) as queries:
+                data = self.get(**params)
+            return data, len([q for q in queries.captured_queries if 'core_complaint' in q['sql']])
+
+        # Moved on: every closed bucket is already cached.
+        data, count = complaint_queries(**{'from': (today - timedelta(days=10)).isoformat()})
+        self.assertEqual(count, 3)
+        self.assertEqual(data['groups'][0]['series'], first['groups'][0]['series'][4:])
+
+        # Reaching further back computes just the new buckets, in one run.
+        data, count = complaint_queries(**{'from': (today - timedelta(days=25)).isoformat()})
+        self.assertEqual(count, 6)
+        self.assertEqual(data['groups'][0]['series'][11:], first['groups'][0]['series'])
+        cache.clear()
+        self.assertEqual(self.get(**{'from': (today - timedelta(days=25)).isoformat()}), data)
+
+    def test_bad_params(self):
+        for params in ({'period': 'hour'}, {'group_by': 'user'}, {'from': '2020-01-01', 'to': '2019-01-01'},
+                       {'from': '1990-01-01'}):
+            response = self.client.get(reverse('resolution_analytics'), params, secure=True)
+            self.assertEqual(response.status_code, 400, params)
+        self.client.force_login(self.alice)
+        self.assertEqual(self.client.get(reverse('resolution_analytics'), secure=True).status_code, 403)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class QueryBudgetTests(TestCase):
+    """Each page's query count stays within QUERY_BUDGETS and does not grow with the data."""
+
+    def setUp(self):
+        self.rng = random.Random(3)
+        self.users = seed_users(10, self.rng)
+        self.admin = make_user('admin', role='Admin', ward_number='1')
+        self.citizen = make_user('citizen', ward_number='1')
+        self.users.append((self.citizen.pk, '1'))
+
+    def query_counts(self):
+        counts = {}
+        for user in (self.admin, self.citizen):
+            self.client.force_login(user)
+            for name in QUERY_BUDGETS:
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(reverse(name), secure=True)
+                self.assertEqual(response.status_code, 200, name)
+                counts[name, user.username] = len(queries)
+        return counts
+
+    def test_query_budgets(self):
+        seed_complaints(self.users, 20, self.rng)
+        small = self.query_counts()
+        seed_complaints(self.users, 80, self.rng)
+        large = self.query_counts()
+
+        for (name, username), count in large.items():
+            self.assertLessEqual(count, QUERY_BUDGETS[name], f'{name} as {username}')
+            self.assertEqual(count, small[name, username], f'{name} as {username} grows with the data')
+
+    def test_seeded_data_is_consistent(self):
+        seed_complaints(self.users, 200, self.rng)
+        self.assertEqual(Complaint.objects.count(), 200)
+        self.assertEqual(rollup_stats()['total'], 200)
+        resolved = Complaint.objects.filter(status='resolved')
+        self.assertTrue(resolved.exists())
+        self.assertFalse(resolved.filter(resolved_at__isnull=True).exists())
+        self.assertFalse(Complaint.objects.filter(sla_deadline__isnull=True).exists())
+        self.assertFalse(Complaint.objects.filter(geohash='').exists())
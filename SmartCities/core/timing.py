@@ -0,0 +1,79 @@
+import threading
+import time
+from contextvars import ContextVar
+
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+# RequestTimings of the request being handled; None outside requests.
+current_timings = ContextVar('current_timings', default=None)
+
+
+class RequestTimings:
+    """SQL and template time spent on one request, gathered by RequestTimingMiddleware."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.slowest_sql = ''
+        self.slowest_seconds = 0.0
+        # Queries of one request may run on several threads (gather_queries).
+        self.lock = threading.Lock()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def record_query(self, execute, sql, params, many, context):
+        """connection.execute_wrapper() hook."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            with self.lock:
+                self.query_count += 1
+                self.sql_seconds += duration
+                if duration >= self.slowest_seconds:
+                    # The statement without its parameters: no user data in logs.
+                    self.slowest_sql = sql
+                    self.slowest_seconds = duration
+
+    def server_timing(self) -> str:
+        """Value for the Server-Timing response header."""
+        return ', '.join([
+            f'db;dur={self.sql_seconds * 1000:.1f};desc="{self.query_count} queries"',
+            f'db-slowest;dur={self.slowest_seconds * 1000:.1f}',
+            f'tpl;dur={self.template_seconds * 1000:.1f}',
+            f'total;dur={self.elapsed() * 1000:.1f}',
+        ])
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timings = current_timings.get()
+        if timings is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.template_seconds += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    The Django template backend, adding each top-level render to the
+    current request's template time. Includes and extends render inside
+    it and are not counted twice.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
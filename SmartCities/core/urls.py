@@ -13,6 +13,12 @@ urlpatterns = [
     path('profile/', views.profile, name='profile'),
     path('register-complaint/', views.register_complaint, name='register_complaint'),
     path('admin-dashboard/', views.admin_dashboard, name='admin_dashboard'),
+    path('admin-dashboard/export', views.export_complaints, name='export_complaints'),
     path('resolve-complaint/', views.resolve_complaint, name='resolve_complaint'),
     path('settings/', views.profile_settings, name='profile_settings'),
+    path('api/complaints.geojson', views.complaints_geojson, name='complaints_geojson'),
+    path('api/analytics/resolution', views.resolution_analytics, name='resolution_analytics'),
+    path('api/v1/complaints/', views.api_complaints, name='api_complaints'),
+    path('api/v1/complaints/<int:pk>/', views.api_complaint_detail, name='api_complaint_detail'),
+    path('metrics', views.metrics, name='metrics'),
 ]
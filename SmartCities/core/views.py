@@ -1,218 +1,209 @@
+import functools
+import hmac
+
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import authenticate, login as auth_login, logout as auth_logout
-from django.contrib.auth.decorators import login_required
-from django.http import HttpRequest, HttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpRequest, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.db import router
 from django.shortcuts import redirect, render, get_object_or_404
 from django.urls import reverse
+from urllib.parse import urlencode
 from django.utils import timezone
-import json
-from django.core.serializers.json import DjangoJSONEncoder
-from django.core.paginator import Paginator
-from .models import Complaint, UserProfile            
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import condition, require_GET
+from datetime import datetime, time, timedelta
+from asgiref.sync import sync_to_async
+from . import api
+from .models import Complaint, ComplaintRollup, UserProfile
 from django.contrib.auth import get_user_model
-from .forms import UserForm, ProfileForm
-from django.db.models import Count
-from django.db.models import Avg, F, ExpressionWrapper, DurationField
-
-def _attach_profile_attrs(request: HttpRequest) -> None:
-    user = getattr(request, "user", None)
-    if not user or not getattr(user, "is_authenticated", False):
-        return
-
-    profile, _ = UserProfile.objects.get_or_create(
-        user=user,
-        defaults={
-            "name": user.get_full_name() or user.get_username(),
-            "role": "Citizen",
-            "locality": "",
-            "ward_number": "",
-        },
-    )
+from .forms import UserForm, ProfileForm, LOCALITY_WARD_CHOICES
+from .asyncviews import gather_queries, login_required
+from .conditional import conditional_page
+from .routers import read_from_replica
+from .middleware import attach_profile
+from .pagination import CursorPaginator
+from .analytics import GROUP_FIELDS, MAX_BUCKETS, PERIODS, bucket_start, resolution_series
+from .exports import async_lines, csv_lines, ndjson_lines
+from .metrics import render_metrics
+from .geo import (
+    DEFAULT_CENTER_LAT, DEFAULT_CENTER_LNG, MAX_MAP_ZOOM, MIN_MAP_ZOOM, complaints_feature_collection, parse_bbox,
+)
+from .stats import active_reporters, complaint_stats, estimated_complaint_count, landing_stats, rollup_stats
+
+# Cards per list on the admin dashboard; the rest are in the complaints list.
+ADMIN_LIST_LIMIT = 24
+
+WARD_CHOICES = [
+    (value.split('|')[1], label)
+    for value, label in LOCALITY_WARD_CHOICES
+    if '|' in value
+]
+
+
+def _date_param(params, name):
+    """A YYYY-MM-DD query param as a date; None if absent. Raises ValueError if malformed."""
+    value = params.get(name)
+    if not value:
+        return None
+    day = parse_date(value)
+    if day is None:
+        raise ValueError(f'{name} must be a YYYY-MM-DD date')
+    return day
+
+
+def _complaint_filters(params) -> dict:
+    """Read the complaint list filters from query params, dropping unknown values."""
+    def choice(name, choices):
+        value = params.get(name, '')
+        return value if value in {key for key, _ in choices} else ''
+
+    return {
+        'status': choice('status', Complaint.STATUS_CHOICES),
+        'issue_type': choice('issue_type', Complaint.ISSUE_TYPE_CHOICES),
+        'sla': choice('sla', Complaint.SLA_STATE_CHOICES),
+        'ward_number': choice('ward', WARD_CHOICES),
+    }
 
-    user.name = profile.name or user.get_full_name() or user.get_username()
-    user.role = profile.role
-    user.locality = profile.locality
-    user.ward_number = profile.ward_number
-    user.mobile = profile.mobile
-    user.age = profile.age
 
+@read_from_replica
 def index(request: HttpRequest) -> HttpResponse:
-    citizen_profiles = UserProfile.objects.filter(role='Citizen')
-
-    citizen_complaints = Complaint.objects.filter(
-        user__profile__role='Citizen'
-    )
-
-    resolved_count = citizen_complaints.filter(status='resolved').count()
-
-    active_citizens = (
-        citizen_complaints
-        .values('user')
-        .distinct()
-        .count()
-    )
-
-    localities_covered = (
-        citizen_profiles
-        .exclude(locality='')
-        .values('locality')
-        .distinct()
-        .count()
-    )
+    return render(request, 'index.html', landing_stats())
 
-    context = {
-        'resolved_count': resolved_count,
-        'active_citizens': active_citizens,
-        'localities_covered': localities_covered,
-    }
+def _dashboard_scope(request):
+    if request.user.role == 'Admin':
+        # City-wide: the rollup stays cheap to read as complaints pile up.
+        return ComplaintRollup.objects.all()
+    return Complaint.objects.filter(user=request.user)
 
-    return render(request, 'index.html', context)
 
+@read_from_replica
 @login_required
-def dashboard(request: HttpRequest) -> HttpResponse:
-    _attach_profile_attrs(request)
-
+@conditional_page(_dashboard_scope)
+async def dashboard(request: HttpRequest) -> HttpResponse:
     if request.user.role == 'Admin':
         complaints_qs = Complaint.objects.select_related(
             'user', 'user__profile'
-        ).all()
-
-        top_complaints = complaints_qs.filter(
-            status='pending'
-        ).order_by('-created_at')[:5]
+        ).order_by('-created_at')
+        sla_qs = complaints_qs.with_sla()
+
+        # City-wide numbers come from the rollup so the page cost does not
+        # grow with the complaints table.
+        stats, reporters, top_complaints, latest = await gather_queries(
+            rollup_stats,
+            functools.partial(active_reporters, role=None),
+            lambda: list(complaints_qs.filter(status='pending')[:5]),
+            lambda: list(sla_qs[:5]),
+        )
+        stats['pending_in_sla'] = stats['pending'] - stats['pending_sla_breached']
+        stats['reporters'] = reporters
     else:
-        complaints_qs = Complaint.objects.filter(user=request.user)
+        complaints_qs = Complaint.objects.filter(user=request.user).order_by('-created_at')
+        sla_qs = complaints_qs.with_sla()
         top_complaints = []
-
-    complaints_qs = complaints_qs.order_by('-created_at')
-    
-    total_complaints = complaints_qs.count()
-    resolved_count = complaints_qs.filter(status='resolved').count()
-    pending_count = complaints_qs.filter(status='pending').count()
-    
-    pending_complaints_list = complaints_qs.filter(status='pending')
-    pending_sla_breached = sum(1 for c in pending_complaints_list if c.sla_status == 'breached')
-    pending_in_sla = sum(1 for c in pending_complaints_list if c.sla_status == 'active')
-    
-    sla_breached_count = sum(
-        1 for c in complaints_qs if c.sla_status == 'breached'
-    )
-
-    resolved_items = complaints_qs.filter(
-        status='resolved',
-        resolved_at__isnull=False
-    )
-
-    total_hours = 0
-    resolved_items_count = 0
-
-    for c in resolved_items:
-        if c.resolution_time_hours is not None:
-            total_hours += c.resolution_time_hours
-            resolved_items_count += 1
-
-    avg_resolution_time = (
-        round(total_hours / resolved_items_count, 2)
-        if resolved_items_count > 0
-        else None
-    )
-
-    complaints_json = [
-        {
-            'id': c.id,
-            'issue_type': c.issue_type.title(),
-            'description': c.description,
-            'latitude': c.latitude or 19.0760,
-            'longitude': c.longitude or 72.8777,
-            'status': c.status,
-            'sla_status': c.sla_status,
-        }
-        for c in complaints_qs
-    ]
+        stats, latest = await gather_queries(
+            functools.partial(complaint_stats, user=request.user),
+            lambda: list(sla_qs[:5]),
+        )
 
     recent_activities = [
         {
             'id': c.id,
             'type': (
-                'critical' if c.sla_status == 'breached'
+                'critical' if c.sla_state == 'breached'
                 else 'resolved' if c.status == 'resolved'
                 else 'new'
             ),
             'description': f"{c.issue_type.title()} near {c.landmark or 'unknown location'}",
             'timestamp': c.resolved_at if c.status == 'resolved' else c.created_at
         }
-        for c in complaints_qs[:5]
+        for c in latest
     ]
 
-    return render(
+    return await sync_to_async(render)(
         request,
         'dashboard.html',
         {
-            'total_complaints': total_complaints,
-            'resolved_complaints': resolved_count,
-            'pending_complaints': pending_count,
-            'pending_sla_breached': pending_sla_breached,
-            'pending_in_sla': pending_in_sla,
-            'sla_breached_count': sla_breached_count,
-            'avg_resolution_time': avg_resolution_time,
-            'active_reporters': complaints_qs.values('user').distinct().count(),
+            'total_complaints': stats['total'],
+            'resolved_complaints': stats['resolved'],
+            'pending_complaints': stats['pending'],
+            'pending_sla_breached': stats['pending_sla_breached'],
+            'pending_in_sla': stats['pending_in_sla'],
+            'sla_breached_count': stats['sla_breached'],
+            'avg_resolution_time': stats['avg_resolution_hours'],
+            'active_reporters': stats['reporters'],
             'recent_activities': recent_activities,
             'complaints_list': complaints_qs,
             'complaints': complaints_qs,
             'top_complaints': top_complaints,
-            'ward_center_lat': 19.0760,
-            'ward_center_lng': 72.8777,
-            'complaints_json': json.dumps(
-                complaints_json, cls=DjangoJSONEncoder
-            ),
+            'ward_center_lat': DEFAULT_CENTER_LAT,
+            'ward_center_lng': DEFAULT_CENTER_LNG,
         },
     )
 
 
+@read_from_replica
 @login_required
 def complaints(request: HttpRequest) -> HttpResponse:
-    _attach_profile_attrs(request)
+    filters = _complaint_filters(request.GET)
+    search = request.GET.get('q', '').strip()
+    default_sort = 'relevance' if search else 'recent'
+    sort = request.GET.get('sort') or default_sort
+    if sort not in Complaint.SORT_ORDERS:
+        sort = default_sort
 
     complaints_qs = Complaint.objects.select_related(
         'user', 'user__profile'
-    ).all()
-
-    complaints_qs = complaints_qs.order_by('-created_at')
+    ).apply_filters(**filters)
+    if search:
+        complaints_qs = complaints_qs.search(search)
+
+    complaints_page = CursorPaginator(complaints_qs.sort_by(sort), 6).get_page(
+        request.GET.get('cursor'),
+        # The rollup cannot count search results.
+        estimated_total=None if search else estimated_complaint_count(**filters),
+    )
 
-    paginator = Paginator(complaints_qs, 6)
-    page_number = request.GET.get('page')
-    complaints_page = paginator.get_page(page_number)
+    query = {
+        'q': search,
+        'status': filters['status'],
+        'issue_type': filters['issue_type'],
+        'sla': filters['sla'],
+        'ward': filters['ward_number'],
+        'sort': sort if sort != default_sort else '',
+    }
 
     return render(
         request,
         'complaints.html',
         {
-            'complaints': complaints_page
+            'complaints': complaints_page,
+            'filters': query,
+            'filter_query': urlencode({key: value for key, value in query.items() if value}),
+            'ward_choices': WARD_CHOICES,
         }
     )
 
 @login_required
+@conditional_page(lambda request, pk: Complaint.objects.filter(pk=pk), renders_messages=True)
 def complaint_detail(request: HttpRequest, pk: int) -> HttpResponse:
-    _attach_profile_attrs(request)
     complaint = get_object_or_404(Complaint, pk=pk)
     return render(request, 'complaint-detail.html', {'complaint': complaint})
 
 
 @login_required
 def profile(request: HttpRequest) -> HttpResponse:
-    _attach_profile_attrs(request)
-    
-    user_complaints = Complaint.objects.filter(user=request.user).order_by('-created_at')
-    
-    total_complaints = user_complaints.count()
-    resolved_complaints = user_complaints.filter(status='resolved').count()
-    pending_complaints = user_complaints.filter(status='pending').count()
+    stats = complaint_stats(user=request.user)
+    user_complaints = CursorPaginator(
+        Complaint.objects.filter(user=request.user).order_by('-created_at', '-id'), 10
+    ).get_page(request.GET.get('cursor'), estimated_total=stats['total'])
     
     context = {
         'user_complaints': user_complaints,
-        'user_total_complaints': total_complaints,
-        'user_resolved_complaints': resolved_complaints,
-        'user_pending_complaints': pending_complaints,
+        'user_total_complaints': stats['total'],
+        'user_resolved_complaints': stats['resolved'],
+        'user_pending_complaints': stats['pending'],
     }
     
     return render(request, 'profile.html', context)
@@ -220,7 +211,6 @@ def profile(request: HttpRequest) -> HttpResponse:
 
 @login_required
 def register_complaint(request: HttpRequest) -> HttpResponse:
-    _attach_profile_attrs(request)
     if request.method == 'POST':
         issue_type = request.POST.get('issue_type', 'other')
         description = request.POST.get('description', '')
@@ -233,94 +223,248 @@ def register_complaint(request: HttpRequest) -> HttpResponse:
         if landmark:
             title += f" near {landmark}"
         
-        Complaint.objects.create(
+        complaint, created = Complaint.objects.report(
             user=request.user,
             title=title[:200], 
             description=description,
             issue_type=issue_type,
             landmark=landmark,
+            ward_number=request.user.ward_number,
             latitude=float(latitude) if latitude else None,
             longitude=float(longitude) if longitude else None,
             before_image=before_image,
             status='pending'
         )
-        
+
+        if not created:
+            messages.success(
+                request,
+                f'A similar complaint (#{complaint.id}) is already open nearby. '
+                f'Your report has been added to it.'
+            )
+            return redirect('complaint_detail', pk=complaint.id)
+
         messages.success(request, 'Complaint submitted successfully.')
         return redirect('complaints')
     return render(request, 'register-complaint.html', {})
 
 
+@read_from_replica
 @login_required
-def admin_dashboard(request: HttpRequest) -> HttpResponse:
-    _attach_profile_attrs(request)
-    
+@conditional_page(lambda request: ComplaintRollup.objects.all())
+async def admin_dashboard(request: HttpRequest) -> HttpResponse:
     if request.user.role != 'Admin':
          pass
 
-    complaints_qs = Complaint.objects.select_related('user').all()
-    
-    total_complaints = complaints_qs.count()
-    resolved_complaints_qs = complaints_qs.filter(status='resolved')
-    resolved_complaints = resolved_complaints_qs.count()
-    
-    pending_complaints_qs = complaints_qs.filter(status='pending')
-    pending_complaints = pending_complaints_qs.count()
-    
-    monthly_complaints = complaints_qs.filter(created_at__month=timezone.now().month).count()
-    
-    resolution_rate = 0
-    if total_complaints > 0:
-        resolution_rate = int((resolved_complaints / total_complaints) * 100)
-
-    all_complaints_list = []
-    sla_breached_complaints = []
-    
-    for c in complaints_qs:
-        item = c
-                
-        if c.sla_status == 'breached':
-            sla_breached_complaints.append(c)
-        
-        marker_color = 'orange'
-        if c.status == 'resolved':
-            marker_color = 'green'
-        elif c.sla_status == 'breached':
-            marker_color = 'red'
-
-        all_complaints_list.append({
-            'id': c.id,
-            'issue_type': c.issue_type, 
-            'description': c.description,
-            'latitude': c.latitude or 19.0760,
-            'longitude': c.longitude or 72.8777,
-            'status': c.status,
-            'sla_status': c.sla_status,
-        })
-        
-    sla_breached_count = sum(
-        1 for c in complaints_qs if c.sla_status == 'breached'
+    complaints_qs = Complaint.objects.select_related('user', 'user__profile').all()
+    stats, pending_complaints_qs, sla_breached_complaints = await gather_queries(
+        rollup_stats,
+        lambda: list(complaints_qs.filter(status='pending').order_by('-created_at')[:ADMIN_LIST_LIMIT]),
+        lambda: list(
+            complaints_qs.pending_past_deadline()
+            .with_sla()
+            .order_by('sla_deadline')[:ADMIN_LIST_LIMIT]
+        ),
     )
 
     context = {
-        'sla_breached_count': sla_breached_count,
-        'total_complaints': total_complaints,
-        'monthly_complaints': monthly_complaints,
-        'pending_complaints': pending_complaints,
-        'resolved_complaints': resolved_complaints,
-        'resolution_rate': resolution_rate,
+        'sla_breached_count': stats['sla_breached'],
+        'total_complaints': stats['total'],
+        'monthly_complaints': stats['monthly'],
+        'pending_complaints': stats['pending'],
+        'resolved_complaints': stats['resolved'],
+        'resolution_rate': stats['resolution_rate'],
         'sla_breached_complaints': sla_breached_complaints,
+        'pending_sla_breached_count': stats['pending_sla_breached'],
         'pending_complaints_list': pending_complaints_qs, 
-        'ward_center_lat': 19.0760,
-        'ward_center_lng': 72.8777,
-        'complaints_json': json.dumps(all_complaints_list, cls=DjangoJSONEncoder),
+        'ward_center_lat': DEFAULT_CENTER_LAT,
+        'ward_center_lng': DEFAULT_CENTER_LNG,
     }
     
-    return render(request, 'admin-dashboard.html', context)
+    return await sync_to_async(render)(request, 'admin-dashboard.html', context)
+
+
+@read_from_replica
+@login_required
+def export_complaints(request: HttpRequest) -> HttpResponse:
+    if request.user.role != 'Admin':
+        return HttpResponseForbidden('Only admins can export complaints.')
+
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in ('csv', 'ndjson'):
+        return JsonResponse({'error': 'format must be csv or ndjson'}, status=400)
+
+    complaints_qs = Complaint.objects.apply_filters(**_complaint_filters(request.GET))
+    # from/to are inclusive dates, compared as datetimes so the created_at
+    # indexes still apply.
+    for param, lookup, offset in (('from', 'created_at__gte', 0), ('to', 'created_at__lt', 1)):
+        try:
+            day = _date_param(request.GET, param)
+        except ValueError as error:
+            return JsonResponse({'error': str(error)}, status=400)
+        if day is None:
+            continue
+        boundary = timezone.make_aware(datetime.combine(day + timedelta(days=offset), time.min))
+        complaints_qs = complaints_qs.filter(**{lookup: boundary})
+    # The body is read after the view returns, outside its replica routing.
+    complaints_qs = complaints_qs.order_by('created_at', 'id').using(router.db_for_read(Complaint))
+
+    if export_format == 'csv':
+        lines, content_type = csv_lines(complaints_qs), 'text/csv'
+    else:
+        lines, content_type = ndjson_lines(complaints_qs), 'application/x-ndjson'
+    if isinstance(request, ASGIRequest):
+        lines = async_lines(lines)
+    response = StreamingHttpResponse(lines, content_type=content_type)
+    filename = f'complaints-{timezone.localdate().isoformat()}.{export_format}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@read_from_replica
+@login_required
+def resolution_analytics(request: HttpRequest) -> HttpResponse:
+    if request.user.role != 'Admin':
+        return JsonResponse({'error': 'Only admins can read analytics.'}, status=403)
+
+    period = request.GET.get('period', 'day')
+    if period not in PERIODS:
+        return JsonResponse({'error': 'period must be day or week'}, status=400)
+    group_by = [
+        {'ward': 'ward_number'}.get(name, name)
+        for name in request.GET.get('group_by', 'ward,issue_type').split(',')
+    ]
+    if not group_by or not set(group_by) <= set(GROUP_FIELDS):
+        return JsonResponse({'error': 'group_by must be ward and/or issue_type'}, status=400)
+    try:
+        last = _date_param(request.GET, 'to') or timezone.localdate()
+        first = _date_param(request.GET, 'from') or last - PERIODS[period][1] * 29
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+
+    step = PERIODS[period][1]
+    start = bucket_start(first, period)
+    end = bucket_start(last, period) + step
+    if not start < end or (end - start) // step > MAX_BUCKETS:
+        return JsonResponse({'error': f'from/to must span 1 to {MAX_BUCKETS} {period}s'}, status=400)
+
+    filters = _complaint_filters(request.GET)
+    return JsonResponse({
+        'period': period,
+        'from': start.isoformat(),
+        'to': (end - timedelta(days=1)).isoformat(),
+        'groups': resolution_series(
+            period, start, end,
+            ward_number=filters['ward_number'],
+            issue_type=filters['issue_type'],
+            group_by=[field for field in GROUP_FIELDS if field in group_by],
+        ),
+    })
+
+
+def _api_complaints_qs(params):
+    """Complaints for an API list request, or None if its params are invalid."""
+    search = params.get('q', '').strip()
+    sort = params.get('sort') or ('relevance' if search else 'recent')
+    if sort not in Complaint.SORT_ORDERS:
+        return None
+    complaints_qs = Complaint.objects.apply_filters(**_complaint_filters(params))
+    if search:
+        complaints_qs = complaints_qs.search(search)
+    return complaints_qs.sort_by(sort)
+
+
+def _api_list_etag(request):
+    complaints_qs = _api_complaints_qs(request.GET)
+    if complaints_qs is None:
+        return None
+    return api.etag(complaints_qs.watermark(), request.GET)
+
+
+def _api_detail_etag(request, pk):
+    marks = Complaint.objects.filter(pk=pk).watermark()
+    # No ETag for a missing complaint, or a later 404 could come back as 304.
+    return api.etag(marks, request.GET) if marks['count'] else None
+
+
+@read_from_replica
+@login_required
+@require_GET
+@condition(etag_func=_api_list_etag)
+def api_complaints(request: HttpRequest) -> HttpResponse:
+    complaints_qs = _api_complaints_qs(request.GET)
+    if complaints_qs is None:
+        return JsonResponse({'error': f"sort must be one of {', '.join(Complaint.SORT_ORDERS)}"}, status=400)
+    try:
+        fields = api.parse_fields(request.GET.get('fields'))
+        limit = int(request.GET.get('limit', api.API_PAGE_SIZE))
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    if not 1 <= limit <= api.API_MAX_PAGE_SIZE:
+        return JsonResponse({'error': f'limit must be 1 to {api.API_MAX_PAGE_SIZE}'}, status=400)
+
+    page = CursorPaginator(api.only_fields(complaints_qs, fields), limit).get_page(request.GET.get('cursor'))
+    return JsonResponse({
+        'results': [api.serialize(complaint, fields) for complaint in page],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    })
+
+
+@read_from_replica
+@login_required
+@require_GET
+@condition(etag_func=_api_detail_etag)
+def api_complaint_detail(request: HttpRequest, pk: int) -> HttpResponse:
+    try:
+        fields = api.parse_fields(request.GET.get('fields'))
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    complaint = get_object_or_404(api.only_fields(Complaint.objects.all(), fields), pk=pk)
+    return JsonResponse(api.serialize(complaint, fields))
+
+
+def metrics(request: HttpRequest) -> HttpResponse:
+    """Prometheus scrape target: request histograms from every worker plus complaint gauges."""
+    if not settings.METRICS_TOKEN and not settings.DEBUG:
+        # Request rates, routes and queue depths are not for the public.
+        return HttpResponseForbidden('Set METRICS_TOKEN to enable /metrics.', content_type='text/plain')
+    if settings.METRICS_TOKEN and not hmac.compare_digest(
+        request.headers.get('Authorization', ''), f'Bearer {settings.METRICS_TOKEN}'
+    ):
+        return HttpResponse('Unauthorized', status=401, content_type='text/plain')
+
+    stats = rollup_stats()
+    body = render_metrics([
+        ('smartcities_complaints_pending', 'Complaints not yet resolved.', stats['pending']),
+        (
+            'smartcities_complaints_pending_sla_breached',
+            'Unresolved complaints past their SLA deadline.',
+            stats['pending_sla_breached'],
+        ),
+    ])
+    return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@read_from_replica
+@login_required
+def complaints_geojson(request: HttpRequest) -> HttpResponse:
+    try:
+        bbox = parse_bbox(request.GET.get('bbox'))
+        zoom = min(max(int(request.GET.get('zoom', 14)), MIN_MAP_ZOOM), MAX_MAP_ZOOM)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    if request.user.role == 'Admin':
+        complaints_qs = Complaint.objects.all()
+    else:
+        complaints_qs = Complaint.objects.filter(user=request.user)
+
+    return JsonResponse(complaints_feature_collection(complaints_qs, bbox, zoom))
 
 
 @login_required
 def resolve_complaint(request: HttpRequest) -> HttpResponse:
-    _attach_profile_attrs(request)
     if request.method != 'POST':
         return redirect('admin_dashboard')
     
@@ -354,7 +498,7 @@ def login_view(request: HttpRequest) -> HttpResponse:
                 if created:
                     user.set_password(password)
                     user.save()
-                    UserProfile.objects.get_or_create(
+                    UserProfile.objects.update_or_create(
                         user=user,
                         defaults={
                             'name': 'Demo User',
@@ -371,8 +515,8 @@ def login_view(request: HttpRequest) -> HttpResponse:
                             user.profile.role = 'Admin'
                             user.profile.save()
 
-                auth_login(request, user)
-                _attach_profile_attrs(request)
+                # Not from authenticate(), so the backend has to be named.
+                auth_login(request, user, backend='core.backends.ProfileBackend')
                 messages.success(request, 'Logged in successfully.')
                 return redirect('admin_dashboard')
             except Exception as e:
@@ -385,7 +529,7 @@ def login_view(request: HttpRequest) -> HttpResponse:
             return render(request, 'login.html', {})
 
         auth_login(request, user)
-        _attach_profile_attrs(request)
+        attach_profile(request.user)
         messages.success(request, 'Logged in successfully.')
         
         if getattr(request.user, 'role', 'Citizen') == 'Admin':
@@ -420,16 +564,17 @@ def register_view(request: HttpRequest) -> HttpResponse:
             locality = locality_value
 
         user = User.objects.create_user(username=email, email=email, password=password)
-        profile = UserProfile.objects.create(
+        UserProfile.objects.update_or_create(
             user=user,
-            name=name or email,
-            role='Citizen',
-            locality=locality,
-            ward_number=ward_number,
-            mobile=mobile,
-            age=int(age_raw) if age_raw.isdigit() else None,
+            defaults={
+                'name': name or email,
+                'role': 'Citizen',
+                'locality': locality,
+                'ward_number': ward_number,
+                'mobile': mobile,
+                'age': int(age_raw) if age_raw.isdigit() else None,
+            },
         )
-        profile.save()
 
         messages.success(request, 'Account created. Please log in.')
         return redirect('login')
@@ -442,7 +587,6 @@ def logout_view(request: HttpRequest) -> HttpResponse:
 
 @login_required
 def profile_settings(request):
-    _attach_profile_attrs(request)
     user = request.user
     profile = user.profile
 
@@ -0,0 +1,27 @@
+#!/usr/bin/env bash
+# Start command of the Render web service: the ASGI server and the task
+# worker side by side. The worker runs here rather than as a Render worker
+# service because its tasks render the uploaded photos, which are on this
+# service's local disk; give it a service of its own once media is on
+# shared storage. Whichever process exits first takes the other down and
+# fails the service, so Render restarts both instead of serving on with
+# no worker.
+
+# The /metrics counts of the previous run.
+rm -rf "$METRICS_DIR"
+
+python manage.py run_worker &
+# Served over ASGI so the dashboards can run their queries concurrently.
+uvicorn SmartCities.asgi:application --host 0.0.0.0 --port "$PORT" &
+
+stop() {
+    kill -TERM $(jobs -p) 2>/dev/null
+    wait
+}
+# Render stops the service with SIGTERM; both processes finish their work.
+trap 'stop; exit 0' TERM INT
+
+wait -n
+echo "A process exited with status $?; stopping the service." >&2
+stop
+exit 1